@@ -1,10 +1,9 @@
 # Ultra Portfolio AI App - Home
 
 import streamlit as st
-from datetime import date
-from PIL import Image
 import base64
 from version import APP_VERSION, APP_DATE
+from portfolio_core import prewarm
 
 st.set_page_config(
     page_title="Ultra Portfolio AI Assistant",
@@ -12,12 +11,27 @@ st.set_page_config(
     layout="wide"
 )
 
-def show_logo(path):
+# Pre-warm watchlist di latar belakang (hanya jika ULTRA_PREWARM=1; berjalan sekali per proses).
+prewarm.start_background()
+
+@st.cache_resource
+def encode_logo(path, width=360):
+    """Base64 PNG of the logo, shrunk once to 2x its display width."""
+    import io
+    from PIL import Image
+
     logo = Image.open(path)
+    if logo.width > width:
+        logo = logo.resize((width, round(logo.height * width / logo.width)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    logo.save(buffer, format="PNG", optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+def show_logo(path):
     st.markdown(
         f"""
         <div style="text-align: center; margin-top: 2rem; animation: fadeIn 2s ease-out;">
-            <img src="data:image/png;base64,{base64.b64encode(open(path, "rb").read()).decode()}" width="180"/>
+            <img src="data:image/png;base64,{encode_logo(path)}" width="180"/>
         </div>
         """,
         unsafe_allow_html=True
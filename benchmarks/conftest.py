@@ -0,0 +1,47 @@
+"""Shared fixtures for the hot-path benchmarks (requires ``pytest-benchmark``).
+
+The default sizes keep a run under a minute; ``--bench-full`` adds the large
+universes used for scaling curves.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:  # plain ``pytest`` runs stay green without the plugin
+    collect_ignore_glob = ["test_*.py"]
+
+from synthetic import synthetic_prices  # noqa: E402
+
+# (tickers, trading days)
+SMALL_SIZES = [(10, 252), (50, 1260)]
+FULL_SIZES = SMALL_SIZES + [(200, 2520), (1000, 2520)]
+
+_frames = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-full", action="store_true", help="also run the large universe sizes")
+
+
+def pytest_generate_tests(metafunc):
+    if "universe" in metafunc.fixturenames:
+        sizes = FULL_SIZES if metafunc.config.getoption("--bench-full") else SMALL_SIZES
+        metafunc.parametrize("universe", sizes, indirect=True, ids=[f"{n}x{d}" for n, d in sizes])
+
+
+@pytest.fixture
+def universe(request, benchmark):
+    """Synthetic prices (with a ``^JKSE`` market column) for one size, built once per session."""
+    size = request.param
+    if size not in _frames:
+        _frames[size] = synthetic_prices(*size, seed=sum(size))
+    benchmark.extra_info.update(tickers=size[0], days=size[1], cells=size[0] * size[1])
+    return _frames[size]
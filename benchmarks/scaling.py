@@ -0,0 +1,122 @@
+"""Scaling curves and regression checks from a pytest-benchmark JSON file.
+
+    python benchmarks/scaling.py bench.json                         # curves per hot path
+    python benchmarks/scaling.py bench.json --csv curves.csv        # also write them out
+    python benchmarks/scaling.py bench.json --save-baseline benchmarks/baseline.json
+    python benchmarks/scaling.py bench.json --baseline benchmarks/baseline.json --tolerance 0.25
+
+For each benchmark group the script lists the median time per problem size
+(``cells`` = tickers x days, grid cells or paths) and fits the exponent k in
+time ~ size^k: about 1 is linear, 2 is quadratic. With ``--baseline`` it
+exits non-zero when a median is more than ``tolerance`` slower than the
+stored one, or when a benchmark has no baseline entry at all (re-save the
+baseline after adding one). Timings under ``--min-delta`` seconds of difference count as noise.
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+
+def load(path):
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    rows = []
+    for bench in data["benchmarks"]:
+        rows.append({
+            "group": bench.get("group") or bench["name"].split("[")[0],
+            "name": bench["fullname"],
+            "cells": bench.get("extra_info", {}).get("cells"),
+            "median": bench["stats"]["median"],
+        })
+    return rows
+
+
+def curves(rows):
+    """Rows grouped per benchmark group, sorted by size, with the fitted exponent."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row["group"]].append(row)
+    result = {}
+    for group, items in sorted(groups.items()):
+        items.sort(key=lambda r: r["cells"] or 0)
+        sized = [r for r in items if r["cells"]]
+        exponent = float("nan")
+        if len({r["cells"] for r in sized}) >= 2:
+            exponent = float(np.polyfit(np.log([r["cells"] for r in sized]),
+                                        np.log([r["median"] for r in sized]), 1)[0])
+        result[group] = (items, exponent)
+    return result
+
+
+def regressions(rows, baseline, tolerance, min_delta):
+    """(name, baseline, current) for every benchmark slower than allowed."""
+    slower = []
+    for row in rows:
+        old = baseline.get(row["name"])
+        if old is not None and row["median"] > old * (1 + tolerance) and row["median"] - old > min_delta:
+            slower.append((row["name"], old, row["median"]))
+    return slower
+
+
+def unbaselined(rows, baseline):
+    """Names of the benchmarks the baseline has no median for."""
+    return [row["name"] for row in rows if row["name"] not in baseline]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("results", help="file written by pytest --benchmark-json")
+    parser.add_argument("--csv", help="write the scaling curves to this CSV file")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="store the current medians as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.0005, help="ignore differences below this many seconds")
+    args = parser.parse_args(argv)
+
+    rows = load(args.results)
+    table = curves(rows)
+    for group, (items, exponent) in table.items():
+        print(f"\n{group}  (time ~ size^{exponent:.2f})")
+        for r in items:
+            size = f"{r['cells']:,}" if r["cells"] else "-"
+            print(f"  {r['name'].split('::')[-1]:<48}{size:>14}{r['median'] * 1000:>12.3f} ms")
+
+    if args.csv:
+        import csv
+        with open(args.csv, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["group", "name", "cells", "median_s", "exponent"])
+            for group, (items, exponent) in table.items():
+                for r in items:
+                    writer.writerow([group, r["name"], r["cells"], r["median"], exponent])
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as fh:
+            json.dump({r["name"]: r["median"] for r in rows}, fh, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        slower = regressions(rows, baseline, args.tolerance, args.min_delta)
+        missing = unbaselined(rows, baseline)
+        if slower:
+            print(f"\nRegressions (> {args.tolerance:.0%} slower than baseline):", file=sys.stderr)
+            for name, old, new in slower:
+                print(f"  {name}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms", file=sys.stderr)
+        if missing:
+            print(f"\nNo baseline entry in {args.baseline} (run --save-baseline):", file=sys.stderr)
+            for name in missing:
+                print(f"  {name}", file=sys.stderr)
+        if slower or missing:
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
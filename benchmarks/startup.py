@@ -0,0 +1,90 @@
+"""Per-page startup benchmark for the Streamlit app.
+
+Every page runs in a fresh interpreter so module caches do not hide import
+cost. For each page the script reports the time spent on the page's own
+top-level imports and the time of the first full render (via Streamlit's
+``AppTest``), and exits non-zero when a page exceeds the budget.
+
+    python benchmarks/startup.py                       # all pages
+    python benchmarks/startup.py --budget 3.0          # fail above 3 s
+    python benchmarks/startup.py --fixtures data/fx    # offline prices
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD = r"""
+import ast, json, sys, time
+root, page = sys.argv[1], sys.argv[2]
+sys.path.insert(0, root)
+tree = ast.parse(open(page, encoding="utf-8").read())
+imports = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+t0 = time.perf_counter()
+exec(compile(ast.Module(body=imports, type_ignores=[]), page, "exec"), {})
+t1 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t2 = time.perf_counter()
+at = AppTest.from_file(page, default_timeout=300).run()
+t3 = time.perf_counter()
+print(json.dumps({"imports": t1 - t0, "render": t3 - t2,
+                  "errors": [str(e.value) for e in at.exception]}))
+"""
+
+
+def pages():
+    found = [ROOT / "Home.py", ROOT / "ultra_portfolio.py"]
+    found += sorted((ROOT / "pages").glob("*.py"))
+    return found
+
+
+def measure(page, env):
+    out = subprocess.run([sys.executable, "-c", _CHILD, str(ROOT), str(page)],
+                         capture_output=True, text=True, cwd=ROOT, env=env)
+    if out.returncode != 0:
+        return {"imports": float("nan"), "render": float("nan"), "errors": [out.stderr.strip()[-500:]]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="page files (default: all)")
+    parser.add_argument("--budget", type=float, default=None, help="max seconds for imports + first render")
+    parser.add_argument("--fixtures", help="directory of <TICKER>.csv files for offline prices")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.fixtures:
+        env["ULTRA_PRICE_FIXTURES"] = str(Path(args.fixtures).resolve())
+
+    targets = [Path(p).resolve() for p in args.pages] or pages()
+    results = {}
+    for page in targets:
+        results[page.name] = measure(page, env)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Page':<36}{'Imports (s)':>12}{'Render (s)':>12}{'Total (s)':>12}")
+        for name, r in results.items():
+            total = r["imports"] + r["render"]
+            flag = "  ERROR" if r["errors"] else ""
+            print(f"{name:<36}{r['imports']:>12.3f}{r['render']:>12.3f}{total:>12.3f}{flag}")
+
+    over = [n for n, r in results.items()
+            if r["errors"] or (args.budget is not None and r["imports"] + r["render"] > args.budget)]
+    if over:
+        print(f"Over budget or failing: {', '.join(over)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Deterministic synthetic market data for offline benchmarks.
+
+Prices follow a correlated geometric Brownian motion driven by one market
+factor. On top of that the generator adds the gaps seen in real IDX data:
+exchange holidays (whole rows missing), late listings (leading NaNs),
+multi-day trading suspensions and isolated missing quotes. The same
+arguments always give the same frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+MARKET = "^JKSE"
+
+
+def synthetic_prices(n_tickers, n_days, seed=0, correlation=0.35, annual_return=0.08, annual_vol=0.30,
+                     holiday_rate=0.03, late_listing=0.15, suspensions=0.2, missing_rate=0.002,
+                     market=True, start="2012-01-02"):
+    """Dates x tickers close prices with realistic gaps.
+
+    ``correlation`` is the average pairwise correlation implied by the market
+    factor. ``late_listing`` and ``suspensions`` are the shares of tickers
+    that list part-way through or get one suspension of 5-60 days. With
+    ``market`` an index column (``^JKSE``) built from the factor is appended
+    without gaps.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start, periods=int(n_days * (1 + holiday_rate) + 1))
+    keep = rng.random(len(days)) >= holiday_rate
+    days = days[keep][:n_days]
+    n_days = len(days)
+
+    dt = 1 / 252
+    loading = np.sqrt(correlation) * rng.uniform(0.6, 1.4, n_tickers)
+    idio = np.sqrt(np.clip(1 - loading ** 2, 0.05, None))
+    vol = annual_vol * rng.uniform(0.5, 1.5, n_tickers)
+    drift = (annual_return + rng.normal(0, 0.05, n_tickers) - vol ** 2 / 2) * dt
+
+    factor = rng.standard_normal(n_days)
+    shocks = factor[:, None] * loading + rng.standard_normal((n_days, n_tickers)) * idio
+    log_prices = np.log(rng.uniform(100, 10_000, n_tickers)) + np.cumsum(drift + vol * np.sqrt(dt) * shocks, axis=0)
+    prices = np.exp(log_prices)
+
+    for i in np.flatnonzero(rng.random(n_tickers) < late_listing):
+        prices[:rng.integers(1, max(n_days // 2, 2)), i] = np.nan
+    for i in np.flatnonzero(rng.random(n_tickers) < suspensions):
+        length = rng.integers(5, 61)
+        first = rng.integers(0, max(n_days - length, 1))
+        prices[first:first + length, i] = np.nan
+    prices[rng.random(prices.shape) < missing_rate] = np.nan
+
+    width = len(str(n_tickers))
+    frame = pd.DataFrame(prices, index=days, columns=[f"S{i:0{width}d}.JK" for i in range(n_tickers)])
+    if market:
+        market_vol = annual_vol * 0.6
+        steps = (annual_return - market_vol ** 2 / 2) * dt + market_vol * np.sqrt(dt) * factor
+        frame[MARKET] = 7000 * np.exp(np.cumsum(steps))
+    return frame
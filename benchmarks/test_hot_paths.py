@@ -0,0 +1,325 @@
+"""Benchmarks for every analytic hot path, on synthetic data at several sizes.
+
+    pytest benchmarks/ --benchmark-json=bench.json               # run and record
+    pytest benchmarks/ --bench-full --benchmark-json=bench.json  # include large universes
+    python benchmarks/scaling.py bench.json                      # scaling curves
+    python benchmarks/scaling.py bench.json --baseline benchmarks/baseline.json
+                                                                 # fail on regressions
+
+Caches (``stats_for``, the frontier cache) are bypassed so every round
+measures a cold computation. Edge cases that once broke a hot path are
+checked alongside as plain tests.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_core.alignment import align, clear_cache as clear_alignment
+from portfolio_core.backtest import backtest
+from portfolio_core.beta import aligned_returns, beta_table, rolling_beta
+from portfolio_core.downloader import ChunkedDownloader
+from portfolio_core.analysis import peer_table
+from portfolio_core.correlation import cluster_order, correlation_matrix, top_pairs
+from portfolio_core.optimizer import clear_cache, efficient_frontier
+from portfolio_core.peers import PeerBenchmark, peer_metrics
+from portfolio_core.prewarm import PrewarmScheduler, Watchlist
+from portfolio_core.price_store import PriceStore
+from portfolio_core.loader import load_prices, today
+from portfolio_core.result_cache import ResultCache, default_cache, memoize
+from portfolio_core.risk_metrics import risk_table, rolling_drawdown
+from portfolio_core.risk_profile import RiskModel
+from portfolio_core.stats import DatasetStats, stats_for
+from portfolio_core.walkforward import walk_forward
+from portfolio_core.valuation import monte_carlo, sensitivity_grid
+from synthetic import MARKET
+
+
+def _stocks(universe):
+    return universe.drop(columns=MARKET)
+
+
+# -- ultra_portfolio.py / pages/1: rebalancing ---------------------------------
+
+@pytest.mark.benchmark(group="rebalance-annual")
+def test_rebalance_annual(benchmark, universe):
+    prices = _stocks(universe)
+    weights = np.full(prices.shape[1], 1 / prices.shape[1])
+    result = benchmark(backtest, prices, weights, freq="annual")
+    assert np.isfinite(result.values).all()
+
+
+@pytest.mark.benchmark(group="rebalance-daily")
+def test_rebalance_daily(benchmark, universe):
+    prices = _stocks(universe)
+    weights = np.full(prices.shape[1], 1 / prices.shape[1])
+    result = benchmark(backtest, prices, weights, freq="daily", cost=0.001)
+    assert np.isfinite(result.values).all()
+
+
+@pytest.mark.benchmark(group="rebalance-threshold")
+def test_rebalance_threshold(benchmark, universe):
+    prices = _stocks(universe)
+    weights = np.full(prices.shape[1], 1 / prices.shape[1])
+    result = benchmark(backtest, prices, weights, freq="threshold", threshold=0.05)
+    assert np.isfinite(result.values).all()
+
+
+@pytest.mark.parametrize("freq", ["daily", "monthly", "threshold", "none"])
+def test_rebalance_single_row(freq):
+    prices = pd.DataFrame({"A": [10.0], "B": [20.0]}, index=pd.to_datetime(["2024-01-02"]))
+    result = backtest(prices, [0.5, 0.5], freq=freq, cost=0.001)
+    assert result.values.tolist() == [10000.0] and result.turnover.empty and result.costs == 0.0
+
+
+# -- pages/1: Markowitz (formerly scipy.optimize.minimize per point) -----------
+
+@pytest.mark.benchmark(group="efficient-frontier")
+def test_efficient_frontier(benchmark, universe):
+    prices = _stocks(universe)
+    if prices.shape[1] > 200:
+        pytest.skip("frontier is benchmarked up to 200 assets")
+    stats = DatasetStats(prices)
+    mean, cov = stats.mean, stats.cov("ledoit_wolf")
+
+    def solve():
+        clear_cache()
+        return efficient_frontier(mean, cov, n_points=50)
+
+    frontier = benchmark(solve)
+    assert np.allclose(frontier.weights.sum(axis=1), 1.0)
+
+
+@pytest.mark.benchmark(group="walk-forward")
+def test_walk_forward(benchmark, universe):
+    prices = _stocks(universe)
+    if prices.shape[1] > 200:
+        pytest.skip("walk-forward is benchmarked up to 200 assets")
+    window = min(252, len(prices) // 3)
+    result = benchmark(walk_forward, prices, window=window, freq="monthly", cost=0.001)
+    assert np.allclose(result.weights.sum(axis=1), 1.0) and np.isfinite(result.values).all()
+
+
+# -- pages/4: DCF ----------------------------------------------------------------
+
+@pytest.mark.benchmark(group="dcf-grid")
+@pytest.mark.parametrize("shape", [(7, 5), (25, 25), (100, 100), (1000, 1000)], ids=lambda s: f"{s[0]}x{s[1]}")
+def test_dcf_grid(benchmark, shape):
+    wacc = np.linspace(0.07, 0.13, shape[0])
+    terminal = np.linspace(0.02, 0.06, shape[1])
+    benchmark.extra_info.update(cells=shape[0] * shape[1])
+    grid = benchmark(sensitivity_grid, 1000.0, wacc, terminal, 0.05, 5)
+    assert grid.shape == (shape[1], shape[0])
+
+
+@pytest.mark.benchmark(group="dcf-monte-carlo")
+@pytest.mark.parametrize("n_paths", [10_000, 100_000, 1_000_000])
+def test_dcf_monte_carlo(benchmark, n_paths):
+    benchmark.extra_info.update(cells=n_paths)
+    dist = benchmark(monte_carlo, 1000.0, 5, (0.10, 0.01), (0.05, 0.01), (0.03, 0.005), n_paths=n_paths, seed=0)
+    assert dist.values.size > 0
+
+
+# -- pages/5: beta ----------------------------------------------------------------
+
+@pytest.mark.benchmark(group="beta-table")
+def test_beta_table(benchmark, universe):
+    def run():
+        returns = aligned_returns(universe)
+        return beta_table(returns.drop(columns=MARKET), returns[MARKET])
+
+    table = benchmark(run)
+    assert table["Beta"].notna().any()
+
+
+@pytest.mark.benchmark(group="rolling-beta")
+def test_rolling_beta(benchmark, universe):
+    returns = aligned_returns(universe)
+    result = benchmark(rolling_beta, returns.drop(columns=MARKET), returns[MARKET], 60)
+    assert list(result.columns) == list(universe.columns.drop(MARKET))
+
+
+# -- all pages: exchange-calendar alignment ------------------------------------------
+
+@pytest.mark.benchmark(group="align-exchanges")
+def test_align_mixed_exchanges(benchmark, universe):
+    prices = universe.copy()
+    half = prices.shape[1] // 2
+    prices.columns = [c.replace(".JK", "") if i < half else c for i, c in enumerate(prices.columns)]
+    prices.iloc[::23, :half] = np.nan      # US holidays
+    prices.iloc[5::31, half:] = np.nan     # IDX holidays
+
+    def run():
+        clear_alignment()
+        return align(prices, "intersect")
+
+    aligned = benchmark(run)
+    assert len(aligned.calendar) < len(prices) and aligned.sessions.loc[aligned.calendar].all(axis=None)
+
+
+# -- pages/6: return statistics ---------------------------------------------------
+
+@pytest.mark.benchmark(group="peer-stats")
+def test_peer_stats(benchmark, universe):
+    prices = _stocks(universe)
+
+    def run():
+        stats = DatasetStats(prices)
+        return stats.daily_mean, stats.daily_std, stats.corr, stats.cov("sample")
+
+    mean, std, corr, _ = benchmark(run)
+    assert corr.shape == (prices.shape[1], prices.shape[1])
+
+
+@pytest.mark.benchmark(group="peer-metrics")
+def test_peer_metrics(benchmark, universe):
+    def run():
+        clear_alignment()
+        return peer_metrics(_stocks(universe), market=universe[MARKET], risk_free_rate=0.04)
+
+    table = benchmark(run)
+    assert table["Sharpe"].notna().all()
+
+
+def test_peer_metrics_skip_suspension():
+    days = pd.bdate_range("2024-01-01", periods=120)
+    rng = np.random.default_rng(7)
+    prices = pd.DataFrame(100 * np.exp(rng.normal(0, 0.01, (120, 2)).cumsum(axis=0)), index=days,
+                          columns=["BBCA.JK", "BBRI.JK"])
+    prices.iloc[60:70, 1] = np.nan                  # BBRI suspended for two weeks ...
+    prices.iloc[70:, 1] *= 1.5                      # ... and reopens 50% higher
+    expected = prices["BBRI.JK"].pct_change(fill_method=None).dropna()
+
+    table = peer_metrics(prices, market=prices["BBCA.JK"].rename("^JKSE"))
+    assert table.loc["BBRI.JK", "Observasi"] == len(expected)
+    assert np.isclose(table.loc["BBRI.JK", "Volatilitas"], expected.std() * np.sqrt(252))
+    assert table.loc["BBRI.JK", "CVaR 95%"] < 0.05
+
+
+@pytest.mark.benchmark(group="risk-table")
+def test_risk_table(benchmark, universe):
+    table = benchmark(risk_table, _stocks(universe))
+    assert (table["CVaR 95% (Historis)"] >= table["VaR 95% (Historis)"]).all()
+
+
+@pytest.mark.benchmark(group="rolling-drawdown")
+def test_rolling_drawdown(benchmark, universe):
+    prices = _stocks(universe)
+    result = benchmark(rolling_drawdown, prices, 63)
+    expected = 1 - prices.ffill() / prices.ffill().rolling(63, min_periods=1).max()
+    assert np.allclose(result, expected, equal_nan=True)
+
+
+@pytest.mark.benchmark(group="peer-ranking")
+def test_peer_ranking(benchmark, universe):
+    metrics = peer_metrics(_stocks(universe), market=universe[MARKET])
+    sectors = pd.Series(np.arange(len(metrics)) % 11, index=metrics.index).astype(str)
+
+    def run():
+        bench = PeerBenchmark(metrics, sectors)
+        return bench.top("Sharpe", 10), bench.percentiles(), bench.within_sector("Sharpe")
+
+    top, _, within = benchmark(run)
+    assert len(top) == min(10, len(metrics)) and within["Jumlah di Sektor"].sum() > 0
+
+
+# -- ultra_portfolio.py / pages/6: correlation -------------------------------------
+
+@pytest.mark.benchmark(group="correlation-matrix")
+def test_correlation_matrix(benchmark, universe):
+    returns = aligned_returns(_stocks(universe))
+    corr = benchmark(correlation_matrix, returns)
+    assert corr.shape == (returns.shape[1], returns.shape[1])
+
+
+@pytest.mark.benchmark(group="correlation-cluster")
+def test_correlation_cluster(benchmark, universe):
+    corr = correlation_matrix(aligned_returns(_stocks(universe)))
+    order = benchmark(cluster_order, corr.to_numpy())
+    assert sorted(order) == list(range(len(corr)))
+    assert len(top_pairs(corr, k=5)) == min(5, len(corr) * (len(corr) - 1) // 2)
+
+
+# -- pages/3: risk-profile scoring ------------------------------------------------
+
+@pytest.mark.benchmark(group="risk-profile-batch")
+@pytest.mark.parametrize("clients", [10_000, 200_000])
+def test_risk_profile_batch(benchmark, clients):
+    model = RiskModel()
+    rng = np.random.default_rng(0)
+    book = pd.DataFrame({
+        "usia": rng.integers(18, 76, clients),
+        **{f: rng.choice(model.options(f), clients) for f in ("pengalaman", "kebutuhan", "toleransi_risiko")},
+    })
+    benchmark.extra_info.update(cells=clients)
+    result = benchmark(model.evaluate, book)
+    assert result["Skor"].notna().all()
+
+
+# -- all pages: result cache ------------------------------------------------------
+
+@pytest.mark.benchmark(group="result-cache-hit")
+def test_result_cache_hit(benchmark, universe):
+    cache = ResultCache()
+    cached = memoize(lambda prices, window: prices.tail(window), cache=cache)
+    cached(universe, 20)
+    result = benchmark(cached, universe, 20)
+    assert len(result) == 20 and cache.stats()["Miss"].sum() == 1
+
+
+# -- all pages: price store -------------------------------------------------------
+
+def test_price_store_failed_chunk_stays_missing(tmp_path):
+    days = pd.bdate_range("2024-02-01", "2024-03-08")
+    prices = pd.DataFrame({"AAA": np.linspace(10, 11, len(days)), "BBB": np.linspace(5, 6, len(days))},
+                          index=days)
+    down = False
+
+    def transport(tickers, field, start, end):
+        if down:
+            raise ConnectionError("network blip")
+        return prices.loc[start:end - pd.Timedelta(days=1), list(tickers)]
+
+    clock = lambda: pd.Timestamp("2024-03-09 12:00", tz="UTC")
+    store = PriceStore(tmp_path, fetcher=ChunkedDownloader(transport, max_retries=0, sleep=lambda s: None),
+                       clock=clock)
+    store.get(["AAA"], "2024-02-01", "2024-03-04")
+    down = True
+    before = store.missing("AAA", "2024-02-01", "2024-03-07")
+    store.get(["AAA"], "2024-02-01", "2024-03-07")
+    assert store.missing("AAA", "2024-02-01", "2024-03-07") == before
+    assert store.get(["BBB"], "2024-02-01", "2024-03-07").empty      # not taken for an unknown symbol
+
+    down = False
+    recovered = store.get(["AAA", "BBB"], "2024-02-01", "2024-03-07")
+    assert recovered.index[-1] == pd.Timestamp("2024-03-06") and recovered.notna().all(axis=None)
+
+
+def test_prewarm_serves_page_calls(tmp_path):
+    days = pd.bdate_range("2022-12-01", "2024-03-08")
+    rng = np.random.default_rng(3)
+    prices = pd.DataFrame(100 * np.exp(rng.normal(0, 0.01, (len(days), 3)).cumsum(axis=0)), index=days,
+                          columns=["BBCA.JK", "BBRI.JK", "^JKSE"])
+    now = pd.Timestamp("2024-03-08 12:00", tz="UTC")       # after the IDX close
+    store = PriceStore(tmp_path, fetcher=lambda tickers, field, start, end:
+                       prices.loc[start:end - pd.Timedelta(days=1), list(tickers)], clock=lambda: now)
+    scheduler = PrewarmScheduler([
+        Watchlist("simulasi", ["BBCA.JK", "BBRI.JK"], start="2023-01-02", analyses=("stats",)),
+        Watchlist("peers", ["BBCA.JK", "BBRI.JK"], market="^JKSE", start="2023-01-01", end="2024-01-01",
+                  analyses=("peers",), risk_free_rate=0.06),
+    ], store=store, clock=lambda: now)
+    assert all(r.error is None for r in scheduler.run_pending())
+
+    def hits():
+        table = default_cache().stats().set_index("Fungsi")
+        return table["Hit"].reindex(["stats_for", "peer_table"]).fillna(0)
+
+    before = hits()
+    # What pages 1 and 6 call with their inputs at their defaults.
+    data = load_prices("BBCA.JK,BBRI.JK".upper().split(","), pd.Timestamp("2023-01-02").date(),
+                       today(now).date(), store=store)
+    stats_for(data)
+    data = load_prices(["BBCA.JK", "BBRI.JK", "^JKSE"], pd.Timestamp("2023-01-01").date(),
+                       pd.Timestamp("2024-01-01").date(), store=store)
+    peer_table(data, "^JKSE", 6.0 / 100)
+    assert (hits() - before).tolist() == [1, 1]
@@ -3,12 +3,19 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
-import plotly.express as px
 import plotly.graph_objects as go
-from scipy.optimize import minimize
+from portfolio_core import instrument
+from portfolio_core.backtest import backtest
+from portfolio_core.charts import cached_line_figure
+from portfolio_core.optimizer import efficient_frontier
+from portfolio_core.loader import PriceDataError, load_prices, today
+from portfolio_core.result_cache import memoize, price_ttl
+from portfolio_core.scenarios import path_metrics
+from portfolio_core.stats import TRADING_DAYS, stats_for
+from portfolio_core.walkforward import walk_forward
 
 st.set_page_config(page_title="Simulasi dan Risiko", layout="wide")
+run = instrument.start_run("simulasi_dan_risiko", enabled=st.query_params.get("debug") == "1" or None)
 st.title("📈 Simulasi & Risiko")
 
 st.markdown("""
@@ -17,41 +24,45 @@ Fitur ini memungkinkan Anda untuk:
 - Analisis korelasi antar saham
 - Simulasi rebalancing portofolio
 - Alokasi aset optimal berbasis model Markowitz
+- Uji walk-forward (out-of-sample) dari alokasi Markowitz
 """)
 
 # Input ticker
 tickers = st.text_input("Masukkan ticker saham (pisah dengan koma)", "BBRI.JK,BMRI.JK").upper().split(',')
 start_date = st.date_input("Tanggal mulai", pd.to_datetime("2019-01-01"))
-end_date = st.date_input("Tanggal akhir", pd.to_datetime("today"))
+end_date = st.date_input("Tanggal akhir", today())
 
-@st.cache_data
+@instrument.cached("fetch_data", cache=memoize(ttl=lambda tickers, start, end: price_ttl(tickers, end)))
 def fetch_data(tickers, start, end):
-    df = yf.download(tickers, start=start, end=end, group_by='ticker', auto_adjust=True)
-    if len(tickers) == 1:
-        return pd.DataFrame({tickers[0]: df['Close']})
-    else:
-        close_prices = pd.DataFrame()
-        for ticker in tickers:
-            try:
-                close_prices[ticker] = df[ticker]['Close']
-            except:
-                pass
-        return close_prices.dropna(axis=1, how='all')
-
-data = fetch_data(tickers, start_date, end_date)
+    return load_prices(tickers, start, end)
+
+@instrument.cached("walk_forward", cache=memoize)
+def compute_walk_forward(prices, window, freq, objective, expanding, cost):
+    return walk_forward(prices, window=window, freq=freq, objective=objective, expanding=expanding,
+                        risk_free_rate=0.03, cost=cost)
+
+try:
+    data = fetch_data(tickers, start_date, end_date)
+    data_error = None
+except PriceDataError as e:
+    data, data_error = pd.DataFrame(), str(e)
 
 if data.empty:
-    st.warning("Tidak ada data yang tersedia. Periksa kembali ticker dan tanggal.")
+    st.warning(f"Tidak ada data yang tersedia. Periksa kembali ticker dan tanggal. ({data_error})" if data_error
+               else "Tidak ada data yang tersedia. Periksa kembali ticker dan tanggal.")
 else:
     st.success("✅ Data berhasil diambil!")
-    fig = px.line(data, title="📈 Harga Saham Historis")
-    fig.update_layout(xaxis_title="Tanggal", yaxis_title="Harga", legend_title="Ticker")
-    st.plotly_chart(fig, use_container_width=True)
+    if data.attrs.get("missing"):
+        st.info(f"Ticker tanpa data: {', '.join(data.attrs['missing'])}")
+    with instrument.span("grafik_harga", "render"):
+        fig = cached_line_figure(data, title="📈 Harga Saham Historis", xaxis_title="Tanggal",
+                                 yaxis_title="Harga", legend_title="Ticker")
+        st.plotly_chart(fig, use_container_width=True)
 
     # Simulasi Rebalancing
     st.subheader("🔁 Simulasi Rebalancing Portofolio")
     if len(data.columns) >= 2:
-        returns = data.pct_change().dropna()
+        returns = stats_for(data).returns
 
         st.markdown("### 🎚️ Sesuaikan Bobot Manual (Slider)")
         manual_weights = []
@@ -65,39 +76,132 @@ else:
         else:
             weights = np.array(manual_weights) / sum_weights
 
-        initial_value = 10000
-        rebalance_value = [initial_value]
+        frekuensi = {
+            "Harian": "daily",
+            "Bulanan": "monthly",
+            "Kuartalan": "quarterly",
+            "Tahunan": "annual",
+            "Ambang Drift (5%)": "threshold",
+            "Tanpa Rebalancing": "none",
+        }
+        col_freq, col_cost = st.columns(2)
+        with col_freq:
+            pilihan_frekuensi = st.selectbox("Frekuensi rebalancing", list(frekuensi.keys()))
+        with col_cost:
+            biaya_transaksi = st.number_input("Biaya transaksi (%)", min_value=0.0, max_value=5.0, value=0.0, step=0.05) / 100
 
-        for i in range(1, len(returns)):
-            daily_returns = (returns.iloc[i].values + 1)
-            portfolio_value = rebalance_value[-1] * np.dot(daily_returns, weights)
-            rebalance_value.append(portfolio_value)
+        initial_value = 10000
+        with instrument.span("backtest_rebalancing"):
+            rebal = backtest(data, weights, freq=frekuensi[pilihan_frekuensi], cost=biaya_transaksi, initial=initial_value)
 
-        port_series = pd.Series(rebalance_value, index=returns.index)
-        st.line_chart(port_series.rename("Portofolio Value"))
+        with instrument.span("grafik_rebalancing", "render"):
+            st.line_chart(rebal.values.rename("Portofolio Value"))
+        col_turn, col_biaya = st.columns(2)
+        col_turn.metric("Jumlah Rebalancing", f"{len(rebal.turnover)}", f"Turnover total {rebal.turnover.sum():.2f}x", delta_color="off")
+        col_biaya.metric("Total Biaya Transaksi", f"{rebal.costs:,.2f}")
 
     # Alokasi Optimal (Markowitz)
     st.subheader("📌 Alokasi Aset Optimal (Model Markowitz)")
     if len(data.columns) >= 2:
-        returns = data.pct_change().dropna()
-        mean_returns = returns.mean() * 252
-        cov_matrix = returns.cov() * 252
-
-        def neg_sharpe(weights, mean_returns, cov_matrix, risk_free_rate=0.03):
-            weights = np.array(weights)
-            ret = np.dot(weights, mean_returns)
-            vol = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-            return -(ret - risk_free_rate) / vol
-
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-        bounds = tuple((0, 1) for _ in range(len(data.columns)))
-        initial = len(data.columns) * [1. / len(data.columns)]
-
-        result = minimize(neg_sharpe, initial, args=(mean_returns, cov_matrix), method='SLSQP', bounds=bounds, constraints=constraints)
-
-        if result.success:
-            opt_weights = result.x
-            df_alloc = pd.DataFrame({"Ticker": data.columns, "Bobot Optimal": opt_weights})
-            st.dataframe(df_alloc.style.format({"Bobot Optimal": "{:.2%}"}), use_container_width=True)
+        estimator = {
+            "Sampel": "sample",
+            "Ledoit-Wolf (shrinkage)": "ledoit_wolf",
+            "EWMA (λ = 0.94)": "ewma",
+        }
+        pilihan_estimator = st.selectbox("Estimator kovarians", list(estimator.keys()))
+        return_stats = stats_for(data)
+        mean_returns = return_stats.mean
+        cov_matrix = return_stats.cov(estimator[pilihan_estimator])
+
+        try:
+            with instrument.span("efficient_frontier"):
+                frontier = efficient_frontier(mean_returns, cov_matrix, risk_free_rate=0.03)
+        except (np.linalg.LinAlgError, ValueError):
+            frontier = None
+
+        if frontier is not None:
+            min_vol = float(frontier.volatilities[0])
+            max_vol = max(float(frontier.volatilities[-1]), min_vol + 1e-4)
+            sharpe_vol = float(np.sqrt(frontier.max_sharpe @ cov_matrix.values @ frontier.max_sharpe))
+            target_vol = st.slider("🎯 Target volatilitas tahunan", min_vol, max_vol,
+                                   min(max(sharpe_vol, min_vol), max_vol), step=0.005)
+
+            df_alloc = pd.DataFrame({
+                "Ticker": data.columns,
+                "Bobot Optimal": frontier.max_sharpe,
+                "Minimum Varians": frontier.min_variance,
+                "Target Volatilitas": frontier.target_volatility(target_vol),
+            })
+            st.dataframe(df_alloc.style.format({c: "{:.2%}" for c in df_alloc.columns[1:]}), use_container_width=True)
+
+            fig_ef = go.Figure()
+            fig_ef.add_trace(go.Scatter(x=frontier.volatilities, y=frontier.returns, mode="lines", name="Efficient Frontier"))
+            for label, w in [("Max Sharpe", frontier.max_sharpe), ("Minimum Varians", frontier.min_variance)]:
+                fig_ef.add_trace(go.Scatter(x=[np.sqrt(w @ cov_matrix.values @ w)], y=[w @ mean_returns.values],
+                                            mode="markers", marker=dict(size=12), name=label))
+            fig_ef.update_layout(title="📐 Efficient Frontier", xaxis_title="Volatilitas", yaxis_title="Return Tahunan")
+            with instrument.span("grafik_frontier", "render"):
+                st.plotly_chart(fig_ef, use_container_width=True)
         else:
             st.error("Gagal menghitung alokasi optimal.")
+
+    # Walk-Forward
+    st.subheader("🚶 Uji Walk-Forward (Out-of-Sample)")
+    if len(data.columns) >= 2:
+        st.caption("Bobot dioptimasi ulang di setiap tanggal rebalancing hanya dari data sebelum tanggal itu, "
+                   "lalu ditahan sampai rebalancing berikutnya.")
+        tujuan = {"Max Sharpe": "max_sharpe", "Minimum Varians": "min_variance"}
+        frekuensi_wf = {"Bulanan": "monthly", "Kuartalan": "quarterly", "Tahunan": "annual"}
+        col_obj, col_win, col_len = st.columns(3)
+        with col_obj:
+            pilihan_tujuan = st.selectbox("Tujuan optimasi", list(tujuan.keys()))
+            pilihan_frek_wf = st.selectbox("Frekuensi re-optimasi", list(frekuensi_wf.keys()))
+        with col_win:
+            jenis_jendela = st.radio("Jendela estimasi", ["Rolling", "Expanding"], horizontal=True)
+            biaya_wf = st.number_input("Biaya transaksi walk-forward (%)", min_value=0.0, max_value=5.0,
+                                       value=0.1, step=0.05) / 100
+        with col_len:
+            panjang_tahun = st.slider("Panjang jendela (tahun)", 0.5, 5.0, 1.0, step=0.5)
+        window = int(panjang_tahun * TRADING_DAYS)
+
+        wf = None
+        try:
+            with instrument.span("walk_forward"):
+                wf = compute_walk_forward(data, window, frekuensi_wf[pilihan_frek_wf], tujuan[pilihan_tujuan],
+                                          jenis_jendela == "Expanding", biaya_wf)
+        except np.linalg.LinAlgError:
+            st.warning("Bobot tidak dapat dihitung karena matriks kovarians jendela estimasi singular (saham "
+                       "duplikat atau jendela lebih pendek dari jumlah saham). Perpanjang jendela atau hapus "
+                       "saham yang bergerak identik.")
+        except ValueError:
+            st.warning("Riwayat data belum cukup untuk jendela estimasi pertama. Perpendek jendela atau "
+                       "mundurkan tanggal mulai.")
+
+        if wf is not None:
+            # Benchmarks over the same out-of-sample period. The static
+            # max-Sharpe weights use the full sample, i.e. future data.
+            periode = data.ffill().dropna().loc[wf.values.index[0]:]
+            n = periode.shape[1]
+            kurva = {"Walk-Forward": wf.values}
+            if frontier is not None:
+                kurva["Max Sharpe Statis (look-ahead)"] = backtest(
+                    periode, frontier.max_sharpe, freq=frekuensi_wf[pilihan_frek_wf], cost=biaya_wf).values
+            kurva["Bobot Sama"] = backtest(periode, np.full(n, 1.0 / n), freq=frekuensi_wf[pilihan_frek_wf],
+                                           cost=biaya_wf).values
+            with instrument.span("grafik_walk_forward", "render"):
+                st.line_chart(pd.DataFrame(kurva))
+
+            df_wf = pd.DataFrame({nama: path_metrics(v) for nama, v in kurva.items()}).T
+            df_wf.loc["Walk-Forward", "Turnover Rata-rata"] = wf.turnover.mean() if len(wf.turnover) else 0.0
+            df_wf.loc["Walk-Forward", "Total Biaya"] = wf.costs
+            st.dataframe(df_wf.style.format({"Nilai Akhir": "{:,.2f}", "CAGR": "{:.2%}", "Volatilitas": "{:.2%}",
+                                             "Max Drawdown": "{:.2%}", "Turnover Rata-rata": "{:.2f}x",
+                                             "Total Biaya": "{:,.2f}"}, na_rep="-"),
+                         use_container_width=True)
+
+            with instrument.span("grafik_bobot_walk_forward", "render"):
+                st.area_chart(wf.weights)
+            st.caption(f"{len(wf.weights)} kali re-optimasi; rata-rata dan kovarians sampel dari "
+                       f"{'seluruh riwayat' if jenis_jendela == 'Expanding' else f'{window} hari'} terakhir.")
+
+instrument.debug_panel(run)
@@ -3,8 +3,11 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
+from portfolio_core import instrument
+from portfolio_core.goals import projection_path, required_contribution, simulate_goal
 
 st.set_page_config(page_title="Tujuan Finansial", layout="wide")
+run = instrument.start_run("tujuan_finansial", enabled=st.query_params.get("debug") == "1" or None)
 st.title("🎯 Tujuan Finansial")
 
 st.markdown("""
@@ -32,10 +35,10 @@ with col2:
     return_investasi = st.slider("Estimasi imbal hasil tahunan (%)", 0.0, 20.0, 8.0) / 100
     kontribusi_rutin = st.number_input("Kontribusi bulanan saat ini (Rp):", min_value=0, value=200000)
 
-# Perhitungan
-future_value_saldo = saldo_sekarang * ((1 + return_investasi) ** target_tahun)
-future_value_kontribusi = kontribusi_rutin * (((1 + return_investasi/12) ** (target_tahun*12) - 1) / (return_investasi/12))
-total_future = future_value_saldo + future_value_kontribusi
+# Perhitungan (bunga majemuk bulanan, aman untuk return 0%)
+bulan_target = target_tahun * 12
+proyeksi = projection_path(saldo_sekarang, kontribusi_rutin, return_investasi, bulan_target)
+total_future = proyeksi[-1]
 
 st.subheader("📊 Hasil Proyeksi")
 col3, col4 = st.columns(2)
@@ -45,17 +48,38 @@ with col3:
     st.metric("Selisih dari Target", f"Rp {total_future - target_dana:,.0f}", delta_color="inverse")
 
 with col4:
-    kebutuhan_bulanan = (target_dana - future_value_saldo) * (return_investasi/12) / (((1 + return_investasi/12) ** (target_tahun*12)) - 1)
-    if kebutuhan_bulanan < 0:
-        kebutuhan_bulanan = 0
+    kebutuhan_bulanan = required_contribution(target_dana, saldo_sekarang, return_investasi, bulan_target)
     st.metric("Kontribusi Bulanan Disarankan", f"Rp {kebutuhan_bulanan:,.0f}")
 
 # Visualisasi
 st.subheader("📈 Visualisasi Akumulasi Dana")
-proyeksi = []
-for bulan in range(target_tahun * 12 + 1):
-    nilai = saldo_sekarang * ((1 + return_investasi/12) ** bulan) + kontribusi_rutin * (((1 + return_investasi/12) ** bulan - 1) / (return_investasi/12))
-    proyeksi.append(nilai)
-
-df_proj = pd.DataFrame({"Bulan": list(range(len(proyeksi))), "Proyeksi Dana": proyeksi})
+df_proj = pd.DataFrame({"Bulan": np.arange(len(proyeksi)), "Proyeksi Dana": proyeksi})
 st.line_chart(df_proj.set_index("Bulan"))
+
+# Simulasi Monte Carlo
+st.subheader("🎲 Peluang Mencapai Target (Monte Carlo)")
+col5, col6 = st.columns(2)
+with col5:
+    volatilitas = st.slider("Volatilitas tahunan (%)", 0.0, 40.0, 12.0) / 100
+    inflasi = st.slider("Kenaikan kontribusi mengikuti inflasi (%/tahun)", 0.0, 10.0, 0.0) / 100
+    ekor_tebal = st.checkbox("Gunakan distribusi ekor tebal (Student-t, df=5)")
+with col6:
+    keyakinan = st.slider("Tingkat keyakinan kontribusi", 0.50, 0.99, 0.90, step=0.01)
+    jumlah_jalur = st.select_slider("Jumlah jalur simulasi", options=[1_000, 10_000, 50_000], value=10_000)
+
+with instrument.span("simulasi_tujuan"):
+    simulasi = simulate_goal(saldo_sekarang, kontribusi_rutin, bulan_target, return_investasi, volatilitas, target_dana,
+                             n_paths=jumlah_jalur, inflation=inflasi, fat_tails=5 if ekor_tebal else None,
+                             confidence=keyakinan, seed=42)
+
+col7, col8 = st.columns(2)
+col7.metric("Peluang Target Tercapai", f"{simulasi.probability:.1%}")
+col8.metric(f"Kontribusi Bulanan untuk Keyakinan {keyakinan:.0%}", f"Rp {simulasi.required:,.0f}")
+
+df_band = pd.DataFrame({f"P{p}": nilai for p, nilai in simulasi.bands.items()},
+                       index=pd.Index(simulasi.band_months, name="Bulan"))
+df_band["Target"] = target_dana
+st.line_chart(df_band)
+st.caption("Pita persentil (P5/P50/P95) menunjukkan kisaran hasil dari ribuan skenario pasar.")
+
+instrument.debug_panel(run)
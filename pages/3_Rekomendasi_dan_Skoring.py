@@ -1,8 +1,8 @@
 # Ultra Portfolio AI - Halaman Rekomendasi & Skoring
 
 import streamlit as st
-import numpy as np
 import pandas as pd
+from portfolio_core.risk_profile import INVALID, RiskModel, read_profiles
 
 st.set_page_config(page_title="Rekomendasi & Skoring", layout="wide")
 st.title("🤖 Rekomendasi & Skoring")
@@ -15,45 +15,75 @@ Fitur ini memanfaatkan AI dan parameter pribadi Anda untuk:
 - Memberikan peringatan risiko bila perlu
 """)
 
-# Profil risiko sederhana
+# Profil risiko: aturan skor berupa tabel (portfolio_core.risk_profile), sehingga
+# satu investor dan seluruh buku klien dinilai dengan model yang sama.
+model = RiskModel()
+
 st.subheader("🧠 Tes Profil Risiko")
 
 usia = st.slider("Berapa usia Anda?", 18, 75, 30)
-pengalaman = st.selectbox("Pengalaman Investasi:", ["Pemula", "Menengah", "Ahli"])
-kebutuhan = st.selectbox("Tujuan utama investasi Anda:", ["Pertumbuhan aset jangka panjang", "Pendapatan pasif rutin", "Likuiditas jangka pendek"])
-risk_tolerance = st.radio("Toleransi Risiko Anda:", ["Rendah", "Sedang", "Tinggi"])
-
-# Skor risiko
-skor = usia / 100
-if pengalaman == "Menengah": skor += 0.1
-if pengalaman == "Ahli": skor += 0.2
-if kebutuhan == "Pendapatan pasif rutin": skor -= 0.1
-if kebutuhan == "Likuiditas jangka pendek": skor -= 0.15
-if risk_tolerance == "Tinggi": skor += 0.2
-elif risk_tolerance == "Sedang": skor += 0.1
+pengalaman = st.selectbox("Pengalaman Investasi:", model.options("pengalaman"))
+kebutuhan = st.selectbox("Tujuan utama investasi Anda:", model.options("kebutuhan"))
+risk_tolerance = st.radio("Toleransi Risiko Anda:", model.options("toleransi_risiko"))
 
-skor = min(max(skor, 0), 1)
+profil = pd.DataFrame([{"usia": usia, "pengalaman": pengalaman, "kebutuhan": kebutuhan,
+                        "toleransi_risiko": risk_tolerance}])
+hasil = model.evaluate(profil).iloc[0]
+skor = hasil["Skor"]
 
 st.metric("📊 Skor Profil Risiko Anda", f"{skor:.2f}")
 
-# Rekomendasi Alokasi
+# Rekomendasi Alokasi: bergeser mulus mengikuti skor (glide path), bukan tiga kelompok tetap.
 st.subheader("🗂️ Rekomendasi Alokasi Aset")
-if skor < 0.3:
-    alokasi = {"Obligasi": 70, "Pasar Uang": 20, "Saham": 10}
-elif skor < 0.6:
-    alokasi = {"Obligasi": 40, "Pasar Uang": 20, "Saham": 40}
-else:
-    alokasi = {"Obligasi": 20, "Pasar Uang": 10, "Saham": 70}
-
-df_alokasi = pd.DataFrame.from_dict(alokasi, orient='index', columns=["% Alokasi"])
+# Alokasi sudah dihitung oleh evaluate(); tidak perlu memanggil allocate() lagi.
+alokasi = hasil[[f"{c} (%)" for c in model.glide_path]].rename(lambda c: c.removesuffix(" (%)"))
+alokasi = alokasi.astype("float64").round(1)
+
+df_alokasi = alokasi.to_frame("% Alokasi")
 st.bar_chart(df_alokasi)
 st.dataframe(df_alokasi.T)
 
 # Risiko & Catatan
 st.subheader("⚠️ Catatan Risiko")
-if skor < 0.3:
-    st.warning("⚠️ Anda termasuk investor konservatif. Prioritaskan stabilitas dan hindari saham spekulatif.")
-elif skor < 0.7:
-    st.info("ℹ️ Anda tergolong moderat. Diversifikasi adalah kunci.")
-else:
-    st.success("🚀 Anda termasuk agresif. Potensi return tinggi, namun tetap waspada terhadap volatilitas.")
\ No newline at end of file
+catatan = {
+    "Konservatif": "⚠️ Anda termasuk investor konservatif. Prioritaskan stabilitas dan hindari saham spekulatif.",
+    "Moderat": "ℹ️ Anda tergolong moderat. Diversifikasi adalah kunci.",
+    "Agresif": "🚀 Anda termasuk agresif. Potensi return tinggi, namun tetap waspada terhadap volatilitas.",
+}
+getattr(st, hasil["Level Peringatan"])(catatan.get(hasil["Profil"], hasil["Profil"]))
+
+# Skoring batch untuk seluruh buku klien
+st.subheader("📂 Skoring Batch Klien")
+st.caption("Unggah CSV berisi kolom usia, pengalaman, kebutuhan dan toleransi_risiko (satu baris per klien). "
+           "Semua klien dinilai sekaligus dengan aturan yang sama seperti tes di atas.")
+contoh = pd.DataFrame([
+    {"klien": "K-001", "usia": 28, "pengalaman": "Pemula", "kebutuhan": "Pertumbuhan aset jangka panjang",
+     "toleransi_risiko": "Tinggi"},
+    {"klien": "K-002", "usia": 55, "pengalaman": "Ahli", "kebutuhan": "Pendapatan pasif rutin",
+     "toleransi_risiko": "Rendah"},
+])
+st.download_button("⬇️ Contoh CSV klien", contoh.to_csv(index=False).encode("utf-8"),
+                   file_name="contoh_klien.csv", mime="text/csv")
+
+col_klien, col_aturan = st.columns(2)
+with col_klien:
+    file_klien = st.file_uploader("CSV profil klien", type="csv")
+with col_aturan:
+    file_aturan = st.file_uploader("CSV aturan skor (opsional: field, value, points)", type="csv")
+    st.download_button("⬇️ Aturan skor saat ini", model.rules.to_csv(index=False).encode("utf-8"),
+                       file_name="aturan_skor.csv", mime="text/csv")
+
+if file_klien is not None:
+    try:
+        batch_model = RiskModel.from_csv(file_aturan) if file_aturan is not None else model
+        skor_batch = batch_model.evaluate(read_profiles(file_klien))
+    except (ValueError, KeyError, pd.errors.ParserError) as e:
+        st.error(f"Gagal memproses CSV: {e}")
+    else:
+        tidak_valid = int((skor_batch["Profil"] == INVALID).sum())
+        if tidak_valid:
+            st.warning(f"⚠️ {tidak_valid} klien memiliki jawaban kosong atau tidak dikenal dan tidak diberi skor.")
+        st.dataframe(skor_batch["Profil"].value_counts().rename("Jumlah Klien").to_frame().T)
+        st.dataframe(skor_batch, use_container_width=True)
+        st.download_button("⬇️ Unduh hasil skoring", skor_batch.to_csv(index=False).encode("utf-8"),
+                           file_name="hasil_skoring_klien.csv", mime="text/csv")
@@ -3,10 +3,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from portfolio_core import instrument
+from portfolio_core.result_cache import memoize
+from portfolio_core.valuation import monte_carlo, project_fcff, sensitivity_grid
 
 st.set_page_config(page_title="Penilaian Damodaran", layout="wide")
+run = instrument.start_run("penilaian_damodaran", enabled=st.query_params.get("debug") == "1" or None)
 st.title("📋 Penilaian Damodaran")
 
 st.markdown("""
@@ -24,20 +26,16 @@ growth_rate = st.number_input("Masukkan growth rate (%)", min_value=0.0, max_val
 fcff = st.number_input("Masukkan FCFF saat ini (dalam juta)", value=1000.0)
 years = st.slider("Horizon tahun proyeksi", 1, 10, 5)
 
-original_fcff = fcff  # simpan untuk hitung terminal value nanti
+original_fcff = fcff  # simpan untuk sensitivitas & Monte Carlo
 
-fcff_series = []
-pv_series = []
-data = []
-for i in range(1, years+1):
-    fcff = fcff * (1 + growth_rate)
-    discount_factor = (1 + wacc) ** i
-    present_value = fcff / discount_factor
-    data.append({"Tahun": f"Tahun {i}", "FCFF": fcff, "Present Value": present_value})
-    fcff_series.append(fcff)
-    pv_series.append(present_value)
+fcff_series, pv_series = project_fcff(original_fcff, growth_rate, wacc, years)
+fcff = fcff_series[-1]  # FCFF tahun terakhir untuk terminal value
 
-df_fcff = pd.DataFrame(data)
+df_fcff = pd.DataFrame({
+    "Tahun": [f"Tahun {i}" for i in range(1, years+1)],
+    "FCFF": fcff_series,
+    "Present Value": pv_series,
+})
 st.dataframe(df_fcff.style.format({col: "{:.2f}" for col in df_fcff.select_dtypes(include=[np.number]).columns}), use_container_width=True)
 
 npv = df_fcff["Present Value"].sum()
@@ -61,26 +59,32 @@ st.caption("Simulasi ini merupakan pendekatan sederhana untuk memahami valuasi b
 
 # 🔄 Sensitivitas WACC dan Pertumbuhan
 st.subheader("📊 Sensitivitas terhadap WACC & Pertumbuhan")
-wacc_range = np.linspace(wacc - 0.03, wacc + 0.03, 7)
-growth_range = np.linspace(growth_rate - 0.02, growth_rate + 0.02, 5)
-
-sensitivity_matrix = pd.DataFrame(index=[f"{g*100:.1f}%" for g in growth_range], columns=[f"{w*100:.1f}%" for w in wacc_range])
-
-for g in growth_range:
-    for w in wacc_range:
-        tv = fcff * (1 + g) / (w - g) if w > g else np.nan
-        pv_tv = tv / ((1 + w) ** years) if not np.isnan(tv) else np.nan
-        total_val = npv + pv_tv if not np.isnan(pv_tv) else np.nan
-        sensitivity_matrix.loc[f"{g*100:.1f}%", f"{w*100:.1f}%"] = round(total_val, 2) if total_val else np.nan
+resolusi = {"7 × 5": (7, 5), "25 × 25": (25, 25), "100 × 100": (100, 100)}
+pilihan_resolusi = st.select_slider("Resolusi grid (WACC × growth)", options=list(resolusi.keys()))
+n_wacc, n_growth = resolusi[pilihan_resolusi]
+wacc_range = np.linspace(wacc - 0.03, wacc + 0.03, n_wacc)
+growth_range = np.linspace(growth_rate - 0.02, growth_rate + 0.02, n_growth)
+
+# Seluruh grid dihitung sekaligus: WACC mendiskon tahap eksplisit dan TV, growth = terminal growth.
+with instrument.span("grid_sensitivitas"):
+    grid = sensitivity_grid(original_fcff, wacc_range, growth_range, growth_rate, years)
+sensitivity_matrix = pd.DataFrame(np.round(grid, 2),
+                                  index=[f"{g*100:.2f}%" for g in growth_range],
+                                  columns=[f"{w*100:.2f}%" for w in wacc_range])
 
 st.write("### Matriks Sensitivitas Total Nilai Wajar")
 st.dataframe(sensitivity_matrix)
 
+# Pustaka grafik baru dimuat setelah tabel tampil, agar render pertama tidak menunggu.
+import matplotlib.pyplot as plt
+import seaborn as sns
+
 fig, ax = plt.subplots()
-sns.heatmap(sensitivity_matrix.astype(float), annot=True, fmt=".0f", cmap="YlGnBu", ax=ax)
+sns.heatmap(sensitivity_matrix, annot=n_wacc * n_growth <= 100, fmt=".0f", cmap="YlGnBu", ax=ax)
 plt.xlabel("WACC")
 plt.ylabel("Growth Rate")
-st.pyplot(fig)
+with instrument.span("heatmap_sensitivitas", "render"):
+    st.pyplot(fig)
 
 # 📊 Tambahan: Visualisasi Proyeksi FCFF & PV
 st.subheader("📈 Grafik Proyeksi FCFF dan Present Value")
@@ -94,3 +98,45 @@ ax2.legend()
 st.pyplot(fig2)
 
 st.caption("Grafik ini membantu memahami bagaimana pertumbuhan FCFF dibandingkan dengan nilai sekarangnya tiap tahun.")
+
+# 🎲 Simulasi Monte Carlo
+@instrument.cached("monte_carlo_dcf", stage="compute", cache=memoize)
+def simulate_fair_value(fcff, years, wacc, growth, margin, n_paths, seed):
+    return monte_carlo(fcff, years, wacc, growth, margin=margin, n_paths=n_paths, seed=seed)
+
+st.subheader("🎲 Distribusi Nilai Wajar (Monte Carlo)")
+col_mc1, col_mc2, col_mc3 = st.columns(3)
+with col_mc1:
+    wacc_sd = st.number_input("Deviasi standar WACC (%)", min_value=0.0, max_value=10.0, value=1.0) / 100
+with col_mc2:
+    growth_sd = st.number_input("Deviasi standar growth (%)", min_value=0.0, max_value=10.0, value=1.0) / 100
+with col_mc3:
+    margin_sd = st.number_input("Deviasi standar margin (%)", min_value=0.0, max_value=50.0, value=5.0) / 100
+n_paths = st.select_slider("Jumlah skenario", options=[1_000, 10_000, 100_000], value=10_000)
+
+distribusi = simulate_fair_value(original_fcff, years, (wacc, wacc_sd), (growth_rate, growth_sd),
+                                 (1.0, margin_sd), n_paths, 42)
+
+if distribusi.values.size:
+    persentil = distribusi.percentiles((5, 50, 95))
+    col_p5, col_p50, col_p95, col_prob = st.columns(4)
+    col_p5.metric("P5", f"${persentil[5]:,.0f} juta")
+    col_p50.metric("Median", f"${persentil[50]:,.0f} juta")
+    col_p95.metric("P95", f"${persentil[95]:,.0f} juta")
+    col_prob.metric("Peluang > Nilai Pasar", f"{distribusi.probability_above(market_price):.1%}")
+
+    fig3, ax3 = plt.subplots()
+    batas = np.percentile(distribusi.values, [1, 99])
+    ax3.hist(np.clip(distribusi.values, *batas), bins=60, color="#3b82f6", alpha=0.8)
+    ax3.axvline(market_price, color="red", linestyle="--", label="Nilai pasar")
+    ax3.set_xlabel("Total Nilai Wajar (juta)")
+    ax3.set_ylabel("Frekuensi")
+    ax3.legend()
+    with instrument.span("histogram_monte_carlo", "render"):
+        st.pyplot(fig3)
+    if distribusi.n_invalid:
+        st.caption(f"{distribusi.n_invalid:,} skenario diabaikan karena WACC ≤ growth (nilai terminal tak hingga).")
+else:
+    st.warning("Semua skenario memiliki WACC ≤ growth. Sesuaikan asumsi.")
+
+instrument.debug_panel(run)
@@ -3,12 +3,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import yfinance as yf
-from sklearn.linear_model import LinearRegression
+from portfolio_core import instrument
+from portfolio_core.analysis import market_betas
+from portfolio_core.beta import fetch_leverage, risk_quadrant, unlevered_beta
+from portfolio_core.loader import PriceDataError, load_prices
+from portfolio_core.result_cache import memoize, price_ttl
 
 st.set_page_config(page_title="Damodaran Risk Matrix", layout="wide")
+run = instrument.start_run("damodaran_risk_matrix", enabled=st.query_params.get("debug") == "1" or None)
 st.title("📉 Damodaran Risk Matrix")
 
 st.markdown("""
@@ -20,41 +22,82 @@ Modul ini memungkinkan Anda:
 """)
 
 st.subheader("🧠 Hitung Beta Saham terhadap Pasar")
-ticker = st.text_input("Masukkan ticker saham (misal: BBCA.JK)", "BBCA.JK")
-market_index = st.text_input("Masukkan ticker indeks pasar (misal: ^JKSE)", "^JKSE")
+tickers_input = st.text_input("Masukkan ticker saham, pisah dengan koma (misal: BBCA.JK)", "BBCA.JK, BBRI.JK, BMRI.JK, TLKM.JK, ASII.JK")
+tickers = [t.strip().upper() for t in tickers_input.split(",") if t.strip()]
+market_index = st.text_input("Masukkan ticker indeks pasar (misal: ^JKSE)", "^JKSE").strip().upper()
 industry_beta = st.number_input("Masukkan rata-rata beta industri (opsional)", value=1.0)
 start_date = st.date_input("Tanggal awal", pd.to_datetime("2022-01-01"))
 end_date = st.date_input("Tanggal akhir", pd.to_datetime("2023-01-01"))
+rolling_window = st.slider("Jendela rolling beta (hari bursa)", 20, 250, 60)
 
-@st.cache_data
-def calculate_beta(stock_ticker, market_ticker, start, end):
-    df_stock = yf.download(stock_ticker, start=start, end=end)
-    df_market = yf.download(market_ticker, start=start, end=end)
-
-    if 'Adj Close' not in df_stock.columns or 'Adj Close' not in df_market.columns:
+@instrument.cached("calculate_beta", cache=memoize(
+    ttl=lambda stock_tickers, market_ticker, start, end, window: price_ttl(list(stock_tickers) + [market_ticker], end)))
+def calculate_beta(stock_tickers, market_ticker, start, end, window):
+    try:
+        prices = load_prices(list(stock_tickers) + [market_ticker], start, end)
+    except PriceDataError:
         return None
+    return market_betas(prices, market_ticker, window)
 
-    returns_stock = df_stock['Adj Close'].pct_change().dropna()
-    returns_market = df_market['Adj Close'].pct_change().dropna()
-
-    combined = pd.concat([returns_stock, returns_market], axis=1).dropna()
-    if combined.shape[0] < 30:
-        return None
+@instrument.cached("get_leverage", cache=memoize(ttl=24 * 3600))
+def get_leverage(tickers):
+    return fetch_leverage(tickers)
 
-    X = combined.iloc[:, 1].values.reshape(-1, 1)
-    y = combined.iloc[:, 0].values
-    model = LinearRegression().fit(X, y)
-    return model.coef_[0]
+beta_result = calculate_beta(tickers, market_index, start_date, end_date, rolling_window) if tickers and market_index else None
+betas = beta_result[0].dropna(subset=["Beta"]) if beta_result is not None else pd.DataFrame()
 
-if ticker and market_index:
-    beta_val = calculate_beta(ticker, market_index, start_date, end_date)
-    if beta_val is not None:
+if not betas.empty:
+    if len(betas) == 1:
+        ticker = betas.index[0]
+        beta_val = betas.loc[ticker, "Beta"]
         st.success(f"📊 Beta saham {ticker} terhadap {market_index}: {beta_val:.4f}")
         if industry_beta:
             gap = beta_val - industry_beta
             st.info(f"Perbandingan dengan rata-rata industri: {gap:+.2f}")
+
+    betas["Selisih vs Industri"] = betas["Beta"] - industry_beta
+    st.dataframe(betas.style.format({
+        "Beta": "{:.4f}",
+        "Alpha": "{:.2%}",
+        "R²": "{:.2f}",
+        "Volatilitas Idiosinkratik": "{:.2%}",
+        "Selisih vs Industri": "{:+.2f}",
+    }), use_container_width=True)
+
+    st.subheader("📈 Rolling Beta")
+    st.line_chart(beta_result[1][betas.index].dropna(how="all"))
+
+    st.subheader("🧭 Matriks Risiko: Leverage vs Beta")
+    ambil_leverage = st.checkbox("Ambil D/E otomatis dari Yahoo Finance", value=True)
+    tax_rate = st.number_input("Tarif pajak efektif (%)", min_value=0.0, max_value=60.0, value=22.0) / 100
+    leverage = get_leverage(list(betas.index)) if ambil_leverage else pd.Series(np.nan, index=betas.index)
+    matrix = st.data_editor(
+        pd.DataFrame({"Beta": betas["Beta"], "D/E": leverage.reindex(betas.index)}),
+        disabled=["Beta"], use_container_width=True,
+    )
+    matrix["Beta Unlevered"] = unlevered_beta(matrix["Beta"], matrix["D/E"], tax_rate)
+    matrix["Kategori"] = risk_quadrant(matrix["Beta"], matrix["D/E"])
+
+    plotted = matrix.dropna(subset=["D/E"])
+    if plotted.empty:
+        st.info("Isi kolom D/E untuk menampilkan matriks risiko.")
     else:
-        st.warning("Data historis tidak cukup atau tidak tersedia untuk menghitung beta.")
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        fig, ax = plt.subplots()
+        sns.scatterplot(data=plotted, x="D/E", y="Beta", hue="Kategori", s=80, ax=ax)
+        for name, row in plotted.iterrows():
+            ax.annotate(name, (row["D/E"], row["Beta"]), fontsize=8, xytext=(4, 4), textcoords="offset points")
+        ax.axhline(1.0, color="gray", linestyle="--", linewidth=1)
+        ax.axvline(1.0, color="gray", linestyle="--", linewidth=1)
+        ax.set_xlabel("Debt to Equity")
+        ax.set_ylabel("Beta")
+        with instrument.span("matriks_risiko", "render"):
+            st.pyplot(fig)
+        st.dataframe(matrix.style.format({"Beta": "{:.2f}", "D/E": "{:.2f}", "Beta Unlevered": "{:.2f}"}), use_container_width=True)
+else:
+    st.warning("Data historis tidak cukup atau tidak tersedia untuk menghitung beta.")
 
 st.markdown("""
 #### 📌 Referensi Screener Saham:
@@ -63,3 +106,5 @@ st.markdown("""
 - [Finviz](https://finviz.com/screener.ashx) (untuk saham US)
 Gunakan screener ini untuk mencari saham dengan karakteristik beta, PER, PBV, dan margin sesuai strategi valuasi.
 """)
+
+instrument.debug_panel(run)
@@ -2,94 +2,199 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import yfinance as yf
+from portfolio_core import instrument
+from portfolio_core.alignment import align
+from portfolio_core.analysis import peer_table
+from portfolio_core.charts import cached_line_figure, heatmap_figure
+from portfolio_core.correlation import cluster_order, correlation_matrix, top_pairs
+from portfolio_core.loader import PriceDataError, load_prices
+from portfolio_core.peers import LOWER_IS_BETTER, PeerBenchmark, SectorIndex
+from portfolio_core.result_cache import memoize, price_ttl
 
 st.set_page_config(page_title="Peer Benchmarking", layout="wide")
+run = instrument.start_run("peer_benchmarking", enabled=st.query_params.get("debug") == "1" or None)
 st.title("📊 Peer Benchmarking Saham")
 
 st.markdown("""
 Modul ini memungkinkan Anda:
-- Membandingkan performa beberapa saham secara bersamaan
-- Menganalisis korelasi dan volatilitas
-- Visualisasi heatmap dan grafik pertumbuhan
-- Skoring saham berdasarkan rasio Sharpe sederhana
-- Filtering berdasarkan sektor
-- Highlight saham terbaik
+- Membandingkan performa puluhan hingga ribuan saham sekaligus
+- Menghitung return tahunan, volatilitas, Sharpe, Sortino, max drawdown beserta durasinya, VaR/CVaR dan beta
+- Memfilter berdasarkan sektor sebelum data diunduh
+- Melihat peringkat top-k, persentil dan peringkat di dalam sektor
+- Visualisasi heatmap korelasi dan grafik pertumbuhan
 """)
 
+MAX_HEATMAP = 300    # di atas ini hanya daftar pasangan korelasi yang ditampilkan
+MAX_PREVIEW = 50     # pratinjau grafik saat unduhan berjalan
+
+
+@st.cache_resource
+def default_sector_index():
+    return SectorIndex.from_csv()
+
+
+st.subheader("🏷️ Tabel Sektor")
+uploaded = st.file_uploader("Unggah tabel sektor (CSV: ticker, sector, industry) — opsional", type="csv")
+try:
+    sector_index = SectorIndex(pd.read_csv(uploaded)) if uploaded is not None else default_sector_index()
+except ValueError as e:
+    st.error(f"Tabel sektor tidak valid: {e}")
+    sector_index = default_sector_index()
+st.caption(f"{len(sector_index)} ticker dalam {len(sector_index.sectors)} sektor. "
+           "Tabel bawaan berisi sebagian saham IDX; unggah daftar konstituen lengkap untuk bursa lain.")
+
 st.subheader("📌 Input Saham")
-tickers = st.text_input("Masukkan ticker saham (pisahkan dengan koma)", "BBCA.JK, BBRI.JK, BMRI.JK")
-tickers_list = [t.strip().upper() for t in tickers.split(",") if t.strip()]
+mode = st.radio("Universe saham", ["Ticker manual", "Semua anggota sektor"], horizontal=True)
+selected_sectors = st.multiselect("Filter sektor (opsional)", sector_index.sectors)
+if mode == "Ticker manual":
+    tickers = st.text_input("Masukkan ticker saham (pisahkan dengan koma)", "BBCA.JK, BBRI.JK, BMRI.JK, TLKM.JK")
+    tickers_list = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip()))
+    if selected_sectors:
+        tickers_list = [t for t in tickers_list if sector_index.sector_of([t]).iloc[0] in selected_sectors]
+else:
+    tickers_list = sector_index.universe(selected_sectors)
+    st.caption(f"{len(tickers_list)} ticker akan dibandingkan.")
+
+col_market, col_rf = st.columns(2)
+with col_market:
+    market = st.text_input("Indeks pasar untuk beta (kosongkan untuk melewati)", "^JKSE").strip().upper()
+with col_rf:
+    risk_free = st.number_input("Risk-free rate tahunan (%)", 0.0, 20.0, 6.0, 0.25) / 100
 
 start_date = st.date_input("Tanggal awal", pd.to_datetime("2023-01-01"))
 end_date = st.date_input("Tanggal akhir", pd.to_datetime("2024-01-01"))
 
-# Optional sector mapping (manual input or extended in production)
-sector_map = {
-    "BBCA.JK": "Perbankan",
-    "BBRI.JK": "Perbankan",
-    "BMRI.JK": "Perbankan",
-    "TLKM.JK": "Telekomunikasi",
-    "ASII.JK": "Otomotif",
-    "INDF.JK": "Konsumsi"
-}
+# on_progress tidak masuk kunci cache: saat cache miss progres unduhan per-chunk
+# tetap digambar langsung ke halaman. Kegagalan tidak ikut di-cache.
+@instrument.cached("fetch_benchmark_data", cache=memoize(
+    ttl=lambda tickers_list, start, end, on_progress=None: price_ttl(tickers_list, end), ignore=("on_progress",)))
+def load_benchmark_data(tickers_list, start, end, on_progress=None):
+    return load_prices(tickers_list, start, end, on_progress=on_progress)
 
-selected_sector = st.selectbox("Filter sektor (opsional)", ["Semua"] + sorted(set(sector_map.values())))
 
-@st.cache_data
-def fetch_benchmark_data(tickers_list, start, end):
+def fetch_benchmark_data(tickers_list, start, end, on_progress=None):
     try:
-        df = yf.download(tickers_list, start=start, end=end, group_by="ticker", auto_adjust=True, progress=False)
-        if isinstance(df.columns, pd.MultiIndex):
-            price_data = pd.DataFrame()
-            for ticker in tickers_list:
-                if (ticker, 'Close') in df.columns:
-                    price_data[ticker] = df[(ticker, 'Close')]
-            return price_data.dropna(axis=1, how='all')
-        else:
-            return df[["Close"]].rename(columns={"Close": tickers_list[0]}) if "Close" in df.columns else pd.DataFrame()
+        return load_benchmark_data(tickers_list, start, end, on_progress=on_progress)
+    except PriceDataError:
+        return pd.DataFrame()
     except Exception as e:
         st.error(f"Gagal mengambil data: {e}")
         return pd.DataFrame()
 
-if tickers_list:
-    if selected_sector != "Semua":
-        tickers_list = [t for t in tickers_list if sector_map.get(t, None) == selected_sector]
 
-    with st.spinner("📡 Mengambil data saham..."):
-        data = fetch_benchmark_data(tickers_list, start_date, end_date)
+@instrument.cached("korelasi", stage="compute", cache=memoize)
+def compute_correlation(prices):
+    # Pasangan lintas bursa hanya memakai hari ketika kedua bursa buka.
+    corr = correlation_matrix(align(prices, "intersect").returns)
+    return corr, cluster_order(corr.to_numpy())
+
 
-    if data.empty:
+if tickers_list:
+    with st.spinner("📡 Mengambil data saham..."):
+        progress_bar = st.empty()
+        preview = st.empty()
+        partial = []
+
+        def tampilkan_progres(done, total, chunk):
+            progress_bar.progress(done / total, text=f"📡 {done}/{total} ticker selesai")
+            if not chunk.empty and len(tickers_list) <= MAX_PREVIEW:
+                partial.append(chunk)
+                preview.line_chart(pd.concat(partial, axis=1))
+
+        fetch_list = tickers_list + ([market] if market and market not in tickers_list else [])
+        data = fetch_benchmark_data(fetch_list, start_date, end_date, on_progress=tampilkan_progres)
+        progress_bar.empty()
+        preview.empty()
+
+    stock_columns = [c for c in data.columns if c != market]
+    if not stock_columns:
         st.warning("Data kosong. Periksa ticker dan tanggal.")
     else:
-        st.subheader("📈 Grafik Harga Saham")
-        st.line_chart(data)
-
-        st.subheader("📉 Korelasi Return Harian")
-        daily_returns = data.pct_change().dropna()
-        corr = daily_returns.corr()
-        fig, ax = plt.subplots()
-        sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
-        st.pyplot(fig)
-
-        st.subheader("📊 Statistik Return")
-        stats = daily_returns.describe().T[["mean", "std"]]
-        stats.columns = ["Rata-rata Harian", "Volatilitas"]
+        with instrument.span("metrik_peer"):
+            # Tabel bersama dengan pre-warm (analysis.peer_table), jadi hasil worker langsung terpakai.
+            metrics = peer_table(data, market, risk_free)
+            bench = PeerBenchmark(metrics, sector_index.sector_of(metrics.index))
+        if market and "Beta" not in metrics.columns:
+            st.info(f"Data indeks {market} tidak tersedia; beta tidak dihitung.")
+
+        st.subheader("🏆 Peringkat Saham")
+        metric_options = [c for c in metrics.columns if c not in ("Observasi", "Beta")]
+        col_metric, col_k, col_sector = st.columns(3)
+        with col_metric:
+            rank_by = st.selectbox("Urutkan berdasarkan", metric_options, index=metric_options.index("Sharpe"))
+        with col_k:
+            k = st.slider("Top-k", 1, max(len(metrics), 1), min(10, len(metrics))) if len(metrics) > 1 else 1
+        with col_sector:
+            top_sector = st.selectbox("Top-k di sektor", ["Semua"] + sorted(bench.sectors.unique()))
+
+        with instrument.span("peringkat_peer"):
+            top = bench.top(rank_by, k, sector=None if top_sector == "Semua" else top_sector)
+            table = metrics.join(bench.within_sector(rank_by))
+            table[f"Persentil {rank_by}"] = bench.percentiles([rank_by])[rank_by]
+            table = table.sort_values(rank_by, ascending=rank_by in LOWER_IS_BETTER)
+
+        if not top.empty:
+            best = top.index[0]
+            st.success(f"📈 Saham terbaik berdasarkan {rank_by}: {best} ({top[rank_by].iloc[0]:.2f})")
+
+        percent_format = {"Return Tahunan": "{:.2%}", "Volatilitas": "{:.2%}", "Max Drawdown": "{:.2%}",
+                          "Durasi Drawdown (hari)": "{:.0f}", "VaR 95%": "{:.2%}", "CVaR 95%": "{:.2%}",
+                          "Sharpe": "{:.2f}", "Sortino": "{:.2f}", "Beta": "{:.2f}", "Observasi": "{:.0f}"}
+        with instrument.span("tabel_peringkat", "render"):
+            st.dataframe(top.style.format(percent_format, na_rep="-"), use_container_width=True)
+
+        with st.expander(f"📋 Semua {len(table)} saham (persentil dan peringkat di sektor)"):
+            st.dataframe(table.style.format({**percent_format, f"Persentil {rank_by}": "{:.0f}",
+                                             f"Peringkat {rank_by} di Sektor": "{:.0f}",
+                                             "Jumlah di Sektor": "{:.0f}"}, na_rep="-"),
+                         use_container_width=True)
+            st.download_button("⬇️ Unduh CSV", table.to_csv().encode("utf-8"), file_name="peer_benchmark.csv",
+                               mime="text/csv")
+
+        if bench.sectors.nunique() > 1:
+            st.subheader("🏷️ Median per Sektor")
+            st.dataframe(bench.sector_summary(rank_by).style.format(percent_format, na_rep="-"),
+                         use_container_width=True)
 
-        stats["Rasio Sharpe Kasar"] = stats["Rata-rata Harian"] / stats["Volatilitas"]
-        stats["Skor"] = stats["Rasio Sharpe Kasar"].rank(ascending=False)
-
-        best = stats["Skor"].idxmin()
-        st.success(f"📈 Saham dengan skor tertinggi: {best} (Skor: {stats.loc[best, 'Skor']:.2f})")
-
-        st.dataframe(stats.style.format({
-            "Rata-rata Harian": "{:.2%}",
-            "Volatilitas": "{:.2%}",
-            "Rasio Sharpe Kasar": "{:.2f}",
-            "Skor": "{:.2f}"
-        }), use_container_width=True)
-
-        st.caption("Rasio Sharpe kasar dihitung tanpa memperhitungkan risk-free rate untuk perbandingan antar saham secara cepat.")
+        st.subheader("📈 Grafik Harga Saham")
+        chart_columns = list(top.index) if len(stock_columns) > k else stock_columns
+        if len(chart_columns) < len(stock_columns):
+            st.caption(f"Menampilkan {len(chart_columns)} saham teratas berdasarkan {rank_by}.")
+        with instrument.span("grafik_harga", "render"):
+            st.plotly_chart(cached_line_figure(data[chart_columns], xaxis_title="Tanggal", yaxis_title="Harga",
+                                               legend_title="Ticker"),
+                            use_container_width=True)
+
+        if len(stock_columns) > 1:
+            st.subheader("📉 Korelasi Return Harian")
+            corr, order = compute_correlation(data[stock_columns])
+            if len(stock_columns) <= MAX_HEATMAP:
+                urut_klaster = st.checkbox("🧬 Kelompokkan berdasarkan klaster korelasi", value=len(stock_columns) > 15)
+                with instrument.span("heatmap_korelasi", "render"):
+                    st.plotly_chart(heatmap_figure(corr.iloc[order, order] if urut_klaster else corr, colorscale="RdBu_r",
+                                                   zrange=(-1, 1)),
+                                    use_container_width=True)
+            else:
+                st.caption(f"Heatmap korelasi hanya ditampilkan untuk maksimal {MAX_HEATMAP} saham.")
+
+            col_side, col_pairs, col_threshold = st.columns(3)
+            with col_side:
+                sisi = st.selectbox("Pasangan saham", ["Paling berkorelasi", "Paling tidak berkorelasi"])
+            with col_pairs:
+                n_pairs = st.number_input("Jumlah pasangan", 5, 500, 20, 5)
+            lowest = sisi != "Paling berkorelasi"
+            with col_threshold:
+                # Ambang: minimal |korelasi| untuk pasangan terkuat, maksimal untuk pasangan terlemah.
+                ambang = st.slider("Ambang |korelasi|", 0.0, 1.0, 0.3 if lowest else 0.7, 0.05)
+            with instrument.span("pasangan_korelasi"):
+                pairs = top_pairs(corr, k=int(n_pairs), threshold=ambang, absolute=True, lowest=lowest)
+            if pairs.empty:
+                st.info("Tidak ada pasangan saham yang memenuhi ambang korelasi.")
+            else:
+                st.dataframe(pairs.style.format({"Korelasi": "{:.2f}"}), hide_index=True, use_container_width=True)
+
+        st.caption("Return tahunan adalah CAGR; Sharpe dan Sortino memakai rata-rata return tahunan dikurangi "
+                   "risk-free rate. VaR/CVaR 95% adalah kerugian harian historis; durasi drawdown adalah hari "
+                   "bursa terlama di bawah puncak sebelumnya. Setiap saham hanya memakai hari perdagangannya sendiri.")
+
+instrument.debug_panel(run)
@@ -0,0 +1,5 @@
+"""Ultra Portfolio AI - shared computation core used by the Streamlit pages.
+
+Modules are imported explicitly by the pages (``from portfolio_core.price_store
+import PriceStore``) so a page only pays for the code it actually uses.
+"""
@@ -0,0 +1,128 @@
+# Ultra Portfolio AI - Exchange Calendar Alignment
+
+"""Align prices of tickers from several exchanges onto one trading calendar.
+
+The rows of a price frame are the union of every exchange's trading days.
+A plain ``dropna()`` therefore throws away each day that *any* exchange was
+closed. ``pct_change().dropna()`` is worse: it also drops the next day's
+return, and the move across the holiday is lost. ``align`` first works out
+which exchange was open on which row. An exchange is open on a row when any
+of its tickers has a close there. The prices are then treated by policy:
+
+- ``"intersect"``: keep only the rows on which every exchange was open.
+  Returns run from each ticker's previous close on that calendar, so the
+  move across a holiday lands on the next common day. This is the right
+  input for covariances, correlations and betas across exchanges.
+- ``"ffill"``: keep every row on which some exchange traded. On days a
+  ticker's exchange was closed, its last close is carried forward, so the
+  return is 0 and the holiday move lands on the reopening day. This is the
+  right input for charts and portfolio values.
+- ``"mask"``: keep the same rows as ``"ffill"`` but leave closed days
+  empty. Returns run from each ticker's previous close, and closed days are
+  masked out.
+
+Gaps in a ticker's own data on days its exchange traded are never filled.
+A return is kept only when the ticker also closed in its exchange's previous
+session, so neither the gap nor the day after it counts as a daily
+observation. On a single exchange whose frame has no empty rows, the
+``"intersect"`` returns are therefore exactly ``pct_change().dropna()``'s.
+Each ``Alignment`` is kept in the shared result cache
+(``result_cache.memoize``) per price frame and policy, so the pages and the
+statistics share one pass.
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.result_cache import market_of, memoize
+
+POLICIES = ("intersect", "ffill", "mask")
+
+
+def clear_cache():
+    align.clear()
+
+
+def _ffill(x):
+    rows = np.where(np.isnan(x), 0, np.arange(len(x))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return x[rows, np.arange(x.shape[1])]
+
+
+def _returns_since_last(x):
+    """Per-column return since the previous valid close; NaN where there is no close."""
+    prev = np.full_like(x, np.nan)
+    prev[1:] = _ffill(x)[:-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return x / prev - 1.0
+
+
+def _closed_previous_session(has, session):
+    """Per row and column: whether the ticker had a close in its previous session."""
+    rows = np.where(session, np.arange(len(has))[:, None], -1)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    prev = np.full_like(rows, -1)
+    prev[1:] = rows[:-1]
+    return (prev >= 0) & has[np.maximum(prev, 0), np.arange(has.shape[1])]
+
+
+@dataclass
+class Alignment:
+    prices: pd.DataFrame    # prices on the aligned calendar (carried forward under "ffill")
+    returns: pd.DataFrame   # return since each ticker's previous session; NaN where masked
+    sessions: pd.DataFrame  # every input row x exchange, True when the exchange traded
+    exchanges: pd.Series    # exchange code per ticker
+    policy: str
+
+    @property
+    def calendar(self):
+        return self.prices.index
+
+    @cached_property
+    def complete_returns(self):
+        """Returns on the rows where every ticker has one."""
+        return self.returns.dropna()
+
+    def coverage(self):
+        """Trading days per exchange and the days it was closed while another traded."""
+        open_days = self.sessions.sum()
+        return pd.DataFrame({"Hari Bursa": open_days, "Hari Tutup": len(self.sessions) - open_days,
+                             "Ticker": self.exchanges.value_counts().reindex(open_days.index)})
+
+
+@memoize(name="align")
+def align(prices, policy="intersect"):
+    """Cached ``Alignment`` of a dates x tickers price frame under ``policy``."""
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown alignment policy: {policy!r}")
+
+    x = prices.to_numpy(dtype="float64")
+    exchanges = pd.Series([market_of(t) for t in prices.columns], index=prices.columns, name="Bursa")
+    names = list(dict.fromkeys(exchanges))
+    codes = np.array([names.index(e) for e in exchanges], dtype=int)
+    has = ~np.isnan(x)
+    open_ = np.column_stack([has[:, codes == i].any(axis=1) for i in range(len(names))]) \
+        if names else np.zeros((len(x), 0), dtype=bool)
+    sessions = pd.DataFrame(open_, index=prices.index, columns=names)
+
+    # Rows on which no exchange traded carry nothing under any policy.
+    rows = open_.all(axis=1) if policy == "intersect" else open_.any(axis=1)
+    x, has, open_, index = x[rows], has[rows], open_[rows], prices.index[rows]
+    if policy == "ffill":
+        x = np.where(~has & ~open_[:, codes], _ffill(x), x)
+        has = ~np.isnan(x)
+    # Under "mask" a ticker's sessions are the rows its exchange traded; otherwise every row.
+    session = open_[:, codes] if policy == "mask" else np.ones_like(has)
+    returns = _returns_since_last(x)
+    returns[~(has & _closed_previous_session(has, session))] = np.nan
+
+    return Alignment(
+        prices=pd.DataFrame(x, index=index, columns=prices.columns),
+        returns=pd.DataFrame(returns, index=index, columns=prices.columns),
+        sessions=sessions,
+        exchanges=exchanges,
+        policy=policy,
+    )
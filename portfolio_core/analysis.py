@@ -0,0 +1,122 @@
+# Ultra Portfolio AI - Analysis Tables
+
+"""Streamlit-free analyses that turn a price frame into result tables.
+
+Each function takes a validated dates x tickers price frame (see
+``loader.load_prices``) and returns a DataFrame, so the same code runs in the
+pages, in the ``python -m portfolio_core`` batch CLI and in notebooks.
+Column names match what the pages display.
+"""
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.result_cache import memoize
+from portfolio_core.stats import stats_for
+
+
+def return_summary(prices, risk_free_rate=0.0):
+    """Annualized return, volatility, Sharpe ratio and max drawdown per ticker."""
+    stats = stats_for(prices)
+    filled = prices.ffill()
+    drawdown = 1 - filled / filled.cummax()
+    table = pd.DataFrame({
+        "Return Tahunan": stats.mean,
+        "Volatilitas Tahunan": stats.volatility,
+    })
+    table["Sharpe"] = (table["Return Tahunan"] - risk_free_rate) / table["Volatilitas Tahunan"]
+    table["Max Drawdown"] = drawdown.max()
+    table["Observasi"] = prices.notna().sum()
+    return table
+
+
+def peer_scores(prices, market=None, sectors=None, risk_free_rate=0.0, rank_by="Sharpe"):
+    """Peer metrics per ticker with its sector, within-sector rank and percentile.
+
+    ``market`` names a column of ``prices`` used for beta (and left out of
+    the table). ``sectors`` is a ``SectorIndex``; the bundled IDX table is
+    used when omitted. Rows are sorted best first by ``rank_by``.
+    """
+    from portfolio_core.peers import LOWER_IS_BETTER, PeerBenchmark, SectorIndex
+
+    metrics = peer_table(prices, market, risk_free_rate)
+    sectors = sectors if sectors is not None else SectorIndex.from_csv()
+    bench = PeerBenchmark(metrics, sectors.sector_of(metrics.index))
+    table = metrics.join(bench.within_sector(rank_by))
+    table[f"Persentil {rank_by}"] = bench.percentiles([rank_by])[rank_by]
+    return table.sort_values(rank_by, ascending=rank_by in LOWER_IS_BETTER)
+
+
+@memoize
+def peer_table(prices, market=None, risk_free_rate=0.0):
+    """``peers.peer_metrics`` of every column but ``market``, with betas against it when present."""
+    from portfolio_core.peers import peer_metrics
+
+    has_market = bool(market) and market in prices.columns
+    stocks = prices.drop(columns=[market]) if has_market else prices
+    return peer_metrics(stocks, market=prices[market] if has_market else None, risk_free_rate=risk_free_rate)
+
+
+@memoize
+def market_betas(prices, market, window=60):
+    """Beta table and rolling betas of every column against ``market``.
+
+    Stocks and market are paired on the days both exchanges traded (the
+    ``"intersect"`` alignment). Returns ``None`` when the market column is
+    missing or nothing else is left.
+    """
+    from portfolio_core.alignment import align
+    from portfolio_core.beta import beta_table, rolling_beta
+
+    if market not in prices.columns:
+        return None
+    returns = align(prices, "intersect").returns
+    stocks = [t for t in returns.columns if t != market]
+    if not stocks:
+        return None
+    return (beta_table(returns[stocks], returns[market]),
+            rolling_beta(returns[stocks], returns[market], window))
+
+
+def frontier_table(prices, method="sample", n_points=50, risk_free_rate=0.03):
+    """Efficient frontier as one row per point: return, volatility, Sharpe and weights."""
+    from portfolio_core.optimizer import efficient_frontier
+
+    stats = stats_for(prices)
+    frontier = efficient_frontier(stats.mean, stats.cov(method), n_points=n_points,
+                                  risk_free_rate=risk_free_rate)
+    table = pd.DataFrame(frontier.weights, columns=prices.columns)
+    table.insert(0, "Sharpe", frontier.sharpe_ratios)
+    table.insert(0, "Volatilitas", frontier.volatilities)
+    table.insert(0, "Return", frontier.returns)
+    return table
+
+
+def rebalance_summary(prices, weights=None, freqs=("none", "monthly", "quarterly", "annual", "threshold"),
+                      cost=0.0, initial=10000.0):
+    """Backtest the same target weights under each rebalancing frequency."""
+    from portfolio_core.backtest import backtest
+    from portfolio_core.scenarios import path_metrics
+
+    prices = prices.dropna(axis=1, how="all")
+    if weights is None:
+        weights = np.full(prices.shape[1], 1 / prices.shape[1])
+    rows = {}
+    for freq in freqs:
+        result = backtest(prices, weights, freq=freq, cost=cost, initial=initial)
+        rows[freq] = {**path_metrics(result.values.to_numpy()),
+                      "Rebalancing": len(result.rebalance_dates),
+                      "Turnover": float(result.turnover.sum()),
+                      "Biaya": result.costs}
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def dcf_table(fcff, wacc_range, terminal_growth_range, growth, years, margin=1.0):
+    """Long-format DCF sensitivity: one row per (WACC, terminal growth) pair."""
+    from portfolio_core.valuation import sensitivity_grid
+
+    grid = sensitivity_grid(fcff, wacc_range, terminal_growth_range, growth, years, margin)
+    wacc, terminal = np.meshgrid(wacc_range, terminal_growth_range)
+    return pd.DataFrame({"WACC": wacc.ravel(), "Pertumbuhan Terminal": terminal.ravel(),
+                         "Nilai Perusahaan": grid.ravel()})
+
@@ -0,0 +1,178 @@
+# Ultra Portfolio AI - AI Assistant
+
+"""Chat assistant with streaming answers and a persistent answer cache.
+
+One ``Assistant`` holds a single OpenAI client, with a timeout, for a whole
+session and streams answers chunk by chunk. Answers are stored in a small
+SQLite file keyed on the model, the normalized question, the portfolio
+context and the recent conversation turns the model is shown, so a follow-up
+is only answered from the cache after the same exchange. Entries expire after a TTL, and the least recently used ones are
+evicted beyond ``max_entries``, so a repeated FAQ is answered instantly and
+costs nothing.
+
+The model sees a compact text summary of the loaded portfolio
+(``portfolio_summary``), never the raw price data. ``base_url`` (or the
+``ULTRA_OPENAI_BASE_URL`` environment variable) points the client at any
+OpenAI-compatible endpoint, including a local mock server for tests.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_MODEL = os.environ.get("ULTRA_OPENAI_MODEL", "gpt-4")
+DEFAULT_BASE_URL = os.environ.get("ULTRA_OPENAI_BASE_URL")
+DEFAULT_CACHE_FILE = os.environ.get("ULTRA_ANSWER_CACHE", os.path.join(".cache", "answers.sqlite"))
+SYSTEM_PROMPT = (
+    "Anda adalah asisten investasi untuk aplikasi Ultra Portfolio AI. Jawab dalam bahasa Indonesia, "
+    "ringkas dan praktis, dan sebutkan risiko bila relevan. Gunakan ringkasan portofolio bila diberikan."
+)
+HISTORY_TURNS = 4
+
+
+def normalize_prompt(text):
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question."""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip(" ?!.")
+
+
+def portfolio_summary(prices, max_tickers=15):
+    """A few lines describing the loaded portfolio: period, per-ticker return/vol, correlation."""
+    if prices is None or prices.empty:
+        return ""
+    import numpy as np
+    from portfolio_core.analysis import return_summary
+
+    table = return_summary(prices).sort_values("Sharpe", ascending=False)
+    lines = [f"Periode {prices.index[0]:%Y-%m-%d} s/d {prices.index[-1]:%Y-%m-%d}, {prices.shape[1]} ticker."]
+    for ticker, row in table.head(max_tickers).iterrows():
+        lines.append(f"{ticker}: return {row['Return Tahunan']:.1%}/th, volatilitas {row['Volatilitas Tahunan']:.1%}, "
+                     f"max drawdown {row['Max Drawdown']:.1%}")
+    if len(table) > max_tickers:
+        lines.append(f"(+{len(table) - max_tickers} ticker lain)")
+    if prices.shape[1] > 1:
+        from portfolio_core.stats import stats_for
+        corr = stats_for(prices).corr.to_numpy()
+        lines.append(f"Rata-rata korelasi antar saham: {corr[np.triu_indices_from(corr, 1)].mean():.2f}")
+    return "\n".join(lines)
+
+
+class AnswerCache:
+    """SQLite answer store with a TTL and least-recently-used eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl=7 * 24 * 3600, max_entries=500, clock=time.time):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT, "
+                         "created REAL, used REAL)")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model, question, context="", history=()):
+        h = hashlib.sha1()
+        for part in (model, normalize_prompt(question), context):
+            h.update(part.encode("utf-8") + b"\x1f")
+        for q, a in history:
+            h.update(q.encode("utf-8") + b"\x1e" + a.encode("utf-8") + b"\x1f")
+        return h.hexdigest()
+
+    def get(self, key):
+        now = self._clock()
+        with self._lock:
+            row = self._db.execute("SELECT answer, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE answers SET used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, answer):
+        now = self._clock()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)", (key, answer, now, now))
+            self._db.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl,))
+            self._db.execute("DELETE FROM answers WHERE key NOT IN "
+                             "(SELECT key FROM answers ORDER BY used DESC LIMIT ?)", (self.max_entries,))
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide answer cache shared by all sessions."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AnswerCache()
+        return _default_cache
+
+
+class Assistant:
+    """One OpenAI client per session; ``ask`` yields the answer in chunks."""
+
+    def __init__(self, api_key, model=DEFAULT_MODEL, base_url=DEFAULT_BASE_URL, timeout=30.0,
+                 cache=None, system_prompt=SYSTEM_PROMPT):
+        from openai import OpenAI  # only loaded once the chat is actually used
+
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=1)
+        self.model = model
+        self.cache = cache if cache is not None else default_cache()
+        self.system_prompt = system_prompt
+        self.history = []            # [(question, answer), ...]
+        self.last_from_cache = False
+
+    def _recent(self):
+        return self.history[-HISTORY_TURNS:]
+
+    def _messages(self, question, context):
+        system = self.system_prompt + (f"\n\nRingkasan portofolio saat ini:\n{context}" if context else "")
+        messages = [{"role": "system", "content": system}]
+        for q, a in self._recent():
+            messages += [{"role": "user", "content": q}, {"role": "assistant", "content": a}]
+        messages.append({"role": "user", "content": question})
+        return messages
+
+    def ask(self, question, context=""):
+        """Yield answer text chunks; cached answers come back as a single chunk."""
+        key = AnswerCache.key(self.model, question, context, self._recent())
+        cached = self.cache.get(key)
+        self.last_from_cache = cached is not None
+        if cached is not None:
+            self.history.append((question, cached))
+            yield cached
+            return
+
+        stream = self.client.chat.completions.create(model=self.model, messages=self._messages(question, context),
+                                                     stream=True)
+        parts = []
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+        answer = "".join(parts)
+        if answer:
+            self.cache.put(key, answer)
+            self.history.append((question, answer))
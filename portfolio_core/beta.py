@@ -0,0 +1,117 @@
+# Ultra Portfolio AI - Batch Beta Engine
+
+"""Beta, alpha, R^2 and idiosyncratic risk for a whole universe at once.
+
+All tickers are regressed on the market in a single pass using masked sums,
+so a ticker with a shorter history only uses the days it actually traded.
+Rolling betas come from cumulative sums, which makes every window O(1).
+"""
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.stats import TRADING_DAYS
+
+
+def aligned_returns(prices):
+    """Per-column simple returns since each ticker's previous valid close.
+
+    Equivalent to ``prices[c].dropna().pct_change()`` for every column, but
+    done in one vectorized pass; days without a close stay NaN.
+    """
+    filled = prices.ffill()
+    returns = filled / filled.shift(1) - 1.0
+    return returns.where(prices.notna())
+
+
+def _masked_sums(y, x):
+    mask = (~np.isnan(y) & ~np.isnan(x)[:, None]).astype("float64")
+    yz = np.where(mask > 0, y, 0.0)
+    xz = np.where(mask > 0, x[:, None], 0.0)
+    return mask, yz, xz
+
+
+def _regress(n, sx, sy, sxx, syy, sxy):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cxx = sxx - sx * sx / n
+        cyy = syy - sy * sy / n
+        cxy = sxy - sx * sy / n
+        beta = cxy / cxx
+        alpha = (sy - beta * sx) / n
+        r2 = cxy * cxy / (cxx * cyy)
+        resid_var = (cyy - beta * cxy) / (n - 2)
+    return beta, alpha, r2, resid_var
+
+
+def beta_table(returns, market, min_obs=30):
+    """Regress every column of ``returns`` on the ``market`` return series.
+
+    Alpha and idiosyncratic volatility are annualized. Tickers with fewer than
+    ``min_obs`` overlapping days get NaN.
+    """
+    returns = pd.DataFrame(returns)
+    market = pd.Series(market).reindex(returns.index)
+    mask, yz, xz = _masked_sums(returns.to_numpy(dtype="float64"), market.to_numpy(dtype="float64"))
+    n = mask.sum(axis=0)
+    beta, alpha, r2, resid_var = _regress(
+        n, xz.sum(axis=0), yz.sum(axis=0), (xz * xz).sum(axis=0), (yz * yz).sum(axis=0), (xz * yz).sum(axis=0)
+    )
+    table = pd.DataFrame({
+        "Beta": beta,
+        "Alpha": alpha * TRADING_DAYS,
+        "R²": r2,
+        "Volatilitas Idiosinkratik": np.sqrt(np.clip(resid_var, 0.0, None) * TRADING_DAYS),
+        "Observasi": n.astype(int),
+    }, index=returns.columns)
+    table.loc[n < min_obs, ["Beta", "Alpha", "R²", "Volatilitas Idiosinkratik"]] = np.nan
+    return table
+
+
+def rolling_beta(returns, market, window=60):
+    """Rolling beta of every column over ``window`` overlapping days."""
+    returns = pd.DataFrame(returns)
+    market = pd.Series(market).reindex(returns.index)
+    mask, yz, xz = _masked_sums(returns.to_numpy(dtype="float64"), market.to_numpy(dtype="float64"))
+
+    def windowed(a):
+        c = np.cumsum(np.vstack([np.zeros((1, a.shape[1])), a]), axis=0)
+        return c[window:] - c[:-window]
+
+    n = windowed(mask)
+    beta, _, _, _ = _regress(n, windowed(xz), windowed(yz), windowed(xz * xz), windowed(yz * yz), windowed(xz * yz))
+    beta[n < max(window // 2, 3)] = np.nan
+    return pd.DataFrame(beta, index=returns.index[window - 1:], columns=returns.columns)
+
+
+def unlevered_beta(beta, debt_to_equity, tax_rate):
+    """Hamada/Damodaran unlevering: beta_u = beta_l / (1 + (1 - t) * D/E)."""
+    return beta / (1 + (1 - tax_rate) * debt_to_equity)
+
+
+def risk_quadrant(beta, debt_to_equity, beta_cut=1.0, leverage_cut=1.0):
+    """Label each ticker by its position in the leverage-vs-beta matrix."""
+    high_beta = np.asarray(beta) >= beta_cut
+    high_lev = np.asarray(debt_to_equity) >= leverage_cut
+    labels = np.select(
+        [high_beta & high_lev, high_beta & ~high_lev, ~high_beta & high_lev],
+        ["Risiko Tinggi", "Risiko Pasar", "Risiko Finansial"],
+        default="Risiko Rendah",
+    )
+    labels = labels.astype(object)
+    labels[np.isnan(np.asarray(beta, dtype="float64")) | np.isnan(np.asarray(debt_to_equity, dtype="float64"))] = "Data Tidak Lengkap"
+    return labels
+
+
+def fetch_leverage(tickers):
+    """Debt-to-equity ratio per ticker from Yahoo Finance (NaN when unavailable)."""
+    import yfinance as yf
+
+    leverage = {}
+    for ticker in tickers:
+        try:
+            value = yf.Ticker(ticker).info.get("debtToEquity")
+        except Exception:
+            value = None
+        # Yahoo reports D/E in percent.
+        leverage[ticker] = np.nan if value is None else float(value) / 100
+    return pd.Series(leverage, name="D/E", dtype="float64")
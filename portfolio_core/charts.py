@@ -0,0 +1,119 @@
+# Ultra Portfolio AI - Chart Data Layer
+
+"""Downsampled, cached Plotly line charts for long price histories.
+
+A chart a few hundred pixels wide cannot show more than a couple of thousand
+points per series, so each series is decimated before it reaches the browser.
+Min-max decimation keeps the lowest and highest point of every bucket and is
+fully vectorized. LTTB (largest triangle three buckets) keeps the visual
+shape best, but it walks the buckets one by one, so it suits single series.
+Large charts switch to WebGL (``Scattergl``) traces.
+
+Prepared figures are cached per dataset fingerprint and chart options, so a
+rerun caused by an unrelated widget skips the downsampling. The cache holds
+the figure's plain dict, and every call builds a new ``go.Figure`` from it,
+so a page that restyles its figure never changes what another session sees.
+The dicts live in the shared result cache (``result_cache.memoize``) and
+count against its byte budget.
+"""
+
+import numpy as np
+
+from portfolio_core.result_cache import memoize
+
+DEFAULT_MAX_POINTS = 2000
+WEBGL_THRESHOLD = 20_000   # total plotted points above which traces use WebGL
+
+
+def minmax_indices(y, max_points):
+    """Indices keeping the min and max of ``max_points // 2`` equal buckets, plus both ends."""
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    buckets = max(max_points // 2, 1)
+    width = -(-n // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lo = np.where(np.isnan(rows), np.inf, rows).argmin(axis=1) + offsets
+    hi = np.where(np.isnan(rows), -np.inf, rows).argmax(axis=1) + offsets
+    idx = np.unique(np.concatenate([[0, n - 1], lo, hi]))
+    return idx[idx < n]
+
+
+def lttb_indices(x, y, max_points):
+    """Largest-triangle-three-buckets selection of at most ``max_points`` indices."""
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for k in range(max_points - 2):
+        lo, hi = edges[k], edges[k + 1]
+        nxt_lo, nxt_hi = hi, edges[k + 2] if k + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        selected[k + 1] = a
+    return selected
+
+
+def downsample(series, max_points=DEFAULT_MAX_POINTS, method="minmax"):
+    """Decimated copy of a Series (NaNs dropped) with at most about ``max_points`` points."""
+    series = series.dropna()
+    if method == "lttb":
+        idx = lttb_indices(series.index.asi8 if hasattr(series.index, "asi8") else np.arange(len(series)),
+                           series.to_numpy(), max_points)
+    elif method == "minmax":
+        idx = minmax_indices(series.to_numpy(), max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+    return series.iloc[idx]
+
+
+def line_figure(frame, title=None, max_points=DEFAULT_MAX_POINTS, method="minmax", xaxis_title=None,
+                yaxis_title=None, legend_title=None, webgl_threshold=WEBGL_THRESHOLD):
+    """Plotly line chart with one downsampled trace per column."""
+    import plotly.graph_objects as go
+
+    traces = [downsample(frame[c], max_points, method) for c in frame.columns]
+    total = sum(len(t) for t in traces)
+    trace_type = go.Scattergl if total > webgl_threshold else go.Scatter
+    fig = go.Figure([trace_type(x=t.index, y=t.to_numpy(), mode="lines", name=str(c))
+                     for c, t in zip(frame.columns, traces)])
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title, legend_title=legend_title)
+    return fig
+
+
+@memoize(name="line_figure")
+def _line_figure_dict(frame, **options):
+    return line_figure(frame, **options).to_dict()
+
+
+def cached_line_figure(frame, **options):
+    """``line_figure`` memoized by the frame's content and the chart options; a new figure per call."""
+    import plotly.graph_objects as go
+
+    return go.Figure(_line_figure_dict(frame, **options))
+
+
+def clear_cache():
+    _line_figure_dict.clear()
+
+
+def heatmap_figure(corr, title=None, colorscale="Viridis", annotate_max=15, zrange=None):
+    """Plotly heatmap of a correlation DataFrame; cells are labelled when it is small."""
+    import plotly.graph_objects as go
+
+    zmin, zmax = zrange or (None, None)
+    text = corr.to_numpy() if len(corr) <= annotate_max else None
+    fig = go.Figure(go.Heatmap(z=corr.to_numpy(), x=list(corr.columns), y=list(corr.index), colorscale=colorscale,
+                               zmin=zmin, zmax=zmax, text=text, texttemplate="%{text:.2f}" if text is not None else None))
+    fig.update_layout(title=title, yaxis_autorange="reversed")
+    return fig
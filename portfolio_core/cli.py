@@ -0,0 +1,220 @@
+# Ultra Portfolio AI - Batch CLI
+
+"""Run the app's analyses headlessly over a ticker universe.
+
+    python -m portfolio_core stats     --universe lq45.txt --start 2020-01-01 --out stats.parquet
+    python -m portfolio_core beta      --universe lq45.txt --market ^JKSE --out beta.csv
+    python -m portfolio_core peers     --universe lq45.txt --market ^JKSE --top 20 --out peers.csv
+    python -m portfolio_core frontier  --universe lq45.txt --cov ledoit_wolf --out frontier.parquet
+    python -m portfolio_core rebalance --universe lq45.txt --cost 0.001 --out rebalance.csv
+    python -m portfolio_core walkforward --universe lq45.txt --window 252 --freq monthly --out wf.csv
+    python -m portfolio_core dcf       --fcff 1000 --wacc 0.10 --growth 0.05 --out dcf.csv
+    python -m portfolio_core score     --profiles clients.csv --rules rules.csv --out scored.csv
+    python -m portfolio_core prewarm   --config watchlists.json
+
+A universe file lists tickers one per line (or comma separated); ``#``
+starts a comment. A CSV with a ``ticker``/``symbol`` column also works.
+The output format follows the ``--out`` suffix (``.parquet`` or ``.csv``);
+without ``--out`` the table is printed.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def read_universe(path):
+    """Unique, upper-cased tickers from a text or CSV universe file."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    first = text.lstrip().splitlines()[0].lower() if text.strip() else ""
+    if path.suffix.lower() == ".csv" and any(c in first for c in ("ticker", "symbol")):
+        frame = pd.read_csv(path)
+        column = next(c for c in frame.columns if c.strip().lower() in ("ticker", "symbol", "tickers", "symbols"))
+        raw = frame[column].dropna().astype(str)
+    else:
+        raw = [t for line in text.splitlines() for t in line.split("#")[0].split(",")]
+    return list(dict.fromkeys(t.strip().upper() for t in raw if t.strip()))
+
+
+def write_table(table, out):
+    """Write ``table`` by file suffix, or print it when ``out`` is None."""
+    if out is None:
+        with pd.option_context("display.max_rows", 200, "display.width", 200):
+            print(table)
+        return
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if out.suffix.lower() == ".parquet":
+        table.to_parquet(out)
+    elif out.suffix.lower() == ".csv":
+        table.to_csv(out)
+    else:
+        raise SystemExit(f"Unsupported output format: {out.suffix or out.name} (use .parquet or .csv)")
+
+
+def _prices(args, extra=()):
+    from portfolio_core.loader import load_prices
+
+    tickers = read_universe(args.universe) + list(extra)
+    prices = load_prices(tickers, args.start, args.end)
+    if prices.attrs.get("missing"):
+        print(f"No data for: {', '.join(prices.attrs['missing'])}", file=sys.stderr)
+    return prices
+
+
+def _stats(args):
+    from portfolio_core.analysis import return_summary
+    return return_summary(_prices(args), risk_free_rate=args.risk_free)
+
+
+def _peers(args):
+    from portfolio_core.analysis import peer_scores
+    from portfolio_core.peers import IDX_SECTORS, SectorIndex
+
+    market = args.market.strip().upper() if args.market else None
+    table = peer_scores(_prices(args, extra=[market] if market else []), market=market,
+                        sectors=SectorIndex.from_csv(args.sectors or IDX_SECTORS),
+                        risk_free_rate=args.risk_free, rank_by=args.rank_by)
+    return table.head(args.top) if args.top else table
+
+
+def _beta(args):
+    from portfolio_core.analysis import market_betas
+
+    market = args.market.strip().upper()
+    result = market_betas(_prices(args, extra=[market]), market, window=args.window)
+    if result is None:
+        raise SystemExit(f"No overlapping data for the market index {market}")
+    return result[0]
+
+
+def _frontier(args):
+    from portfolio_core.analysis import frontier_table
+    return frontier_table(_prices(args).dropna(), method=args.cov, n_points=args.points,
+                          risk_free_rate=args.risk_free)
+
+
+def _rebalance(args):
+    from portfolio_core.analysis import rebalance_summary
+    return rebalance_summary(_prices(args), freqs=args.freq, cost=args.cost)
+
+
+def _walkforward(args):
+    from portfolio_core.walkforward import walk_forward
+
+    wf = walk_forward(_prices(args), window=args.window, freq=args.freq, objective=args.objective,
+                      expanding=args.expanding, risk_free_rate=args.risk_free, cost=args.cost)
+    return wf.weights.assign(Nilai=wf.values.reindex(wf.weights.index), Turnover=wf.turnover)
+
+
+def _dcf(args):
+    from portfolio_core.analysis import dcf_table
+
+    wacc = np.linspace(args.wacc - args.spread, args.wacc + args.spread, args.steps)
+    terminal = np.linspace(args.growth - args.spread, args.growth + args.spread, args.steps)
+    return dcf_table(args.fcff, wacc, terminal, args.growth, args.years)
+
+
+def _score(args):
+    from portfolio_core.risk_profile import RiskModel, read_profiles
+    return RiskModel.from_csv(args.rules, args.glide_path).evaluate(read_profiles(args.profiles))
+
+
+def _prewarm(args):
+    from portfolio_core.prewarm import PrewarmScheduler, configured_watchlists, load_watchlists
+
+    scheduler = PrewarmScheduler(load_watchlists(args.config) if args.config else configured_watchlists())
+    if args.once:
+        scheduler.run_pending()
+    else:
+        print(f"Pre-warming {len(scheduler.watchlists)} watchlists after every close (Ctrl+C to stop)",
+              file=sys.stderr)
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+    return scheduler.summary()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m portfolio_core", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def universe_command(name, func, help):
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument("--universe", required=True, help="file with one ticker per line (or a CSV)")
+        sub.add_argument("--start", default="2019-01-01")
+        sub.add_argument("--end", default=pd.Timestamp.today().strftime("%Y-%m-%d"))
+        sub.add_argument("--out", help="output .parquet or .csv (default: print)")
+        sub.set_defaults(func=func)
+        return sub
+
+    universe_command("stats", _stats, "annual return, volatility, Sharpe and drawdown") \
+        .add_argument("--risk-free", type=float, default=0.0)
+    peers = universe_command("peers", _peers, "ranked return/risk metrics with sector ranks")
+    peers.add_argument("--market", default="^JKSE", help="index for beta (empty to skip)")
+    peers.add_argument("--sectors", help="CSV with ticker,sector[,industry] columns (default: bundled IDX table)")
+    peers.add_argument("--risk-free", type=float, default=0.0)
+    peers.add_argument("--rank-by", default="Sharpe",
+                       choices=("Sharpe", "Sortino", "Return Tahunan", "Volatilitas", "Max Drawdown",
+                                "Durasi Drawdown (hari)", "VaR 95%", "CVaR 95%"))
+    peers.add_argument("--top", type=int, help="keep only the best N rows")
+    beta = universe_command("beta", _beta, "beta, alpha and R² against a market index")
+    beta.add_argument("--market", default="^JKSE")
+    beta.add_argument("--window", type=int, default=60)
+    frontier = universe_command("frontier", _frontier, "Markowitz efficient frontier")
+    frontier.add_argument("--cov", default="sample", choices=("sample", "ledoit_wolf", "ewma"))
+    frontier.add_argument("--points", type=int, default=50)
+    frontier.add_argument("--risk-free", type=float, default=0.03)
+    rebalance = universe_command("rebalance", _rebalance, "equal-weight backtest per rebalancing frequency")
+    rebalance.add_argument("--freq", nargs="+", default=["none", "monthly", "quarterly", "annual", "threshold"],
+                           choices=("none", "daily", "monthly", "quarterly", "annual", "threshold"))
+    rebalance.add_argument("--cost", type=float, default=0.0)
+    walkforward = universe_command("walkforward", _walkforward, "out-of-sample Markowitz weights per rebalance")
+    walkforward.add_argument("--objective", default="max_sharpe", choices=("max_sharpe", "min_variance"))
+    walkforward.add_argument("--window", type=int, default=252, help="estimation window in trading days")
+    walkforward.add_argument("--expanding", action="store_true", help="use all history up to each rebalance")
+    walkforward.add_argument("--freq", default="monthly", choices=("monthly", "quarterly", "annual"))
+    walkforward.add_argument("--cost", type=float, default=0.0)
+    walkforward.add_argument("--risk-free", type=float, default=0.03)
+
+    dcf = commands.add_parser("dcf", help="DCF sensitivity over WACC and terminal growth")
+    dcf.add_argument("--fcff", type=float, required=True)
+    dcf.add_argument("--wacc", type=float, default=0.10)
+    dcf.add_argument("--growth", type=float, default=0.05)
+    dcf.add_argument("--years", type=int, default=5)
+    dcf.add_argument("--spread", type=float, default=0.03, help="± range around WACC and growth")
+    dcf.add_argument("--steps", type=int, default=25)
+    dcf.add_argument("--out", help="output .parquet or .csv (default: print)")
+    dcf.set_defaults(func=_dcf)
+
+    score = commands.add_parser("score", help="risk score, glide-path allocation and profile per client")
+    score.add_argument("--profiles", required=True, help="CSV with usia, pengalaman, kebutuhan, toleransi_risiko")
+    score.add_argument("--rules", help="scoring rules CSV (field,value,points); default: built-in rules")
+    score.add_argument("--glide-path", help="glide-path CSV (skor + one column per asset class)")
+    score.add_argument("--out", help="output .parquet or .csv (default: print)")
+    score.set_defaults(func=_score)
+
+    prewarm = commands.add_parser("prewarm", help="refresh watchlists after every exchange close (worker)")
+    prewarm.add_argument("--config", help="watchlists JSON (default: $ULTRA_WATCHLISTS or the page defaults)")
+    prewarm.add_argument("--once", action="store_true", help="refresh everything once and exit")
+    prewarm.add_argument("--out", help="write the refresh log as .parquet or .csv (default: print)")
+    prewarm.set_defaults(func=_prewarm)
+    return parser
+
+
+def main(argv=None):
+    from portfolio_core.loader import PriceDataError
+
+    args = build_parser().parse_args(argv)
+    try:
+        table = args.func(args)
+    except PriceDataError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    write_table(table, args.out)
+    return 0
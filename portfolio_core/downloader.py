@@ -0,0 +1,157 @@
+# Ultra Portfolio AI - Chunked Downloader
+
+"""Concurrent, chunked price downloads with retry and rate limiting.
+
+Large universes are split into chunks that are fetched through a bounded
+thread pool. Every request passes a shared token-bucket rate limiter, failed
+chunks are retried with exponential backoff, and a chunk that keeps failing
+is split in half so one bad symbol cannot sink its neighbours. Results are
+yielded as chunks finish, so callers can render partial data early.
+
+The transport is any ``transport(tickers, field, start, end) -> DataFrame``
+callable: Yahoo Finance by default, or ``HTTPCSVTransport`` against a local
+stub server for tests.
+"""
+
+import io
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field as dc_field
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+from urllib.request import urlopen
+
+import pandas as pd
+
+from portfolio_core.loader import normalize_download
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second."""
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            self._sleep(wait_for)
+
+
+@dataclass
+class ChunkResult:
+    tickers: list
+    data: pd.DataFrame
+    error: Exception = None
+    attempts: int = 0
+    missing: list = dc_field(default_factory=list)
+
+
+class HTTPCSVTransport:
+    """Fetch ``{base_url}/{TICKER}.csv?start=..&end=..`` per ticker.
+
+    The CSV has a date index column plus one column per field, the same layout
+    as the CSV fixtures. A 404 means "unknown symbol"; other errors raise so
+    the downloader retries them.
+    """
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, tickers, field, start, end):
+        frames = {}
+        query = urlencode({"start": pd.Timestamp(start).date().isoformat(),
+                           "end": pd.Timestamp(end).date().isoformat()})
+        for ticker in tickers:
+            url = f"{self.base_url}/{quote(ticker, safe='')}.csv?{query}"
+            try:
+                with urlopen(url, timeout=self.timeout) as resp:
+                    body = resp.read()
+            except HTTPError as e:
+                if e.code == 404:
+                    continue
+                raise
+            df = pd.read_csv(io.BytesIO(body), index_col=0, parse_dates=True)
+            if field in df.columns:
+                frames[ticker] = df[field].loc[pd.Timestamp(start):pd.Timestamp(end) - pd.Timedelta(days=1)]
+        return pd.DataFrame(frames)
+
+
+class ChunkedDownloader:
+    """Fetch a universe in concurrent chunks; usable as a ``PriceStore`` fetcher."""
+
+    def __init__(self, transport=None, chunk_size=25, max_workers=4, max_retries=3,
+                 backoff=0.5, rate=4.0, sleep=time.sleep):
+        if transport is None:
+            from portfolio_core.price_store import YFinanceFetcher
+            transport = YFinanceFetcher()
+        self.transport = transport
+        self.chunk_size = max(int(chunk_size), 1)
+        self.max_workers = max(int(max_workers), 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(rate, burst=self.max_workers, sleep=sleep)
+        self._sleep = sleep
+
+    def _fetch(self, tickers, field, start, end):
+        last_error = None
+        for attempt in range(1, self.max_retries + 2):
+            self.limiter.acquire()
+            try:
+                data = normalize_download(self.transport(tickers, field, start, end), field, tickers)
+                missing = [t for t in tickers if t not in data.columns]
+                return ChunkResult(tickers, data, attempts=attempt, missing=missing)
+            except Exception as e:  # transport errors are retried, then reported
+                last_error = e
+                if attempt <= self.max_retries:
+                    delay = self.backoff * 2 ** (attempt - 1)
+                    self._sleep(delay * (1 + random.random() * 0.25))
+        return ChunkResult(tickers, pd.DataFrame(dtype="float64"), error=last_error,
+                           attempts=self.max_retries + 1, missing=list(tickers))
+
+    def iter_chunks(self, tickers, field, start, end):
+        """Yield a ``ChunkResult`` for each chunk as soon as it finishes."""
+        tickers = list(dict.fromkeys(tickers))
+        pending = [tickers[i:i + self.chunk_size] for i in range(0, len(tickers), self.chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {pool.submit(self._fetch, chunk, field, start, end) for chunk in pending}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result.error is not None and len(result.tickers) > 1:
+                        # Isolate the failing symbol(s) instead of losing the whole chunk.
+                        half = len(result.tickers) // 2
+                        for part in (result.tickers[:half], result.tickers[half:]):
+                            running.add(pool.submit(self._fetch, part, field, start, end))
+                        continue
+                    if result.error is not None:
+                        logger.warning("Download failed for %s: %s", result.tickers, result.error)
+                    yield result
+
+    def __call__(self, tickers, field, start, end):
+        frames = [r.data for r in self.iter_chunks(tickers, field, start, end) if not r.data.empty]
+        if not frames:
+            return pd.DataFrame(dtype="float64")
+        return pd.concat(frames, axis=1).sort_index()
@@ -0,0 +1,281 @@
+# Ultra Portfolio AI - Instrumentation
+
+"""Per-rerun timing of the fetch, compute and render stages of a page.
+
+A page calls ``start_run`` once per rerun, wraps its stages in ``span``,
+``timed`` or ``cached``, and may show ``debug_panel`` in the sidebar. Every
+finished span records its wall time, and cached calls also record hit/miss
+and the result's payload size. Spans are logged as one JSON line each
+(logger ``portfolio_core.instrument``) and added to process-wide totals.
+``prometheus_metrics`` exports those totals in the Prometheus text format.
+
+Instrumentation is off unless the run was started with ``enabled=True`` or
+the ``ULTRA_INSTRUMENT`` environment variable is set. When it is off,
+``span`` returns a shared no-op object and the decorators call straight
+through, so the cost is one thread-local lookup.
+"""
+
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field as dc_field
+
+ENV_FLAG = "ULTRA_INSTRUMENT"
+STAGES = ("fetch", "compute", "render")
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+# (name, stage) -> [count, seconds, hits, misses, bytes]
+_totals = defaultdict(lambda: [0, 0.0, 0, 0, 0])
+
+
+@dataclass
+class Span:
+    name: str
+    stage: str
+    seconds: float = 0.0
+    cache: str = None      # "hit", "miss" or None when not a cached call
+    nbytes: int = None     # payload size of a cached result
+    depth: int = 0         # nesting level, for indented display
+
+
+@dataclass
+class Run:
+    page: str
+    spans: list = dc_field(default_factory=list)
+    started: float = dc_field(default_factory=time.perf_counter)
+    depth: int = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def stage_totals(self):
+        """Seconds per stage, counting only top-level spans so nesting is not double counted."""
+        totals = dict.fromkeys(STAGES, 0.0)
+        for s in self.spans:
+            if s.depth == 0:
+                totals[s.stage] = totals.get(s.stage, 0.0) + s.seconds
+        return totals
+
+
+class _NoSpan:
+    """Shared stand-in used while instrumentation is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP = _NoSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("run", "span", "t0")
+
+    def __init__(self, run, name, stage):
+        self.run = run
+        self.span = Span(name, stage, depth=run.depth)
+
+    def __enter__(self):
+        self.run.spans.append(self.span)
+        self.run.depth += 1
+        self.t0 = time.perf_counter()
+        return self.span
+
+    def __exit__(self, *exc):
+        self.span.seconds = time.perf_counter() - self.t0
+        self.run.depth -= 1
+        _record(self.run.page, self.span)
+        return False
+
+
+def start_run(page, enabled=None):
+    """Begin a rerun of ``page``; returns the ``Run`` or None when disabled."""
+    if enabled is None:
+        enabled = os.environ.get(ENV_FLAG, "") not in ("", "0")
+    _local.run = Run(page) if enabled else None
+    return _local.run
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+def span(name, stage="compute"):
+    """Context manager timing one stage of the current rerun."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NOOP
+    return _ActiveSpan(run, name, stage)
+
+
+def timed(name=None, stage="compute"):
+    """Decorator form of ``span``."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run = getattr(_local, "run", None)
+            if run is None:
+                return func(*args, **kwargs)
+            with _ActiveSpan(run, label, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cached(name=None, stage="fetch", cache=None):
+    """Wrap ``func`` in ``cache`` (e.g. ``result_cache.memoize``) and record hit/miss.
+
+    A call counts as a miss when the function body actually ran. The span
+    time of a hit is the cache lookup itself, argument hashing included.
+    The flag is saved and restored around each call, so a cached call nested
+    in another one does not change the outer call's hit/miss.
+    """
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            _local.executed = True
+            return func(*args, **kwargs)
+
+        inner = cache(body) if cache is not None else body
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run = getattr(_local, "run", None)
+            if run is None:
+                return inner(*args, **kwargs)
+            outer = getattr(_local, "executed", False)
+            _local.executed = False
+            try:
+                with _ActiveSpan(run, label, stage) as s:
+                    result = inner(*args, **kwargs)
+                    s.cache = "miss" if _local.executed else "hit"
+                    s.nbytes = payload_size(result)
+            finally:
+                _local.executed = outer
+            return result
+
+        if hasattr(inner, "clear"):
+            wrapper.clear = inner.clear
+        return wrapper
+    return decorate
+
+
+def payload_size(obj, _seen=None):
+    """Approximate in-memory size of a result in bytes.
+
+    Pandas objects are measured deeply (object columns included); containers
+    and plain objects such as dataclasses are followed into their items and
+    attributes, counting each object once.
+    """
+    if obj is None:
+        return 0
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if hasattr(obj, "memory_usage"):
+        return int(obj.memory_usage(index=True, deep=True))
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray, str)):
+        return len(obj)
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        return sys.getsizeof(obj) + sum(payload_size(x, _seen) for x in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(payload_size(k, _seen) + payload_size(v, _seen) for k, v in obj.items())
+    if hasattr(obj, "__dict__") and not isinstance(obj, type):
+        return sys.getsizeof(obj) + payload_size(vars(obj), _seen)
+    return sys.getsizeof(obj)
+
+
+def _record(page, s):
+    with _lock:
+        total = _totals[(s.name, s.stage)]
+        total[0] += 1
+        total[1] += s.seconds
+        total[2] += s.cache == "hit"
+        total[3] += s.cache == "miss"
+        total[4] += s.nbytes or 0
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"page": page, "span": s.name, "stage": s.stage, "seconds": round(s.seconds, 6),
+                                "cache": s.cache, "bytes": s.nbytes, "depth": s.depth}))
+
+
+def reset_metrics():
+    with _lock:
+        _totals.clear()
+
+
+def prometheus_metrics():
+    """Process-wide span totals in the Prometheus text exposition format."""
+    with _lock:
+        items = sorted((k, list(v)) for k, v in _totals.items())
+    metrics = [
+        ("ultra_span_seconds_total", "counter", "Wall time spent in instrumented spans.", 1),
+        ("ultra_span_calls_total", "counter", "Number of finished spans.", 0),
+        ("ultra_cache_hits_total", "counter", "Cached calls answered from the cache.", 2),
+        ("ultra_cache_misses_total", "counter", "Cached calls that ran the function.", 3),
+        ("ultra_payload_bytes_total", "counter", "Bytes returned by cached calls.", 4),
+    ]
+    lines = []
+    for metric, kind, help_text, slot in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for (name, stage), values in items:
+            if slot in (2, 3, 4) and values[2] + values[3] == 0:
+                continue
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{span="{label}",stage="{stage}"}} {values[slot]:g}')
+    if "portfolio_core.result_cache" in sys.modules:
+        lines += sys.modules["portfolio_core.result_cache"].default_cache().prometheus_lines()
+    return "\n".join(lines) + "\n"
+
+
+def debug_panel(run=None):
+    """Sidebar expander with this rerun's spans; does nothing when disabled."""
+    run = run or current_run()
+    if run is None:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    rows = [{"Tahap": s.stage, "Langkah": "  " * s.depth + s.name, "Waktu (ms)": s.seconds * 1000,
+             "Cache": s.cache or "", "Ukuran (KB)": None if s.nbytes is None else s.nbytes / 1024}
+            for s in run.spans]
+    with st.sidebar.expander("🛠️ Debug: waktu per tahap", expanded=False):
+        totals = run.stage_totals()
+        st.caption(f"Total rerun: {run.elapsed * 1000:,.0f} ms · "
+                   + " · ".join(f"{k}: {v * 1000:,.0f} ms" for k, v in totals.items()))
+        if rows:
+            st.dataframe(pd.DataFrame(rows).style.format({"Waktu (ms)": "{:,.1f}", "Ukuran (KB)": "{:,.1f}"},
+                                                         na_rep=""),
+                         hide_index=True, use_container_width=True)
+        if "portfolio_core.result_cache" in sys.modules:
+            cache = sys.modules["portfolio_core.result_cache"].default_cache()
+            st.caption(f"Result cache: {cache.nbytes / 1024 ** 2:,.1f} / {cache.max_bytes / 1024 ** 2:,.0f} MB")
+            st.dataframe(cache.stats().style.format({"Ukuran (MB)": "{:,.2f}", "Hit Rate": "{:.0%}"}, na_rep=""),
+                         hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Metrik (Prometheus)", prometheus_metrics(), file_name="metrics.prom",
+                           mime="text/plain")
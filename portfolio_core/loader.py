@@ -0,0 +1,108 @@
+# Ultra Portfolio AI - Price Loader
+
+"""One entry point for price data, whatever shape the download came in.
+
+``yf.download`` returns different layouts depending on the yfinance version
+and arguments: ``(field, ticker)`` or ``(ticker, field)`` MultiIndex columns,
+flat columns for a single ticker, and no ``Adj Close`` at all when prices are
+auto-adjusted. ``normalize_download`` turns any of them into a float64
+dates x tickers frame for one field, and ``load_prices`` validates the result
+once so pages can show a clear message instead of failing later.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Auto-adjusted downloads have no "Adj Close"; their "Close" is the adjusted price.
+FIELD_FALLBACKS = {"Adj Close": "Close"}
+
+
+class PriceDataError(ValueError):
+    """Raised when no usable price data is available for a request."""
+
+
+def _field_level(columns, field):
+    """Index of the MultiIndex level holding ``field`` (or its fallback)."""
+    for candidate in (field, FIELD_FALLBACKS.get(field)):
+        if candidate is None:
+            continue
+        for level in range(columns.nlevels):
+            if candidate in columns.get_level_values(level):
+                return level, candidate
+    return None, None
+
+
+def normalize_download(df, field, tickers):
+    """Wide float64 frame (dates x tickers) for ``field`` from any download shape."""
+    tickers = list(tickers)
+    if df is None or len(df) == 0:
+        return pd.DataFrame(columns=tickers, dtype="float64")
+    if isinstance(df, pd.Series):
+        df = df.to_frame(tickers[0] if len(tickers) == 1 else df.name)
+
+    if isinstance(df.columns, pd.MultiIndex):
+        level, found = _field_level(df.columns, field)
+        if level is None:
+            return pd.DataFrame(columns=tickers, dtype="float64")
+        wide = df.xs(found, axis=1, level=level)
+        if isinstance(wide.columns, pd.MultiIndex):
+            wide.columns = wide.columns.get_level_values(-1)
+    else:
+        found = field if field in df.columns else FIELD_FALLBACKS.get(field)
+        if found in df.columns:
+            wide = df[[found]].set_axis([tickers[0]], axis=1)
+        elif set(df.columns) <= set(tickers):
+            wide = df  # already wide for this field
+        else:
+            return pd.DataFrame(columns=tickers, dtype="float64")
+
+    wide = wide.loc[:, ~wide.columns.duplicated()]
+    wide = wide.reindex(columns=[t for t in tickers if t in wide.columns])
+    wide = wide.apply(pd.to_numeric, errors="coerce").astype("float64")
+    index = pd.DatetimeIndex(wide.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    wide.index = index.normalize()
+    wide = wide[~wide.index.duplicated(keep="last")].sort_index()
+    return wide.dropna(axis=1, how="all")
+
+
+def validate_prices(prices, tickers, min_rows=2):
+    """Check a normalized frame once; raises ``PriceDataError`` if unusable.
+
+    Tickers that came back empty are listed in ``prices.attrs["missing"]``.
+    """
+    prices = prices.replace([np.inf, -np.inf], np.nan).dropna(axis=1, how="all")
+    prices = prices.where(prices > 0)
+    prices.attrs["missing"] = [t for t in tickers if t not in prices.columns]
+    if prices.shape[1] == 0:
+        raise PriceDataError(f"Tidak ada data harga untuk: {', '.join(tickers)}")
+    if prices.dropna(how="all").shape[0] < min_rows:
+        raise PriceDataError("Data historis terlalu sedikit untuk rentang tanggal ini")
+    return prices
+
+
+def today(now=None):
+    """Today's date in the server's local time: the pages' default end date.
+
+    ``now`` is a UTC timestamp (the current time when None), so a scheduler
+    with its own clock builds the same range a page would at that moment.
+    """
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    now = now.tz_localize("UTC") if now.tzinfo is None else now
+    return pd.Timestamp(now.to_pydatetime().astimezone()).tz_localize(None).normalize()
+
+
+def load_prices(tickers, start, end, field="Close", store=None, min_rows=2, on_progress=None):
+    """Validated float64 dates x tickers prices for ``field`` via the price store.
+
+    ``on_progress`` is passed through to ``PriceStore.get`` for partial results.
+    """
+    from portfolio_core.price_store import default_store
+
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if not tickers:
+        raise PriceDataError("Masukkan minimal satu ticker")
+    store = store or default_store()
+    prices = store.get(tickers, start, end, field=field, on_progress=on_progress)
+    return validate_prices(prices, tickers, min_rows=min_rows)
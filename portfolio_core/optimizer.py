@@ -0,0 +1,287 @@
+# Ultra Portfolio AI - Markowitz Optimizer
+
+"""Batch efficient-frontier solver.
+
+The whole frontier is solved in one pass. Without position bounds it has a
+closed form; with long-only bounds the closed-form point is still used where
+it is already non-negative, and elsewhere an active-set solve starts from the
+previous point's set of held assets, so each target usually needs one or two
+small linear solves. SLSQP with analytic gradients is only the fallback.
+A singular covariance matrix (fewer observations than assets, or duplicate
+assets) has no closed form: long-only points then all come from the
+active-set/SLSQP solvers, and unconstrained ones from the pseudo-inverse.
+
+Frontiers are kept in the shared result cache (``result_cache.memoize``) by a
+hash of the inputs, so reruns that do not change the covariance matrix return
+immediately.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from portfolio_core.result_cache import memoize
+
+
+@dataclass
+class Frontier:
+    returns: np.ndarray        # (k,) annualized expected return per point
+    volatilities: np.ndarray   # (k,) annualized volatility per point
+    weights: np.ndarray        # (k, n) portfolio weights per point
+    min_variance: np.ndarray   # (n,)
+    max_sharpe: np.ndarray     # (n,)
+    risk_free_rate: float
+
+    @property
+    def sharpe_ratios(self):
+        return (self.returns - self.risk_free_rate) / self.volatilities
+
+    def target_volatility(self, vol):
+        """Highest-return frontier weights whose volatility does not exceed ``vol``.
+
+        Between two frontier points the weights are interpolated linearly; below
+        the minimum-variance volatility the minimum-variance portfolio is returned.
+        """
+        vols = self.volatilities
+        if vol <= vols[0]:
+            return self.min_variance.copy()
+        if vol >= vols[-1]:
+            return self.weights[-1].copy()
+        k = int(np.searchsorted(vols, vol))
+        t = (vol - vols[k - 1]) / (vols[k] - vols[k - 1])
+        return (1 - t) * self.weights[k - 1] + t * self.weights[k]
+
+
+def efficient_frontier(mean_returns, cov_matrix, n_points=50, risk_free_rate=0.03, long_only=True):
+    """Solve min-variance, max-Sharpe and ``n_points`` frontier portfolios at once.
+
+    ``mean_returns`` (n,) and ``cov_matrix`` (n, n) are annualized; pandas
+    objects are accepted. With ``long_only`` weights are bounded to [0, 1].
+    """
+    mu = np.asarray(mean_returns, dtype="float64")
+    cov = np.asarray(cov_matrix, dtype="float64")
+    return _cached_solve(mu, cov, n_points, float(risk_free_rate), bool(long_only))
+
+
+@memoize(name="efficient_frontier")
+def _cached_solve(mu, cov, n_points, risk_free_rate, long_only):
+    return _solve(mu, cov, n_points, risk_free_rate, long_only)
+
+
+def clear_cache():
+    _cached_solve.clear()
+
+
+OBJECTIVES = ("max_sharpe", "min_variance")
+
+
+def optimal_weights(mean_returns, cov_matrix, objective="max_sharpe", risk_free_rate=0.03, long_only=True,
+                    previous=None):
+    """Weights of a single optimal portfolio, warm-started from ``previous``.
+
+    Solves only the requested point instead of a whole frontier. The
+    long-only active-set solve starts from the assets held in ``previous``
+    (equal weights when None), so re-optimizing after a small change in the
+    inputs usually takes one or two linear solves.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective!r}")
+    mu = np.asarray(mean_returns, dtype="float64")
+    cov = np.asarray(cov_matrix, dtype="float64")
+    n = len(mu)
+    w0 = np.full(n, 1.0 / n) if previous is None else np.asarray(previous, dtype="float64")
+    if objective == "max_sharpe":
+        w = _tangency(mu, cov, risk_free_rate)
+        if w is None and not long_only:
+            w = _tangency(mu, cov, risk_free_rate, _pinv_solve)
+        if w is not None and (not long_only or (w >= -1e-10).all()):
+            return _clean(w) if long_only else w
+        if long_only:
+            return _max_sharpe(mu, cov, risk_free_rate, w0)
+    cf = _closed_form(mu, cov)
+    if long_only and (cf is None or (cf[0] < -1e-10).any()):
+        return _min_variance(mu, cov, None, w0)
+    w_mv, _ = cf if cf is not None else _closed_form(mu, cov, _pinv_solve)
+    return _clean(w_mv) if long_only else w_mv
+
+
+# -- closed form -------------------------------------------------------------
+
+def _exact_solve(cov, rhs):
+    """``cov^-1 rhs``, or None when ``cov`` is singular."""
+    try:
+        x = np.linalg.solve(cov, rhs)
+    except np.linalg.LinAlgError:
+        return None
+    return x if np.isfinite(x).all() else None
+
+
+def _pinv_solve(cov, rhs):
+    return np.linalg.pinv(cov, hermitian=True) @ rhs
+
+
+def _closed_form(mu, cov, solve=_exact_solve):
+    """Unconstrained frontier: w(r) = w_mv + (r - r_mv) * direction.
+
+    Returns None when ``solve`` finds ``cov`` singular.
+    """
+    n = len(mu)
+    inv = solve(cov, np.column_stack([np.ones(n), mu]))
+    if inv is None:
+        return None
+    inv_ones, inv_mu = inv[:, 0], inv[:, 1]
+    a = inv_ones.sum()
+    b = inv_mu.sum()
+    c = mu @ inv_mu
+    d = a * c - b * b
+    w_mv = inv_ones / a
+    if abs(d) < 1e-18:
+        return w_mv, np.zeros(n)
+    direction = (a * inv_mu - b * inv_ones) / d
+    return w_mv, direction
+
+
+def _tangency(mu, cov, rf, solve=_exact_solve):
+    z = solve(cov, mu - rf)
+    if z is None:
+        return None
+    total = z.sum()
+    return z / total if total > 0 else None
+
+
+# -- long-only solves -------------------------------------------------------
+
+def _active_set(cov, A, b, free, tol=1e-10):
+    """min w'Σw s.t. A w = b, w >= 0, warm-started from the ``free`` asset set.
+
+    Each iteration solves the KKT system on the free assets in closed form,
+    then drops the most negative weight or frees the bound asset with the most
+    negative multiplier. Returns None when the free set does not converge so
+    the caller can fall back to SLSQP.
+    """
+    n = cov.shape[0]
+    m = A.shape[0]
+    free = free.copy()
+    for _ in range(2 * n + 10):
+        idx = np.flatnonzero(free)
+        k = len(idx)
+        if k < m:
+            return None
+        kkt = np.zeros((k + m, k + m))
+        kkt[:k, :k] = 2.0 * cov[np.ix_(idx, idx)]
+        kkt[:k, k:] = -A[:, idx].T
+        kkt[k:, :k] = A[:, idx]
+        try:
+            sol = np.linalg.solve(kkt, np.concatenate([np.zeros(k), b]))
+        except np.linalg.LinAlgError:
+            return None
+        w_free, mult = sol[:k], sol[k:]
+        if (w_free < -tol).any():
+            free[idx[np.argmin(w_free)]] = False
+            continue
+        w = np.zeros(n)
+        w[idx] = np.clip(w_free, 0.0, None)
+        nu = 2.0 * cov @ w - A.T @ mult
+        nu[free] = 0.0
+        if nu.min() >= -tol:
+            return w, free
+        free[np.argmin(nu)] = True
+    return None
+
+
+def _min_variance(mu, cov, target, w0):
+    """Long-only minimum variance, optionally at a target return."""
+    A = np.ones((1, len(mu))) if target is None else np.vstack([np.ones(len(mu)), mu])
+    b = np.array([1.0]) if target is None else np.array([1.0, target])
+    result = _active_set(cov, A, b, w0 > 1e-12)
+    if result is not None:
+        return result[0]
+
+    from scipy.optimize import minimize  # fallback only; keeps scipy off the import path
+
+    constraints = [{"type": "eq", "fun": lambda w: w.sum() - 1.0, "jac": lambda w: np.ones_like(w)}]
+    if target is not None:
+        constraints.append({"type": "eq", "fun": lambda w: w @ mu - target, "jac": lambda w: mu})
+    res = minimize(lambda w: w @ cov @ w, w0, jac=lambda w: 2.0 * cov @ w, method="SLSQP",
+                   bounds=[(0.0, 1.0)] * len(mu), constraints=constraints,
+                   options={"maxiter": 500, "ftol": 1e-12})
+    return _clean(res.x)
+
+
+def _max_sharpe(mu, cov, rf, w0):
+    """Long-only tangency portfolio.
+
+    Solved as min y'Σy s.t. (μ - rf)'y = 1, y >= 0 and rescaled to sum to one;
+    SLSQP on the Sharpe ratio with its analytic gradient is the fallback.
+    """
+    excess = mu - rf
+    if excess.max() > 0:
+        result = _active_set(cov, excess[None, :], np.array([1.0]), w0 > 1e-12)
+        if result is not None and result[0].sum() > 0:
+            return result[0] / result[0].sum()
+
+    from scipy.optimize import minimize
+
+    def neg_sharpe(w):
+        vol = np.sqrt(w @ cov @ w)
+        ex = w @ mu - rf
+        grad = -(mu * vol - ex * (cov @ w) / vol) / vol ** 2
+        return -ex / vol, grad
+
+    constraints = [{"type": "eq", "fun": lambda w: w.sum() - 1.0, "jac": lambda w: np.ones_like(w)}]
+    res = minimize(neg_sharpe, w0, jac=True, method="SLSQP", bounds=[(0.0, 1.0)] * len(mu),
+                   constraints=constraints, options={"maxiter": 500, "ftol": 1e-12})
+    return _clean(res.x)
+
+
+def _clean(w):
+    w = np.clip(w, 0.0, None)
+    return w / w.sum()
+
+
+def _solve(mu, cov, n_points, rf, long_only):
+    n = len(mu)
+    cf = _closed_form(mu, cov)
+    if cf is None and not long_only:
+        cf = _closed_form(mu, cov, _pinv_solve)
+    if cf is None:
+        # Singular covariance: every long-only point goes to the solvers below.
+        cf_mv, direction = np.full(n, np.nan), np.zeros(n)
+        w_mv = _min_variance(mu, cov, None, np.full(n, 1.0 / n))
+    else:
+        cf_mv, direction = cf
+        w_mv = cf_mv
+        if long_only and (w_mv < -1e-10).any():
+            w_mv = _min_variance(mu, cov, None, np.where(cf_mv > 0, cf_mv, 0.0))
+    r_mv = w_mv @ mu
+    r_max = mu.max()
+    targets = np.linspace(r_mv, r_max, n_points) if r_max > r_mv else np.full(n_points, r_mv)
+
+    weights = cf_mv + np.outer(targets - cf_mv @ mu, direction)
+    if long_only:
+        previous = w_mv
+        top = np.zeros(n)
+        top[np.argmax(mu)] = 1.0
+        for i, target in enumerate(targets):
+            if (weights[i] >= -1e-10).all():
+                weights[i] = _clean(weights[i])
+            elif i == 0:
+                weights[i] = w_mv
+            elif i == n_points - 1:
+                weights[i] = top
+            else:
+                weights[i] = _min_variance(mu, cov, target, previous)
+            previous = weights[i]
+
+    returns = weights @ mu
+    vols = np.sqrt(np.einsum("ij,jk,ik->i", weights, cov, weights))
+    best = weights[int(np.argmax((returns - rf) / vols))]
+
+    w_tan = _tangency(mu, cov, rf)
+    if w_tan is None:
+        w_tan = _max_sharpe(mu, cov, rf, best) if long_only else best
+    elif long_only and (w_tan < -1e-10).any():
+        w_tan = _max_sharpe(mu, cov, rf, best)
+
+    return Frontier(returns=returns, volatilities=vols, weights=weights,
+                    min_variance=w_mv, max_sharpe=w_tan, risk_free_rate=rf)
@@ -0,0 +1,201 @@
+# Ultra Portfolio AI - Peer Benchmarking Engine
+
+"""Universe-wide peer metrics, sector index and ranking queries.
+
+``SectorIndex`` loads a sector/industry reference table for a whole exchange
+(one row per ticker) and keeps, for every sector and industry, the positions
+of its members. Filtering a universe by sector is then a dictionary lookup
+rather than a scan.
+
+``peer_metrics`` computes annualized return, volatility, Sharpe and Sortino
+ratios, max drawdown and its duration, historical VaR/CVaR and market beta
+for every column in vectorized NumPy passes (see ``risk_metrics``). Returns
+come from the ``"mask"`` alignment (see ``alignment.align``), so each ticker
+uses only the days it actually traded and no return spans a suspension or
+other gap in its own data. ``PeerBenchmark`` answers top-k, percentile and
+within-sector ranking queries on the result, fast enough for universes of
+1,000+ tickers.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.stats import TRADING_DAYS
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+IDX_SECTORS = DATA_DIR / "idx_sectors.csv"
+UNKNOWN_SECTOR = "Lainnya"
+
+# Higher is better unless listed here.
+LOWER_IS_BETTER = {"Volatilitas", "Max Drawdown", "Durasi Drawdown (hari)", "VaR 95%", "CVaR 95%"}
+
+
+class SectorIndex:
+    """Ticker -> sector/industry lookup with precomputed member lists."""
+
+    def __init__(self, table):
+        table = pd.DataFrame(table).copy()
+        table.columns = [str(c).strip().lower() for c in table.columns]
+        if "ticker" not in table.columns or "sector" not in table.columns:
+            raise ValueError("Sector table needs 'ticker' and 'sector' columns")
+        table["ticker"] = table["ticker"].astype(str).str.strip().str.upper()
+        if "industry" not in table.columns:
+            table["industry"] = table["sector"]
+        table = table.drop_duplicates("ticker", keep="last").set_index("ticker").sort_index()
+        self.table = table
+        self.tickers = table.index.to_numpy()
+        self._sectors = {k: v for k, v in table.groupby("sector", sort=True).indices.items()}
+        self._industries = {k: v for k, v in table.groupby("industry", sort=True).indices.items()}
+
+    @classmethod
+    def from_csv(cls, path=IDX_SECTORS):
+        return cls(pd.read_csv(path))
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @property
+    def sectors(self):
+        return list(self._sectors)
+
+    def industries(self, sector=None):
+        if sector is None:
+            return list(self._industries)
+        return sorted(self.table.loc[self.members(sector), "industry"].unique())
+
+    def members(self, sector=None, industry=None):
+        """Tickers of a sector and/or industry (all tickers when both are None)."""
+        positions = np.arange(len(self.tickers))
+        if sector is not None:
+            positions = self._sectors.get(sector, positions[:0])
+        if industry is not None:
+            positions = np.intersect1d(positions, self._industries.get(industry, positions[:0]))
+        return list(self.tickers[positions])
+
+    def universe(self, sectors=None):
+        """Members of ``sectors`` (every sector when empty), grouped sector by sector."""
+        return [t for s in (sectors or self.sectors) for t in self.members(s)]
+
+    def sector_of(self, tickers):
+        """Sector per ticker as a Series; unknown tickers map to ``UNKNOWN_SECTOR``."""
+        tickers = list(tickers)
+        return self.table["sector"].reindex(tickers).fillna(UNKNOWN_SECTOR).rename("Sektor")
+
+
+def peer_metrics(prices, market=None, risk_free_rate=0.0, min_obs=20):
+    """One row of risk/return metrics per ticker column of ``prices``.
+
+    ``market`` is an optional price Series for beta. Return is the CAGR
+    between each ticker's first and last valid close. Sharpe and Sortino use
+    the arithmetic annualized mean in excess of ``risk_free_rate``. VaR and
+    CVaR are daily historical losses at 95%. The move across a gap in a
+    ticker's own data, such as a suspension, is left out rather than counted
+    as one day's return. Tickers with fewer than ``min_obs`` returns get NaN.
+    """
+    from portfolio_core.alignment import align
+    from portfolio_core.beta import aligned_returns, beta_table
+    from portfolio_core.result_cache import market_of
+    from portfolio_core.risk_metrics import downside_deviation, drawdowns, historical_var
+
+    prices = prices.astype("float64")
+    p = prices.to_numpy()
+    r = align(prices, "mask").returns.reindex(prices.index).to_numpy()
+    valid = ~np.isnan(r)
+    n = valid.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, r, 0.0).sum(axis=0) / n
+        dev = np.where(valid, r - mean, 0.0)
+        std = np.sqrt((dev * dev).sum(axis=0) / (n - 1))
+        downside_dev = downside_deviation(r, mar=risk_free_rate)
+
+        has_price = ~np.isnan(p)
+        first_row = has_price.argmax(axis=0)
+        last_row = len(p) - 1 - has_price[::-1].argmax(axis=0)
+        cols = np.arange(p.shape[1])
+        span_days = np.maximum(last_row - first_row, 1)
+        cagr = (p[last_row, cols] / p[first_row, cols]) ** (TRADING_DAYS / span_days) - 1
+
+        dd = drawdowns(p)
+        var, cvar = historical_var(r, 0.95)
+
+        ann_mean = mean * TRADING_DAYS
+        vol = std * np.sqrt(TRADING_DAYS)
+        table = pd.DataFrame({
+            "Return Tahunan": cagr,
+            "Volatilitas": vol,
+            "Sharpe": (ann_mean - risk_free_rate) / vol,
+            "Sortino": (ann_mean - risk_free_rate) / downside_dev,
+            "Max Drawdown": dd.max_drawdown,
+            "Durasi Drawdown (hari)": dd.max_duration,
+            "VaR 95%": var,
+            "CVaR 95%": cvar,
+            "Observasi": n,
+        }, index=prices.columns)
+
+    if market is not None:
+        # Beta pairs each ticker with the market on the days both exchanges traded.
+        name = market.name if isinstance(getattr(market, "name", None), str) else "market"
+        market = pd.Series(market, name=name).reindex(prices.index)
+        if len({market_of(t) for t in [*prices.columns, name]}) == 1:
+            # One exchange: its own calendar already pairs every day.
+            stock_returns = pd.DataFrame(r, index=prices.index, columns=prices.columns)
+            market_returns = aligned_returns(market.to_frame())[name]
+        else:
+            joined = align(pd.concat([prices, market], axis=1), "intersect").returns
+            stock_returns, market_returns = joined[prices.columns], joined[name]
+        table["Beta"] = beta_table(stock_returns, market_returns, min_obs=min_obs)["Beta"]
+    table.loc[table["Observasi"] < min_obs, table.columns.drop("Observasi")] = np.nan
+    return table.replace([np.inf, -np.inf], np.nan)
+
+
+class PeerBenchmark:
+    """Ranking queries over a ``peer_metrics`` table with sector labels."""
+
+    def __init__(self, metrics, sectors=None):
+        self.metrics = metrics
+        if sectors is None:
+            sectors = pd.Series(UNKNOWN_SECTOR, index=metrics.index)
+        self.sectors = pd.Series(sectors, index=metrics.index).fillna(UNKNOWN_SECTOR).rename("Sektor")
+
+    def _scores(self, column):
+        values = self.metrics[column].to_numpy(dtype="float64")
+        return -values if column in LOWER_IS_BETTER else values
+
+    def top(self, column="Sharpe", k=10, sector=None):
+        """Best ``k`` tickers by ``column`` (optionally within one sector), best first."""
+        scores = self._scores(column)
+        mask = ~np.isnan(scores)
+        if sector is not None:
+            mask &= (self.sectors == sector).to_numpy()
+        candidates = np.flatnonzero(mask)
+        k = min(k, len(candidates))
+        if k == 0:
+            return self.metrics.iloc[:0].assign(Sektor=self.sectors.iloc[:0])
+        part = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        order = part[np.argsort(-scores[part], kind="stable")]
+        return self.metrics.iloc[order].assign(Sektor=self.sectors.iloc[order])
+
+    def percentiles(self, columns=None):
+        """Percentile rank (0-100, 100 = best) of every ticker for each column."""
+        columns = columns or [c for c in self.metrics.columns if c != "Observasi"]
+        ranks = {c: pd.Series(self._scores(c), index=self.metrics.index).rank(pct=True) * 100 for c in columns}
+        return pd.DataFrame(ranks)
+
+    def within_sector(self, column="Sharpe"):
+        """Rank of every ticker inside its own sector (1 = best) and the sector size."""
+        scores = pd.Series(self._scores(column), index=self.metrics.index)
+        grouped = scores.groupby(self.sectors)
+        return pd.DataFrame({
+            "Sektor": self.sectors,
+            f"Peringkat {column} di Sektor": grouped.rank(ascending=False, method="min"),
+            "Jumlah di Sektor": grouped.transform("count"),
+        })
+
+    def sector_summary(self, column="Sharpe"):
+        """Median of every metric per sector, sorted by ``column``."""
+        summary = self.metrics.groupby(self.sectors).median()
+        summary["Jumlah"] = self.sectors.value_counts()
+        return summary.sort_values(column, ascending=column in LOWER_IS_BETTER)
@@ -0,0 +1,255 @@
+# Ultra Portfolio AI - Pre-warm Scheduler
+
+"""Background refresh of watchlists after each exchange's close.
+
+A ``Watchlist`` is a set of tickers, an optional market index and the date
+range a page asks for by default. After every settled close of the
+watchlist's exchanges (see ``result_cache.next_close``), and once at start-up,
+``PrewarmScheduler`` fetches the new bars of each watchlist into the shared
+price store, then loads the frame the page asks for by default and runs the
+page's analyses on it (``Watchlist.analyses``):
+
+- ``"stats"``: returns, covariance and correlation through ``stats_for``
+  (page 1 and ultra_portfolio);
+- ``"betas"``: the memoized ``analysis.market_betas`` (page 5);
+- ``"peers"``: ``analysis.peer_scores``, which fills the memoized
+  ``analysis.peer_table`` that page 6 reads (page 6).
+
+The frame is built from the same arguments the page passes: the same
+ticker order, the market index last, and a missing end date meaning
+``loader.today``, like the pages' date inputs. The cached results are keyed
+on that frame's content, so the first interactive request finds them.
+
+Run inside the app, the warmed prices and the memoized statistics land in
+the same process the pages use. A separate worker shares only the on-disk
+price store: the app merges the worker's coverage from ``index.json`` and
+reads its Parquet files instead of downloading, but the worker's
+``stats_for``, ``market_betas`` and ``peer_table`` results stay in the
+worker's memory and are recomputed by the app on first use.
+
+The clock and the data source are pluggable. ``clock`` returns the current
+UTC time, and ``store`` is any ``PriceStore`` (for example one with a
+``CSVFixtureFetcher``), so the schedule can be tested offline. The
+scheduler runs on a daemon thread inside the app (``ULTRA_PREWARM=1``,
+see ``start_background``) or as a separate worker with
+``python -m portfolio_core prewarm``.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field as dc_field
+
+import pandas as pd
+
+from portfolio_core.result_cache import market_of, next_close, settled_end
+
+ENV_FLAG = "ULTRA_PREWARM"
+ENV_CONFIG = "ULTRA_WATCHLISTS"
+MAX_SLEEP = 15 * 60   # re-check the schedule at least this often
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Watchlist:
+    name: str
+    tickers: list
+    market: str = None      # index for betas, e.g. "^JKSE"
+    start: str = "2019-01-01"
+    end: str = None         # exclusive; None means up to today
+    window: int = 60        # rolling-beta window
+    analyses: tuple = ("stats", "betas")    # see the module docstring
+    risk_free_rate: float = 0.0             # for "peers"
+
+    @property
+    def markets(self):
+        return sorted({market_of(t) for t in self.all_tickers})
+
+    @property
+    def all_tickers(self):
+        return list(dict.fromkeys(list(self.tickers) + ([self.market] if self.market else [])))
+
+
+# The pages' default inputs, so their first request after a restart is warm.
+DEFAULT_WATCHLISTS = [
+    Watchlist("simulasi_dan_risiko", ["BBRI.JK", "BMRI.JK"], start="2019-01-01", analyses=("stats",)),
+    Watchlist("ultra_portfolio", ["AAPL", "MSFT", "GOOG"], start="2014-01-01", end="2024-01-01",
+              analyses=("stats",)),
+    Watchlist("damodaran_risk_matrix", ["BBCA.JK", "BBRI.JK", "BMRI.JK", "TLKM.JK", "ASII.JK"], market="^JKSE",
+              start="2022-01-01", end="2023-01-01", analyses=("betas",)),
+    Watchlist("peer_benchmarking", ["BBCA.JK", "BBRI.JK", "BMRI.JK", "TLKM.JK"], market="^JKSE",
+              start="2023-01-01", end="2024-01-01", analyses=("peers",), risk_free_rate=0.06),
+]
+
+
+def index_constituents(name="idx_sectors", market="^JKSE", start="2023-01-01", end="2024-01-01", path=None):
+    """Watchlist of every ticker in a sector table (the bundled IDX table by default).
+
+    Tickers are listed sector by sector, as page 6 lists them for "Semua
+    anggota sektor", with the page's default dates and risk-free rate.
+    """
+    from portfolio_core.peers import IDX_SECTORS, SectorIndex
+
+    return Watchlist(name, SectorIndex.from_csv(path or IDX_SECTORS).universe(), market=market, start=start,
+                     end=end, analyses=("peers",), risk_free_rate=0.06)
+
+
+def load_watchlists(path):
+    """Watchlists from a JSON file: ``{"name": {"tickers": [...], "market": ..., "start": ...}}``.
+
+    An entry with ``"sectors": "<csv>"`` instead of ``tickers`` takes every
+    ticker of that sector table.
+    """
+    with open(path, encoding="utf-8") as fh:
+        raw = json.load(fh)
+    watchlists = []
+    for name, spec in raw.items():
+        spec = dict(spec)
+        if "sectors" in spec:
+            from portfolio_core.peers import SectorIndex
+            spec["tickers"] = SectorIndex.from_csv(spec.pop("sectors")).members()
+        watchlists.append(Watchlist(name, **spec))
+    return watchlists
+
+
+def configured_watchlists():
+    """``ULTRA_WATCHLISTS`` when set, else the page defaults plus the IDX constituents."""
+    path = os.environ.get(ENV_CONFIG)
+    return load_watchlists(path) if path else DEFAULT_WATCHLISTS + [index_constituents()]
+
+
+@dataclass
+class WarmResult:
+    watchlist: str
+    started: pd.Timestamp
+    seconds: float = 0.0
+    tickers: int = 0
+    rows: int = 0
+    missing: list = dc_field(default_factory=list)
+    error: str = None
+
+    def as_row(self):
+        return {"Watchlist": self.watchlist, "Mulai": self.started, "Detik": round(self.seconds, 3),
+                "Ticker": self.tickers, "Baris": self.rows, "Tidak Ada Data": ", ".join(self.missing),
+                "Error": self.error or ""}
+
+
+def _utc_now():
+    return pd.Timestamp.now(tz="UTC")
+
+
+class PrewarmScheduler:
+    """Runs each watchlist once at start and again after every close of its exchanges."""
+
+    def __init__(self, watchlists=None, store=None, clock=_utc_now):
+        self.watchlists = list(watchlists if watchlists is not None else configured_watchlists())
+        self.store = store
+        self.clock = clock
+        self.last_run = {}      # name -> UTC timestamp of the last refresh
+        self.history = []       # WarmResult per refresh, newest last
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_run(self, watchlist):
+        """When ``watchlist`` is next due (None: due now, it never ran)."""
+        last = self.last_run.get(watchlist.name)
+        if last is None:
+            return None
+        return min(next_close(m, last) for m in watchlist.markets).tz_convert("UTC")
+
+    def due(self, now=None):
+        now = now or self.clock()
+        return [w for w in self.watchlists if (self.next_run(w) is None or self.next_run(w) <= now)]
+
+    def warm(self, watchlist, now=None):
+        """Refresh one watchlist's prices and precompute its page's analyses."""
+        from portfolio_core.analysis import market_betas, peer_scores
+        from portfolio_core.loader import PriceDataError, load_prices, today
+        from portfolio_core.stats import stats_for
+
+        now = now or self.clock()
+        result = WarmResult(watchlist.name, now)
+        t0 = time.perf_counter()
+        try:
+            if watchlist.end is None:
+                # Fetch through the session that just closed, so tomorrow's
+                # default range is already on disk ...
+                fetch_end = max(settled_end(t, now) for t in watchlist.all_tickers)
+                load_prices(watchlist.all_tickers, watchlist.start, fetch_end, store=self.store)
+            # ... then load exactly the frame the page asks for now.
+            prices = load_prices(watchlist.all_tickers, watchlist.start, watchlist.end or today(now),
+                                 store=self.store)
+            result.tickers, result.rows = prices.shape[1], prices.shape[0]
+            result.missing = list(prices.attrs.get("missing", []))
+            if "stats" in watchlist.analyses:
+                stats = stats_for(prices)
+                stats.returns, stats.cov("sample"), stats.corr
+            if "betas" in watchlist.analyses and watchlist.market in prices.columns:
+                market_betas(prices, watchlist.market, watchlist.window)
+            if "peers" in watchlist.analyses:
+                peer_scores(prices, watchlist.market, risk_free_rate=watchlist.risk_free_rate)
+        except PriceDataError as e:
+            result.error = str(e)
+        except Exception as e:  # keep the worker alive; the next close retries
+            logger.exception("Pre-warm of %s failed", watchlist.name)
+            result.error = f"{type(e).__name__}: {e}"
+        result.seconds = time.perf_counter() - t0
+        self.last_run[watchlist.name] = now
+        self.history = (self.history + [result])[-200:]
+        logger.info("prewarm %s: %d tickers, %d rows in %.2fs%s", watchlist.name, result.tickers, result.rows,
+                    result.seconds, f" ({result.error})" if result.error else "")
+        return result
+
+    def run_pending(self, now=None):
+        """Warm every due watchlist; returns their ``WarmResult``s."""
+        now = now or self.clock()
+        return [self.warm(w, now) for w in self.due(now)]
+
+    def seconds_until_next(self, now=None):
+        now = now or self.clock()
+        upcoming = [self.next_run(w) for w in self.watchlists]
+        if not upcoming or any(t is None for t in upcoming):
+            return 0.0
+        return max((min(upcoming) - now).total_seconds(), 0.0)
+
+    def run_forever(self, max_sleep=MAX_SLEEP):
+        """Loop until ``stop``; sleeps until the next close, re-checking every ``max_sleep`` s."""
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(min(max(self.seconds_until_next(), 1.0), max_sleep))
+
+    def start(self):
+        """Run the loop on a daemon thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="prewarm", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def summary(self):
+        return pd.DataFrame([r.as_row() for r in self.history])
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def start_background(enabled=None):
+    """Start the process-wide scheduler once when ``ULTRA_PREWARM`` is set; returns it or None."""
+    global _background
+    if enabled is None:
+        enabled = os.environ.get(ENV_FLAG, "") not in ("", "0")
+    if not enabled:
+        return None
+    with _background_lock:
+        if _background is None:
+            _background = PrewarmScheduler().start()
+        return _background
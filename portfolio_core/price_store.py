@@ -0,0 +1,329 @@
+# Ultra Portfolio AI - Shared Price Store
+
+"""On-disk price cache shared by every page.
+
+Each (field, ticker) pair is stored as its own Parquet file and a small JSON
+index records which date ranges have already been fetched. A request only
+downloads the ranges that are still missing, so widening the date input by a
+day fetches a day, not ten years.
+
+The fetcher is pluggable: anything callable as
+``fetcher(tickers, field, start, end) -> DataFrame`` (dates x tickers) works,
+which lets the store run offline against ``CSVFixtureFetcher``.
+
+Several processes (the app and a ``python -m portfolio_core prewarm``
+worker) can share one cache directory. The index is re-read whenever
+another process has rewritten it. Index saves and series writes run under
+a file lock (``index.lock``) and merge with what is on disk, so neither
+process overwrites the other's coverage.
+
+Requests lock only the tickers they ask for, so a download of one universe
+does not hold up sessions reading other tickers. A range is marked as
+covered only up to its exchange's last settled close (see
+``result_cache.settled_end``), so a bar that is still moving is fetched again.
+A chunk whose download failed records nothing: its gap stays missing and
+is requested again on the next call.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+
+from portfolio_core.instrument import span
+from portfolio_core.loader import normalize_download
+from portfolio_core.result_cache import settled_end
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, one process per cache dir
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.environ.get("ULTRA_PRICE_CACHE", os.path.join(".cache", "prices"))
+# Point this at a directory of <TICKER>.csv files to run the app fully offline.
+FIXTURE_DIR = os.environ.get("ULTRA_PRICE_FIXTURES")
+# Symbols the source returned nothing for are not retried for this long.
+FAILED_TTL = 15 * 60
+
+
+def _day(value):
+    return pd.Timestamp(value).tz_localize(None).normalize()
+
+
+def _subtract(start, end, covered):
+    """Return the parts of [start, end) not covered by the sorted ranges."""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in covered:
+        if cov_end <= cursor:
+            continue
+        if cov_start >= end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _merge(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class YFinanceFetcher:
+    """Fetch one field for many tickers from Yahoo Finance (auto-adjusted)."""
+
+    def __call__(self, tickers, field, start, end):
+        import yfinance as yf
+
+        # Concurrency comes from ChunkedDownloader, so yfinance's own threads stay off.
+        df = yf.download(list(tickers), start=start, end=end, auto_adjust=True,
+                         group_by="column", progress=False, threads=False)
+        return normalize_download(df, field, tickers)
+
+
+class CSVFixtureFetcher:
+    """Serve prices from ``<directory>/<TICKER>.csv`` files (Date + field columns)."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def __call__(self, tickers, field, start, end):
+        frames = {}
+        for ticker in tickers:
+            path = self.directory / f"{ticker}.csv"
+            if not path.exists():
+                continue
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+            if field in df.columns:
+                frames[ticker] = df[field].loc[start:end - pd.Timedelta(days=1)]
+        return pd.DataFrame(frames)
+
+
+class PriceStore:
+    """Columnar on-disk price cache with incremental delta fetching."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, fetcher=None, clock=None):
+        self.cache_dir = Path(cache_dir)
+        self.fetcher = fetcher or YFinanceFetcher()
+        self.clock = clock or (lambda: pd.Timestamp.now(tz="UTC"))
+        self._lock = threading.Lock()           # guards the index and the lock table
+        self._ticker_locks = {}
+        self._failed = {}
+        self._index_path = self.cache_dir / "index.json"
+        self._index_mtime = None
+        self._index = {}
+        self._refresh_index()
+
+    # -- index -------------------------------------------------------------
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with other processes using the same cache directory."""
+        if fcntl is None:
+            yield
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / "index.lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _mtime(self):
+        try:
+            return self._index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load_index(self):
+        if not self._index_path.exists():
+            return {}
+        with open(self._index_path) as fh:
+            raw = json.load(fh)
+        return {
+            field: {t: [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in ranges]
+                    for t, ranges in tickers.items()}
+            for field, tickers in raw.items()
+        }
+
+    def _merge_index(self, other):
+        for field, tickers in other.items():
+            mine = self._index.setdefault(field, {})
+            for ticker, ranges in tickers.items():
+                mine[ticker] = _merge(mine.get(ticker, []) + ranges)
+
+    def _refresh_index(self):
+        """Merge in coverage another process saved since we last looked (caller holds no locks)."""
+        if self._mtime() == self._index_mtime:
+            return
+        with self._lock, self._file_lock():
+            self._index_mtime = self._mtime()
+            self._merge_index(self._load_index())
+
+    def _save_index(self):
+        """Merge with the index on disk and write it back (caller holds ``_lock``)."""
+        with self._file_lock():
+            self._merge_index(self._load_index())
+            self._write_index()
+            self._index_mtime = self._mtime()
+
+    def _write_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        raw = {
+            field: {t: [[s.date().isoformat(), e.date().isoformat()] for s, e in ranges]
+                    for t, ranges in tickers.items()}
+            for field, tickers in self._index.items()
+        }
+        tmp = self._index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(raw, fh)
+        os.replace(tmp, self._index_path)
+
+    def coverage(self, ticker, field="Close"):
+        """Date ranges ``[(start, end), ...]`` (end exclusive) already stored."""
+        with self._lock:
+            return list(self._index.get(field, {}).get(ticker, []))
+
+    def missing(self, ticker, start, end, field="Close"):
+        return _subtract(_day(start), _day(end), self.coverage(ticker, field))
+
+    # -- series files ------------------------------------------------------
+    def _path(self, ticker, field):
+        return self.cache_dir / quote(field, safe="") / f"{quote(ticker, safe='')}.parquet"
+
+    def _read(self, ticker, field):
+        path = self._path(ticker, field)
+        if not path.exists():
+            return pd.Series(dtype="float64", name=ticker)
+        return pd.read_parquet(path)[ticker]
+
+    def _write(self, ticker, field, series):
+        path = self._path(ticker, field)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so a reader in another process never sees half a file.
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        series.rename(ticker).to_frame().to_parquet(tmp)
+        os.replace(tmp, path)
+
+    # -- public API --------------------------------------------------------
+    def get(self, tickers, start, end, field="Close", on_progress=None):
+        """Return a dates x tickers frame for ``[start, end)``, fetching only gaps.
+
+        Tickers the source does not know are left out of the result. When
+        given, ``on_progress(done, total, partial)`` is called after every
+        fetched chunk with the chunk's prices, so a page can draw early.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        start, end = _day(start), _day(end)
+        with ExitStack() as held:
+            # Sorted acquisition keeps two overlapping requests from deadlocking.
+            for ticker in sorted(tickers):
+                held.enter_context(self._ticker_lock(field, ticker))
+            self._refresh_index()
+            with span("price_store.download", "fetch"):
+                self._fill_gaps(tickers, start, end, field, on_progress)
+            frames = {}
+            with span("price_store.read", "fetch"):
+                for ticker in tickers:
+                    series = self._read(ticker, field)
+                    if not series.empty:
+                        frames[ticker] = series.loc[start:end - pd.Timedelta(days=1)]
+        data = pd.DataFrame(frames, columns=[t for t in tickers if t in frames])
+        return data.astype("float64").sort_index()
+
+    def _ticker_lock(self, field, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault((field, ticker), threading.Lock())
+
+    def _fetch_chunks(self, group, field, start, end):
+        if hasattr(self.fetcher, "iter_chunks"):
+            for result in self.fetcher.iter_chunks(group, field, start, end):
+                yield result.tickers, result.data, result.error
+        else:
+            yield group, normalize_download(self.fetcher(group, field, start, end), field, group), None
+
+    def _fill_gaps(self, tickers, start, end, field, on_progress=None):
+        # A bar is final only after its exchange's close; coverage stops there.
+        today = self.clock()
+        horizon = {ticker: min(end, settled_end(ticker, today)) for ticker in tickers}
+        now = time.monotonic()
+        by_gap = {}
+        for ticker in tickers:
+            if now - self._failed.get((field, ticker), -FAILED_TTL) < FAILED_TTL:
+                continue
+            for gap in self.missing(ticker, start, end, field):
+                by_gap.setdefault(gap, []).append(ticker)
+        if not by_gap:
+            return
+
+        total = sum(len(group) for group in by_gap.values())
+        done = 0
+        touched = False
+        for (gap_start, gap_end), group in by_gap.items():
+            for chunk, fetched, error in self._fetch_chunks(group, field, gap_start, gap_end):
+                if error is None:
+                    touched |= self._store_chunk(chunk, fetched, field, gap_start, gap_end, horizon, now)
+                done += len(chunk)
+                if on_progress is not None:
+                    on_progress(done, total, fetched.loc[start:end - pd.Timedelta(days=1)])
+        if touched:
+            with self._lock:
+                self._save_index()
+
+    def _store_chunk(self, tickers, fetched, field, gap_start, gap_end, horizon, now):
+        # An empty answer for a known symbol means "no trading in this gap" when the
+        # source evidently works (other symbols came back) or the gap is a weekend/holiday.
+        source_ok = not fetched.empty or gap_end - gap_start < pd.Timedelta(days=5)
+        touched = False
+        for ticker in tickers:
+            if ticker in fetched.columns:
+                new = fetched[ticker].dropna()
+                # Another process may have extended the file since our gap check.
+                with self._file_lock():
+                    old = self._read(ticker, field)
+                    merged = new if old.empty else pd.concat([old, new])
+                    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+                    self._write(ticker, field, merged)
+            elif not self.coverage(ticker, field):
+                self._failed[(field, ticker)] = now
+                continue
+            elif not source_ok:
+                continue
+            if gap_start < horizon[ticker]:
+                with self._lock:
+                    ranges = self._index.setdefault(field, {}).setdefault(ticker, [])
+                    ranges.append((gap_start, min(gap_end, horizon[ticker])))
+                    self._index[field][ticker] = _merge(ranges)
+                touched = True
+        return touched
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Process-wide store shared by all pages and sessions."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            from portfolio_core.downloader import ChunkedDownloader
+
+            transport = CSVFixtureFetcher(FIXTURE_DIR) if FIXTURE_DIR else YFinanceFetcher()
+            _default_store = PriceStore(fetcher=ChunkedDownloader(transport))
+        return _default_store
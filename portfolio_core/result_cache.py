@@ -0,0 +1,301 @@
+# Ultra Portfolio AI - Result Cache
+
+"""Process-wide in-memory result cache bounded by bytes, with market-aware TTLs.
+
+``memoize`` replaces bare ``st.cache_data``. The key is built from cheap
+content fingerprints of the arguments: DataFrames, Series and arrays are
+hashed from their raw bytes, and everything else by ``repr``. The
+fingerprint of a frame object is remembered for as long as the object
+lives, so a frame returned by one cached call keys the next call at no cost.
+Unlike ``st.cache_data``, hits return the stored object itself without
+unpickling a copy, so callers must treat cached results as read-only.
+
+Entries are evicted least-recently-used once their total size exceeds the
+budget (``ULTRA_CACHE_MB``, default 512 MB). Memory therefore stays flat
+however many users and ticker/date combinations the server sees. A TTL can
+be a number of seconds or a function of the call's arguments.
+``price_ttl`` keeps prices that include the current session only until
+shortly after the next market close, while purely historical ranges live
+for a week. Hits, misses and evictions are counted per function.
+"""
+
+import datetime as dt
+import functools
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.instrument import payload_size
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("ULTRA_CACHE_MB", 512)) * 1024 ** 2)
+HISTORICAL_TTL = 7 * 24 * 3600
+
+# Exchange timezone and the time after which the day's closing prices are
+# final at the data source (the close plus a margin for vendor delay).
+MARKET_CLOSE = {
+    "IDX": ("Asia/Jakarta", dt.time(16, 30)),
+    "US": ("America/New_York", dt.time(16, 30)),
+}
+
+
+def market_of(ticker):
+    """Exchange key in ``MARKET_CLOSE`` for a Yahoo ticker."""
+    ticker = str(ticker).upper()
+    return "IDX" if ticker.endswith(".JK") or ticker == "^JKSE" else "US"
+
+
+def next_close(market, now=None):
+    """First settled close of ``market`` after ``now`` (weekends skipped)."""
+    tz, close = MARKET_CLOSE[market]
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    now = now.tz_localize("UTC") if now.tzinfo is None else now
+    local = now.tz_convert(tz)
+    candidate = local.normalize() + pd.Timedelta(hours=close.hour, minutes=close.minute)
+    while candidate <= local or candidate.weekday() >= 5:
+        candidate = (candidate + pd.Timedelta(days=1)).normalize() + pd.Timedelta(hours=close.hour,
+                                                                                minutes=close.minute)
+    return candidate
+
+
+def last_close(market, now=None):
+    """Most recent settled close of ``market`` at or before ``now`` (weekends skipped)."""
+    tz, close = MARKET_CLOSE[market]
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    now = now.tz_localize("UTC") if now.tzinfo is None else now
+    local = now.tz_convert(tz)
+    candidate = local.normalize() + pd.Timedelta(hours=close.hour, minutes=close.minute)
+    while candidate > local or candidate.weekday() >= 5:
+        candidate = (candidate - pd.Timedelta(days=1)).normalize() + pd.Timedelta(hours=close.hour,
+                                                                                minutes=close.minute)
+    return candidate
+
+
+def settled_end(ticker, now=None):
+    """Exclusive end date up to which ``ticker``'s daily bars are final.
+
+    The day after the exchange's last settled close, as a naive date in the
+    exchange's own calendar, which is how price indexes are dated.
+    """
+    return last_close(market_of(ticker), now).tz_localize(None).normalize() + pd.Timedelta(days=1)
+
+
+def price_ttl(tickers, end, now=None):
+    """Seconds prices for ``tickers`` up to ``end`` stay valid.
+
+    ``end`` is exclusive, as in ``PriceStore.get``. Ranges that stop before
+    today in every market involved no longer change and get
+    ``HISTORICAL_TTL``. Otherwise the data expires at the earliest next
+    close among the markets of ``tickers``.
+    """
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    now = now.tz_localize("UTC") if now.tzinfo is None else now
+    markets = {market_of(t) for t in ([tickers] if isinstance(tickers, str) else tickers)} or {"US"}
+    end_day = pd.Timestamp(end).normalize()
+    if all(end_day <= now.tz_convert(MARKET_CLOSE[m][0]).tz_localize(None).normalize() for m in markets):
+        return HISTORICAL_TTL
+    expiry = min(next_close(m, now) for m in markets)
+    return max((expiry - now).total_seconds(), 1.0)
+
+
+# -- keys --------------------------------------------------------------------
+
+_fingerprints = {}
+_fp_lock = threading.Lock()
+
+
+def fingerprint(obj):
+    """Content hash of a DataFrame, Series or array, memoized per live object."""
+    ident = id(obj)
+    with _fp_lock:
+        known = _fingerprints.get(ident)
+        if known is not None and known[0]() is obj:
+            return known[1]
+    if isinstance(obj, pd.Series):
+        obj_frame = obj.to_frame(name=str(obj.name))
+    else:
+        obj_frame = obj
+    if isinstance(obj_frame, pd.DataFrame):
+        from portfolio_core.stats import fingerprint as frame_fingerprint
+        digest = frame_fingerprint(obj_frame)
+    else:
+        arr = np.ascontiguousarray(obj)
+        digest = hashlib.sha1(arr.tobytes() + str((arr.shape, arr.dtype.str)).encode()).hexdigest()
+    try:
+        ref = weakref.ref(obj, lambda _, ident=ident: _fingerprints.pop(ident, None))
+    except TypeError:
+        return digest
+    with _fp_lock:
+        _fingerprints[ident] = (ref, digest)
+    return digest
+
+
+def _token(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return (type(value).__name__, fingerprint(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_token(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _token(v)) for k, v in value.items()))
+    if isinstance(value, (dt.date, pd.Timestamp)):
+        return value.isoformat()
+    return repr(value)
+
+
+def make_key(name, args=(), kwargs=None):
+    tokens = (name, _token(args), _token(kwargs or {}))
+    return hashlib.sha1(repr(tokens).encode()).hexdigest()
+
+
+# -- cache -------------------------------------------------------------------
+
+@dataclass
+class _Entry:
+    name: str
+    value: object
+    nbytes: int
+    expires: float
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by the total size of its values."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, clock=time.time):
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        # name -> [hits, misses, evictions, expirations]
+        self._counts = defaultdict(lambda: [0, 0, 0, 0])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.nbytes -= entry.nbytes
+        return entry
+
+    def get(self, key, name=""):
+        """``(True, value)`` on a live hit, ``(False, None)`` otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self._clock():
+                self._drop(key)
+                self._counts[entry.name][3] += 1
+                entry = None
+            if entry is None:
+                self._counts[name][1] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._counts[entry.name][0] += 1
+            return True, entry.value
+
+    def put(self, key, value, ttl=None, name=""):
+        nbytes = payload_size(value)
+        if nbytes > self.max_bytes:
+            return
+        expires = self._clock() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(name, value, nbytes, expires)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self.nbytes -= old.nbytes
+                self._counts[old.name][2] += 1
+
+    def clear(self, name=None):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if name is None or e.name == name]:
+                self._drop(key)
+
+    def stats(self):
+        """Per-function entries, bytes, hits, misses, hit rate and evictions."""
+        with self._lock:
+            sizes = defaultdict(lambda: [0, 0])
+            for e in self._entries.values():
+                sizes[e.name][0] += 1
+                sizes[e.name][1] += e.nbytes
+            rows = []
+            for name in sorted(set(self._counts) | set(sizes)):
+                hits, misses, evicted, expired = self._counts[name]
+                rows.append({"Fungsi": name, "Entri": sizes[name][0], "Ukuran (MB)": sizes[name][1] / 1024 ** 2,
+                             "Hit": hits, "Miss": misses,
+                             "Hit Rate": hits / (hits + misses) if hits + misses else float("nan"),
+                             "Evicted": evicted, "Kedaluwarsa": expired})
+        return pd.DataFrame(rows, columns=["Fungsi", "Entri", "Ukuran (MB)", "Hit", "Miss", "Hit Rate",
+                                           "Evicted", "Kedaluwarsa"])
+
+    def prometheus_lines(self):
+        with self._lock:
+            counts = {k: list(v) for k, v in self._counts.items()}
+            used, entries = self.nbytes, len(self._entries)
+        lines = ["# HELP ultra_result_cache_bytes Bytes held by the result cache.",
+                 "# TYPE ultra_result_cache_bytes gauge", f"ultra_result_cache_bytes {used}",
+                 "# HELP ultra_result_cache_entries Entries held by the result cache.",
+                 "# TYPE ultra_result_cache_entries gauge", f"ultra_result_cache_entries {entries}"]
+        for metric, slot in (("hits", 0), ("misses", 1), ("evictions", 2), ("expirations", 3)):
+            lines.append(f"# TYPE ultra_result_cache_{metric}_total counter")
+            for name, values in sorted(counts.items()):
+                lines.append(f'ultra_result_cache_{metric}_total{{function="{name}"}} {values[slot]}')
+        return lines
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache shared by all pages and sessions."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
+
+
+def memoize(func=None, *, name=None, ttl=None, ignore=(), cache=None):
+    """Cache ``func``'s results in the shared ``ResultCache``.
+
+    ``ttl`` is seconds, or a function called with the same arguments as
+    ``func`` that returns seconds. Arguments named in ``ignore`` (such as
+    progress callbacks) are left out of the key. Exceptions are not cached.
+    Usable bare (``@memoize``) or with options, and as the ``cache`` of
+    ``instrument.cached``.
+    """
+    def decorate(func):
+        import inspect
+
+        label = name or func.__qualname__
+        signature = inspect.signature(func)
+        # Same-named functions on different pages must not share entries.
+        code = getattr(inspect.unwrap(func), "__code__", None)
+        scope = f"{func.__module__}:{code.co_filename if code else ''}:{label}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache if cache is not None else default_cache()
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key_args = {k: v for k, v in bound.arguments.items() if k not in ignore}
+            key = make_key(scope, kwargs=key_args)
+            found, value = store.get(key, label)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            store.put(key, value, ttl(*args, **kwargs) if callable(ttl) else ttl, label)
+            return value
+
+        wrapper.clear = lambda: (cache if cache is not None else default_cache()).clear(label)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
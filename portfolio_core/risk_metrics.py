@@ -0,0 +1,260 @@
+# Ultra Portfolio AI - Risk Metrics
+
+"""Rolling volatility, drawdowns, VaR/CVaR and downside deviation for many series.
+
+Everything works column-wise on a dates x series array (or DataFrame) in a
+fixed number of vectorized passes, so a risk table for 1,000 series x 20
+years takes under a second and nothing goes through ``rolling().apply``.
+
+- Rolling sums come from one cumulative sum. The series are centered first
+  so the window differences stay accurate.
+- Running peaks come from ``np.fmax.accumulate``. Drawdown duration is the
+  distance to the row of the last peak.
+- Rolling extrema use the van Herk/Gil-Werman block scheme. It does the same
+  O(n) work as a monotonic deque, but runs as array operations over all
+  series at once instead of a Python loop per element.
+
+Returns are per-column simple returns since each series' previous valid
+value, as in ``beta.aligned_returns``. Days without a value stay NaN and are
+skipped. VaR and CVaR are daily losses reported as positive fractions.
+"""
+
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.stats import TRADING_DAYS
+
+DEFAULT_CONFIDENCE = 0.95
+
+
+def _as_array(values):
+    labels = (values.index, values.columns) if isinstance(values, pd.DataFrame) else None
+    x = np.asarray(values, dtype="float64")
+    return (x[:, None] if x.ndim == 1 else x), labels
+
+
+def _wrap(out, labels, like):
+    if labels is not None:
+        return pd.DataFrame(out, index=labels[0], columns=labels[1])
+    if isinstance(like, pd.Series):
+        return pd.Series(out[:, 0], index=like.index, name=like.name)
+    return out[:, 0] if np.ndim(like) == 1 else out
+
+
+def _ffill(x):
+    """Forward-fill NaNs down each column."""
+    if not np.isnan(x).any():
+        return x
+    rows = np.where(np.isnan(x), 0, np.arange(len(x))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return x[rows, np.arange(x.shape[1])]
+
+
+def simple_returns(values):
+    """Per-column returns since the previous valid value; NaN where a value is missing."""
+    x, labels = _as_array(values)
+    filled = _ffill(x)
+    out = np.full_like(x, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[1:] = filled[1:] / filled[:-1] - 1.0
+    out[np.isnan(x)] = np.nan
+    return _wrap(out, labels, values)
+
+
+# -- rolling windows ---------------------------------------------------------
+
+def _window_sums(z, window):
+    """Sum of the last ``window`` rows (fewer at the start) for every row."""
+    c = np.cumsum(z, axis=0)
+    out = np.empty_like(c)
+    out[:window] = c[:window]
+    np.subtract(c[window:], c[:-window], out=out[window:])
+    return out
+
+
+def rolling_volatility(returns, window=21, min_periods=None, annualize=True):
+    """Rolling sample standard deviation of each column over its valid days."""
+    x, labels = _as_array(returns)
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        center = np.where(valid, x, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+        z = np.where(valid, x - center, 0.0)
+        if valid.all():
+            n = np.minimum(np.arange(1, len(x) + 1), window).astype("float64")[:, None]
+        else:
+            n = _window_sums(valid.astype("int32"), window)
+        s1 = _window_sums(z, window)
+        s2 = _window_sums(np.square(z, out=z), window)
+        var = s1 * s1
+        var /= n
+        np.subtract(s2, var, out=var)
+        np.maximum(var, 0.0, out=var)
+        var /= n - 1
+    vol = np.sqrt(var) * (np.sqrt(TRADING_DAYS) if annualize else 1.0)
+    vol[(n < max(min_periods, 2)) | ~valid] = np.nan
+    return _wrap(vol, labels, returns)
+
+
+def rolling_max(values, window):
+    """Maximum of the last ``window`` rows for every row and column, ignoring NaNs."""
+    x, labels = _as_array(values)
+    t, n = x.shape
+    blocks = -(-t // window)
+    padded = np.full((blocks * window, n), np.nan)
+    padded[:t] = x
+    padded = padded.reshape(blocks, window, n)
+    # Within each block: running max from the block start and from the block end.
+    prefix = np.fmax.accumulate(padded, axis=1).reshape(-1, n)
+    suffix = np.fmax.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape(-1, n)
+    out = prefix[:t].copy()
+    if t >= window:
+        # A window ending at row i spans the tail of one block and the head of the next.
+        out[window - 1:] = np.fmax(suffix[:t - window + 1], prefix[window - 1:t])
+    return _wrap(out, labels, values)
+
+
+def rolling_min(values, window):
+    """Minimum of the last ``window`` rows for every row and column, ignoring NaNs."""
+    if not isinstance(values, (pd.DataFrame, pd.Series)):
+        values = np.asarray(values, dtype="float64")
+    return -rolling_max(-values, window)
+
+
+# -- drawdowns ---------------------------------------------------------------
+
+@dataclass
+class Drawdowns:
+    drawdown: object    # 1 - value / running peak, per row and series
+    duration: object    # trading days since the last peak, per row and series
+
+    @property
+    def max_drawdown(self):
+        return np.nanmax(np.asarray(self.drawdown, dtype="float64"), axis=0)
+
+    @property
+    def max_duration(self):
+        return np.nanmax(np.asarray(self.duration, dtype="float64"), axis=0)
+
+    @property
+    def current(self):
+        return np.asarray(self.drawdown, dtype="float64")[-1]
+
+
+def drawdowns(values):
+    """Drawdown from the running peak and days since that peak, per series.
+
+    ``values`` are price or portfolio levels; gaps are forward-filled.
+    """
+    x, labels = _as_array(values)
+    filled = _ffill(x)
+    rows = np.arange(len(x))[:, None]
+    peak = np.fmax.accumulate(filled, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dd = 1.0 - filled / peak
+        at_peak = filled >= peak
+    last_peak = np.maximum.accumulate(np.where(at_peak, rows, -1), axis=0)
+    duration = np.where(last_peak >= 0, rows - last_peak, np.nan).astype("float64")
+    return Drawdowns(_wrap(dd, labels, values), _wrap(duration, labels, values))
+
+
+def rolling_drawdown(values, window):
+    """Drawdown from the highest level of the last ``window`` rows, per series."""
+    x, labels = _as_array(values)
+    filled = _ffill(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return _wrap(1.0 - filled / rolling_max(filled, window), labels, values)
+
+
+# -- tail risk ---------------------------------------------------------------
+
+def _moments(x):
+    valid = ~np.isnan(x)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, x, 0.0).sum(axis=0) / n
+        dev = np.where(valid, x - mean, 0.0)
+        std = np.sqrt((dev * dev).sum(axis=0) / (n - 1))
+    return n, mean, std
+
+
+def historical_var(returns, confidence=DEFAULT_CONFIDENCE):
+    """Historical daily VaR and CVaR per column as ``(var, cvar)`` arrays.
+
+    VaR is the loss at the ``1 - confidence`` quantile: the k-th worst day,
+    with k = ceil((1 - confidence) * n). CVaR is the mean loss over those k days.
+    """
+    x, _ = _as_array(returns)
+    n = (~np.isnan(x)).sum(axis=0)
+    k = np.maximum(np.ceil((1.0 - confidence) * n).astype(int), 1)
+    cols = np.arange(x.shape[1])
+    if len(x) and (n == len(x)).all():
+        # Complete data: a partition finds the k worst days without a full sort.
+        worst = np.partition(x, k[0] - 1, axis=0)[:k[0]]
+        return -worst.max(axis=0), -worst.mean(axis=0)
+    ordered = np.sort(x, axis=0)            # NaNs sort to the end
+    tail = np.cumsum(np.nan_to_num(ordered), axis=0)
+    idx = np.minimum(k - 1, len(x) - 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = -ordered[idx, cols]
+        cvar = -tail[idx, cols] / k
+    var[n == 0], cvar[n == 0] = np.nan, np.nan
+    return var, cvar
+
+
+def _gaussian_tail(mean, std, confidence):
+    alpha = 1.0 - confidence
+    z = NormalDist().inv_cdf(alpha)
+    return -(mean + z * std), -(mean - std * np.exp(-0.5 * z * z) / np.sqrt(2 * np.pi) / alpha)
+
+
+def parametric_var(returns, confidence=DEFAULT_CONFIDENCE):
+    """Gaussian daily VaR and CVaR per column from the sample mean and deviation."""
+    x, _ = _as_array(returns)
+    _, mean, std = _moments(x)
+    return _gaussian_tail(mean, std, confidence)
+
+
+def downside_deviation(returns, mar=0.0, annualize=True):
+    """Root mean square shortfall below ``mar`` (an annual rate) over each column's valid days."""
+    x, _ = _as_array(returns)
+    valid = ~np.isnan(x)
+    short = np.where(valid, np.minimum(x - mar / TRADING_DAYS, 0.0), 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dd = np.sqrt((short * short).sum(axis=0) / valid.sum(axis=0))
+    return dd * (np.sqrt(TRADING_DAYS) if annualize else 1.0)
+
+
+def risk_table(values, confidence=DEFAULT_CONFIDENCE, mar=0.0, vol_window=21):
+    """One row of risk metrics per series of price or portfolio levels.
+
+    Volatility and downside deviation are annualized; VaR/CVaR are daily
+    losses; drawdown duration is in trading days. The recent volatility
+    covers the last ``vol_window`` rows and needs at least half of them.
+    """
+    frame = values.to_frame() if isinstance(values, pd.Series) else pd.DataFrame(values)
+    x = frame.to_numpy(dtype="float64")
+    r = simple_returns(x)
+    n, mean, std = _moments(r)
+    dd = drawdowns(x)
+    h_var, h_cvar = historical_var(r, confidence)
+    p_var, p_cvar = _gaussian_tail(mean, std, confidence)
+    recent_n, _, recent_std = _moments(r[-vol_window:])
+    last_vol = np.where(recent_n >= max(vol_window // 2, 2), recent_std * np.sqrt(TRADING_DAYS), np.nan)
+    pct = f"{confidence * 100:g}%"
+    return pd.DataFrame({
+        "Volatilitas": std * np.sqrt(TRADING_DAYS),
+        f"Volatilitas {vol_window}H Terakhir": last_vol,
+        "Downside Deviation": downside_deviation(r, mar),
+        "Max Drawdown": dd.max_drawdown,
+        "Drawdown Saat Ini": dd.current,
+        "Durasi Drawdown Maks (hari)": dd.max_duration,
+        f"VaR {pct} (Historis)": h_var,
+        f"CVaR {pct} (Historis)": h_cvar,
+        f"VaR {pct} (Parametrik)": p_var,
+        f"CVaR {pct} (Parametrik)": p_cvar,
+        "Observasi": n,
+    }, index=frame.columns)
@@ -0,0 +1,138 @@
+# Ultra Portfolio AI - Risk Profile Scoring
+
+"""Table-driven risk-profile scoring and glide-path allocation for client books.
+
+The scoring rules are data rather than code. ``rules`` has one row per
+answer: ``field``, ``value`` and ``points``. A row whose ``value`` is empty
+is a per-unit coefficient for a numeric field (``usia`` scores 0.01 per
+year). A score is the intercept plus the points of every answer, clipped to
+[0, 1]. Scoring a book is therefore one ``map`` or one multiplication per
+field, however many clients there are, and changing the rules means editing
+a CSV and rescoring.
+
+``glide_path`` gives the allocation at a few anchor scores. Scores between
+anchors get a linear blend, so the allocation moves continuously with the
+score instead of jumping between three buckets. ``levels`` maps score
+bands to a profile name and a warning level.
+"""
+
+from dataclasses import dataclass, field as dc_field
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES = pd.DataFrame(
+    [
+        ("usia", None, 0.01),
+        ("pengalaman", "Pemula", 0.0),
+        ("pengalaman", "Menengah", 0.1),
+        ("pengalaman", "Ahli", 0.2),
+        ("kebutuhan", "Pertumbuhan aset jangka panjang", 0.0),
+        ("kebutuhan", "Pendapatan pasif rutin", -0.1),
+        ("kebutuhan", "Likuiditas jangka pendek", -0.15),
+        ("toleransi_risiko", "Rendah", 0.0),
+        ("toleransi_risiko", "Sedang", 0.1),
+        ("toleransi_risiko", "Tinggi", 0.2),
+    ],
+    columns=["field", "value", "points"],
+)
+
+# Allocation (%) at each anchor score: the middle of the former
+# conservative (< 0.3), moderate (< 0.6) and aggressive bands.
+DEFAULT_GLIDE_PATH = pd.DataFrame(
+    {"Obligasi": [70, 40, 20], "Pasar Uang": [20, 20, 10], "Saham": [10, 40, 70]},
+    index=pd.Index([0.15, 0.45, 0.8], name="skor"),
+)
+
+# (upper bound, profile, warning level); the level names match st.warning/st.info/st.success.
+DEFAULT_LEVELS = (
+    (0.3, "Konservatif", "warning"),
+    (0.7, "Moderat", "info"),
+    (np.inf, "Agresif", "success"),
+)
+
+INVALID = "Tidak valid"
+
+
+def read_profiles(source):
+    """Client profiles from a CSV path or buffer, with normalized column names."""
+    frame = pd.read_csv(source)
+    frame.columns = [str(c).strip().lower().replace(" ", "_") for c in frame.columns]
+    return frame
+
+
+@dataclass
+class RiskModel:
+    rules: pd.DataFrame = dc_field(default_factory=lambda: DEFAULT_RULES.copy())
+    glide_path: pd.DataFrame = dc_field(default_factory=lambda: DEFAULT_GLIDE_PATH.copy())
+    levels: tuple = DEFAULT_LEVELS
+    intercept: float = 0.0
+
+    @classmethod
+    def from_csv(cls, rules=None, glide_path=None, **kwargs):
+        """Model from a rules CSV (``field,value,points``) and/or a glide-path CSV.
+
+        The glide-path CSV has a ``skor`` column followed by one column per
+        asset class. Whatever is not given keeps the defaults.
+        """
+        if rules is not None:
+            table = pd.read_csv(rules)
+            table.columns = [str(c).strip().lower() for c in table.columns]
+            kwargs["rules"] = table
+        if glide_path is not None:
+            kwargs["glide_path"] = pd.read_csv(glide_path).set_index("skor").sort_index()
+        return cls(**kwargs)
+
+    @property
+    def fields(self):
+        return list(dict.fromkeys(self.rules["field"]))
+
+    def options(self, field):
+        """Answer choices of a categorical field, in rule order."""
+        rows = self.rules[(self.rules["field"] == field) & self.rules["value"].notna()]
+        return list(rows["value"])
+
+    def score(self, profiles):
+        """Risk score per client (NaN where an answer is missing or unknown)."""
+        missing = [f for f in self.fields if f not in profiles.columns]
+        if missing:
+            raise ValueError(f"Missing profile columns: {', '.join(missing)}")
+        total = np.full(len(profiles), self.intercept)
+        for name, rows in self.rules.groupby("field", sort=False):
+            column = profiles[name]
+            linear = rows[rows["value"].isna()]
+            if not linear.empty:
+                total = total + pd.to_numeric(column, errors="coerce").to_numpy() * linear["points"].sum()
+            lookup = rows.dropna(subset=["value"])
+            if not lookup.empty:
+                keys = column.astype(str).str.strip().str.lower()
+                points = pd.Series(lookup["points"].to_numpy(), index=lookup["value"].astype(str).str.lower())
+                total = total + keys.map(points).to_numpy(dtype="float64")
+        return pd.Series(np.clip(total, 0.0, 1.0), index=profiles.index, name="Skor")
+
+    def allocate(self, scores):
+        """Glide-path allocation (%) per score; rows sum to the anchors' total (100)."""
+        s = np.asarray(scores, dtype="float64")
+        anchors = self.glide_path.index.to_numpy(dtype="float64")
+        alloc = {c: np.interp(s, anchors, self.glide_path[c].to_numpy(dtype="float64")) for c in self.glide_path}
+        frame = pd.DataFrame(alloc, index=getattr(scores, "index", None))
+        frame.loc[np.isnan(s)] = np.nan
+        return frame
+
+    def classify(self, scores):
+        """Profile name and warning level per score."""
+        s = np.asarray(scores, dtype="float64")
+        bounds = np.array([b for b, _, _ in self.levels])
+        pos = np.minimum(np.searchsorted(bounds, s, side="right"), len(bounds) - 1)
+        names = np.array([n for _, n, _ in self.levels], dtype=object)[pos]
+        warn = np.array([w for _, _, w in self.levels], dtype=object)[pos]
+        invalid = np.isnan(s)
+        names[invalid], warn[invalid] = INVALID, "error"
+        index = getattr(scores, "index", None)
+        return pd.DataFrame({"Profil": names, "Level Peringatan": warn}, index=index)
+
+    def evaluate(self, profiles):
+        """``profiles`` with the score, allocation (%), profile and warning level appended."""
+        scores = self.score(profiles)
+        alloc = self.allocate(scores).add_suffix(" (%)")
+        return pd.concat([profiles, scores, alloc, self.classify(scores)], axis=1)
@@ -0,0 +1,159 @@
+# Ultra Portfolio AI - Scenario Runner
+
+"""Fan a grid of what-if parameter sets out over a process pool.
+
+Large inputs such as price matrices are copied once into shared memory.
+Workers attach to them when they start, so a task carries only its small
+parameter dict and the matrices are never pickled per task. Each task
+returns a dict of metrics, and ``run_scenarios`` gathers them, next to their
+parameters, into one DataFrame in grid order.
+
+Task functions must be importable module-level callables taking
+``(params, arrays)``. ``rebalance_scenario`` and ``dcf_scenario`` cover the
+app's rebalancing and valuation sweeps.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.stats import TRADING_DAYS
+
+_WORKER_ARRAYS = {}
+_WORKER_BLOCKS = []
+
+
+def param_grid(**axes):
+    """Cartesian product of the given axes as a list of parameter dicts."""
+    names = list(axes)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(axes[n] for n in names))]
+
+
+class SharedArrays:
+    """Copies named arrays into shared memory blocks; use as a context manager."""
+
+    def __init__(self, arrays):
+        self.specs = {}
+        self._blocks = []
+        try:
+            for name, arr in arrays.items():
+                arr = np.ascontiguousarray(arr)
+                block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(arr.shape, arr.dtype, buffer=block.buf)[...] = arr
+                self.specs[name] = (block.name, arr.shape, arr.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(specs):
+    """Pool initializer: map the shared blocks as read-only arrays."""
+    for name, (block_name, shape, dtype) in specs.items():
+        # Spawned workers share the parent's resource tracker, so the parent's
+        # unlink in ``SharedArrays.close`` is the only cleanup needed.
+        block = shared_memory.SharedMemory(name=block_name)
+        arr = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        arr.flags.writeable = False
+        _WORKER_BLOCKS.append(block)
+        _WORKER_ARRAYS[name] = arr
+
+
+def _call(func, params):
+    return func(params, _WORKER_ARRAYS)
+
+
+def run_scenarios(func, grid, arrays=None, workers=None, chunksize=None):
+    """Run ``func(params, arrays)`` for every parameter dict in ``grid``.
+
+    With ``workers=1`` (or a single scenario) everything runs in-process on
+    the original arrays, which is handy in tests and notebooks.
+    """
+    grid = list(grid)
+    arrays = arrays or {}
+    if not grid:
+        return pd.DataFrame()
+    workers = min(workers or os.cpu_count() or 1, len(grid))
+
+    if workers == 1:
+        results = [func(params, arrays) for params in grid]
+    else:
+        chunksize = chunksize or max(1, len(grid) // (workers * 4))
+        with SharedArrays(arrays) as shared:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                                     initializer=_attach, initargs=(shared.specs,)) as pool:
+                results = list(pool.map(_call, itertools.repeat(func), grid, chunksize=chunksize))
+
+    rows = [{**_flat(params), **result} for params, result in zip(grid, results)]
+    return pd.DataFrame(rows)
+
+
+def _flat(params):
+    """Tuple/list parameters (e.g. weights) are shown as text in the result table."""
+    return {k: ", ".join(f"{x:g}" for x in v) if isinstance(v, (list, tuple, np.ndarray)) else v
+            for k, v in params.items()}
+
+
+def path_metrics(values):
+    """Final value, CAGR, annualized volatility and max drawdown of a value path."""
+    values = np.asarray(values, dtype="float64")
+    years = max(len(values) - 1, 1) / TRADING_DAYS
+    daily = values[1:] / values[:-1] - 1
+    peak = np.maximum.accumulate(values)
+    return {
+        "Nilai Akhir": values[-1],
+        "CAGR": (values[-1] / values[0]) ** (1 / years) - 1,
+        "Volatilitas": daily.std(ddof=1) * np.sqrt(TRADING_DAYS) if len(daily) > 1 else 0.0,
+        "Max Drawdown": (1 - values / peak).max(),
+    }
+
+
+def rebalance_scenario(params, arrays):
+    """Backtest one weights/frequency/instrument combination.
+
+    ``arrays`` holds ``prices`` (dates x assets) and ``dates`` (datetime64).
+    With ``bond_return`` set, a fixed-income instrument growing at that annual
+    rate is added as the last asset, as in the app's 60/40 simulation.
+    """
+    from portfolio_core.backtest import backtest
+
+    index = pd.DatetimeIndex(arrays["dates"])
+    prices = pd.DataFrame(arrays["prices"], index=index)
+    bond_return = params.get("bond_return")
+    if bond_return is not None:
+        elapsed = (index - index[0]).days.to_numpy() / 365
+        prices[prices.shape[1]] = (1 + bond_return) ** elapsed
+    result = backtest(prices, params["weights"], freq=params.get("freq", "annual"),
+                      threshold=params.get("threshold", 0.05), cost=params.get("cost", 0.0),
+                      initial=params.get("initial", 10000.0))
+    metrics = path_metrics(result.values.to_numpy())
+    metrics["Rebalancing"] = len(result.rebalance_dates)
+    metrics["Biaya"] = result.costs
+    return metrics
+
+
+def dcf_scenario(params, arrays):
+    """DCF value for one WACC / growth / terminal-growth combination."""
+    from portfolio_core.valuation import dcf_value
+
+    total, pv_explicit, pv_terminal = dcf_value(
+        params["fcff"], params["wacc"], params["growth"], params["years"],
+        terminal_growth=params.get("terminal_growth"), margin=params.get("margin", 1.0),
+    )
+    return {"Nilai Perusahaan": float(total), "PV FCFF": float(pv_explicit), "PV Terminal": float(pv_terminal)}
@@ -0,0 +1,143 @@
+# Ultra Portfolio AI - Portfolio Monte Carlo
+
+"""Correlated multi-asset return paths for a weighted portfolio.
+
+Paths are drawn either from a multivariate normal (Cholesky factor of the
+daily covariance) or by block bootstrap of historical return rows, which
+keeps fat tails and cross-asset correlation. A covariance that is not
+positive definite (duplicate assets, fewer days than assets) has no Cholesky
+factor; the Gaussian method then falls back to the bootstrap when a return
+history was given. Work is split into chunks of
+paths, each with its own child seed from one ``SeedSequence``, so results
+do not depend on how many threads ran them and no chunk ever holds more than
+``max_elements`` draws. NumPy releases the GIL in the heavy kernels, so a
+thread pool keeps every core busy.
+
+Per horizon the engine reports terminal value percentiles, VaR/CVaR of the
+horizon return and the distribution of the maximum drawdown up to that point.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.stats import TRADING_DAYS
+
+METHODS = ("gaussian", "bootstrap")
+
+
+@dataclass
+class SimulationResult:
+    horizons: np.ndarray         # horizon lengths in trading days
+    terminal_returns: np.ndarray  # (n_paths, n_horizons) cumulative return at each horizon
+    max_drawdowns: np.ndarray     # (n_paths, n_horizons) max drawdown up to each horizon
+    initial: float
+
+    def summary(self, percentiles=(5, 50, 95), alpha=0.95):
+        """One row per horizon: value percentiles, median CAGR, VaR/CVaR, drawdown."""
+        rows = []
+        for k, days in enumerate(self.horizons):
+            ret = self.terminal_returns[:, k]
+            q = np.quantile(ret, 1 - alpha)
+            years = days / TRADING_DAYS
+            row = {"Horizon (Tahun)": round(years, 2)}
+            for p in percentiles:
+                row[f"Nilai P{p}"] = self.initial * (1 + np.percentile(ret, p))
+            row["CAGR Median (%)"] = ((1 + np.median(ret)) ** (1 / years) - 1) * 100
+            row[f"VaR {alpha:.0%}"] = -q
+            row[f"CVaR {alpha:.0%}"] = -ret[ret <= q].mean()
+            row["Max Drawdown Median"] = np.median(self.max_drawdowns[:, k])
+            row["Max Drawdown P95"] = np.percentile(self.max_drawdowns[:, k], 95)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def _draw_gaussian(rng, n, days, mean, chol):
+    z = rng.standard_normal((n, days, chol.shape[0]))
+    return mean + z @ chol.T
+
+
+def _draw_bootstrap(rng, n, days, history, block):
+    t = history.shape[0]
+    block = max(1, min(block, t))
+    n_blocks = -(-days // block)
+    starts = rng.integers(0, t - block + 1, size=(n, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :days]
+    return history[idx]
+
+
+def _run_chunk(seed, n, days, weights, horizons, method, params, rebalance):
+    rng = np.random.default_rng(seed)
+    if method == "gaussian":
+        r = _draw_gaussian(rng, n, days, params["mean"], params["chol"])
+    else:
+        r = _draw_bootstrap(rng, n, days, params["history"], params["block"])
+    np.maximum(r, -0.99, out=r)
+    if rebalance:
+        value = np.cumprod(1 + r @ weights, axis=1)
+    else:
+        value = np.cumprod(1 + r, axis=1) @ weights
+    peak = np.maximum.accumulate(value, axis=1)
+    running_mdd = np.maximum.accumulate(1 - value / np.maximum(peak, 1.0), axis=1)
+    cols = horizons - 1
+    return value[:, cols] - 1, running_mdd[:, cols]
+
+
+def simulate_portfolio(weights, horizons, n_paths=10_000, method="gaussian", mean=None, cov=None,
+                       returns=None, block=20, rebalance=False, initial=10_000.0, seed=None,
+                       workers=None, max_elements=4_000_000):
+    """Simulate ``n_paths`` portfolio paths and evaluate them at ``horizons`` (days).
+
+    ``mean`` and ``cov`` are daily moments for ``"gaussian"``; ``returns`` is
+    the daily return history (dates x assets) for ``"bootstrap"``, and the
+    Gaussian method's fallback when ``cov`` has no Cholesky factor. Without
+    ``rebalance`` the portfolio is bought once and left to drift.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown simulation method: {method!r}")
+    weights = np.asarray(weights, dtype="float64")
+    weights = weights / weights.sum()
+    horizons = np.asarray(sorted(set(int(h) for h in horizons)))
+    days = int(horizons[-1])
+    n_assets = len(weights)
+
+    if method == "gaussian":
+        cov = np.asarray(cov, dtype="float64")
+        # Tiny jitter keeps Cholesky stable for near-singular sample covariances.
+        jitter = 1e-12 * np.trace(cov) / n_assets
+        try:
+            params = {"mean": np.asarray(mean, dtype="float64"),
+                      "chol": np.linalg.cholesky(cov + jitter * np.eye(n_assets))}
+        except np.linalg.LinAlgError:
+            if returns is None:
+                raise
+            method = "bootstrap"
+    if method == "bootstrap":
+        history = np.asarray(pd.DataFrame(returns).dropna(), dtype="float64")
+        if history.shape[0] < 2:
+            raise ValueError("Not enough return history to bootstrap")
+        params = {"history": history, "block": int(block)}
+
+    chunk = max(1, min(n_paths, max_elements // (days * n_assets)))
+    sizes = [min(chunk, n_paths - s) for s in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or os.cpu_count() or 1
+
+    def run(i):
+        return _run_chunk(seeds[i], sizes[i], days, weights, horizons, method, params, rebalance)
+
+    if workers == 1 or len(sizes) == 1:
+        parts = [run(i) for i in range(len(sizes))]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(run, range(len(sizes))))
+
+    return SimulationResult(
+        horizons=horizons,
+        terminal_returns=np.concatenate([p[0] for p in parts]),
+        max_drawdowns=np.concatenate([p[1] for p in parts]),
+        initial=initial,
+    )
@@ -0,0 +1,243 @@
+# Ultra Portfolio AI - Return Statistics
+
+"""Returns, means, covariances and correlations computed once per dataset.
+
+``stats_for(prices)`` returns a ``DatasetStats`` that lazily computes and
+memoizes every derived matrix, and is itself kept in the shared result cache
+(``result_cache.memoize``) by a fingerprint of the price frame, so several
+charts on the same page (or several reruns) share one computation. ``RollingCovariance`` keeps running sums so a rolling window
+moves forward one day in O(N^2) instead of rebuilding O(T*N^2) from scratch.
+"""
+
+import hashlib
+from collections import deque
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.result_cache import memoize
+
+TRADING_DAYS = 252
+COV_METHODS = ("sample", "ledoit_wolf", "ewma")
+
+
+def fingerprint(frame):
+    """Cheap content hash of a DataFrame (values, index and columns)."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(frame.to_numpy(dtype="float64")).tobytes())
+    h.update(np.asarray(frame.index.asi8 if isinstance(frame.index, pd.DatetimeIndex) else frame.index).tobytes())
+    h.update("\x1f".join(map(str, frame.columns)).encode())
+    return h.hexdigest()
+
+
+@memoize(name="stats_for")
+def stats_for(prices):
+    """Cached ``DatasetStats`` for a dates x tickers price frame."""
+    return DatasetStats(prices)
+
+
+# -- estimators --------------------------------------------------------------
+
+def sample_cov(x):
+    """Sample covariance (ddof=1); NaNs are handled pairwise like pandas."""
+    x = np.asarray(x, dtype="float64")
+    mask = ~np.isnan(x)
+    if mask.all():
+        xc = x - x.mean(axis=0)
+        return xc.T @ xc / (x.shape[0] - 1)
+    m = mask.astype("float64")
+    xz = np.where(mask, x, 0.0)
+    n = m.T @ m
+    sx = xz.T @ m                  # sum of x_i over rows where x_j is present
+    sxy = xz.T @ xz
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (sxy - sx * sx.T / n) / (n - 1)
+    cov[n < 2] = np.nan
+    return cov
+
+
+def sample_corr(x):
+    """Correlation matrix; NaNs are handled pairwise like pandas."""
+    x = np.asarray(x, dtype="float64")
+    mask = ~np.isnan(x)
+    if mask.all():
+        cov = sample_cov(x)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(std, std)
+    else:
+        m = mask.astype("float64")
+        xz = np.where(mask, x, 0.0)
+        n = m.T @ m
+        sx = xz.T @ m
+        sxx = (xz ** 2).T @ m      # sum of x_i^2 over rows where x_j is present
+        sxy = xz.T @ xz
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sxy - sx * sx.T / n
+            var_i = sxx - sx ** 2 / n
+            corr = cov / np.sqrt(var_i * var_i.T)
+        corr[n < 2] = np.nan
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return np.clip(corr, -1.0, 1.0)
+
+
+def ledoit_wolf_cov(x):
+    """Ledoit-Wolf shrinkage towards a scaled identity (complete rows only)."""
+    x = np.asarray(x, dtype="float64")
+    x = x[~np.isnan(x).any(axis=1)]
+    t, n = x.shape
+    xc = x - x.mean(axis=0)
+    emp = xc.T @ xc / t
+    mu = np.trace(emp) / n
+    target = mu * np.eye(n)
+    delta = ((emp - target) ** 2).sum()
+    x2 = xc ** 2
+    beta = ((x2.T @ x2) / t - emp ** 2).sum() / t
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+    return (1.0 - shrinkage) * emp + shrinkage * target
+
+
+def ewma_cov(x, lam=0.94):
+    """Exponentially weighted covariance (RiskMetrics decay ``lam``)."""
+    x = np.asarray(x, dtype="float64")
+    x = x[~np.isnan(x).any(axis=1)]
+    weights = lam ** np.arange(x.shape[0] - 1, -1, -1)
+    weights /= weights.sum()
+    mean = weights @ x
+    xc = x - mean
+    return (xc * weights[:, None]).T @ xc
+
+
+# -- per-dataset cache -------------------------------------------------------
+
+class DatasetStats:
+    """Lazily computed, memoized statistics for one price frame.
+
+    Returns are taken on complete rows of the ``"intersect"`` alignment (see
+    ``alignment.align``): the days every exchange in the universe traded,
+    with moves across a holiday kept on the next common day. Annualized
+    figures use ``TRADING_DAYS``.
+    """
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.tickers = list(prices.columns)
+        self._covs = {}
+
+    @property
+    def nbytes(self):
+        """Bytes held once every statistic has been computed, for the result cache's budget."""
+        t, n = self.prices.shape
+        matrices = 2 * len(COV_METHODS) + 1     # raw and annualized covariances, correlation
+        return int(self.prices.memory_usage(index=True, deep=True).sum()) + 8 * (2 * t * n + matrices * n * n)
+
+    @cached_property
+    def returns(self):
+        from portfolio_core.alignment import align
+        return align(self.prices, "intersect").complete_returns
+
+    @cached_property
+    def log_returns(self):
+        return np.log1p(self.returns)
+
+    @cached_property
+    def daily_mean(self):
+        return self.returns.mean()
+
+    @cached_property
+    def daily_std(self):
+        return self.returns.std()
+
+    @cached_property
+    def mean(self):
+        return self.daily_mean * TRADING_DAYS
+
+    @cached_property
+    def volatility(self):
+        return self.daily_std * np.sqrt(TRADING_DAYS)
+
+    def cov(self, method="sample", annualize=True):
+        """Covariance by ``method`` in ``COV_METHODS``, as a labelled DataFrame."""
+        if method not in COV_METHODS:
+            raise ValueError(f"Unknown covariance method: {method!r}")
+        if method not in self._covs:
+            x = self.returns.to_numpy()
+            raw = {"sample": sample_cov, "ledoit_wolf": ledoit_wolf_cov, "ewma": ewma_cov}[method](x)
+            self._covs[method] = pd.DataFrame(raw, index=self.tickers, columns=self.tickers)
+        cov = self._covs[method]
+        return cov * TRADING_DAYS if annualize else cov
+
+    @cached_property
+    def corr(self):
+        return pd.DataFrame(sample_corr(self.returns.to_numpy()), index=self.tickers, columns=self.tickers)
+
+
+# -- rolling windows ---------------------------------------------------------
+
+class RollingCovariance:
+    """Rolling-window mean and sample covariance updated one row at a time.
+
+    Keeps the running sum and sum of outer products of the rows in the window.
+    Adding a day and dropping the oldest are both O(N^2); the sums are rebuilt
+    from the buffered rows once per window length to stop rounding drift.
+    """
+
+    def __init__(self, window):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self._rows = deque()
+        self._sum = None
+        self._outer = None
+        self._pushes = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def push(self, row):
+        row = np.asarray(row, dtype="float64")
+        if self._sum is None:
+            self._sum = np.zeros(row.shape[0])
+            self._outer = np.zeros((row.shape[0], row.shape[0]))
+        self._rows.append(row)
+        self._sum += row
+        self._outer += np.outer(row, row)
+        if len(self._rows) > self.window:
+            old = self._rows.popleft()
+            self._sum -= old
+            self._outer -= np.outer(old, old)
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            block = np.asarray(self._rows)
+            self._sum = block.sum(axis=0)
+            self._outer = block.T @ block
+
+    def extend(self, rows):
+        for row in np.asarray(rows, dtype="float64"):
+            self.push(row)
+
+    @property
+    def mean(self):
+        return self._sum / len(self._rows)
+
+    @property
+    def cov(self):
+        n = len(self._rows)
+        return (self._outer - np.outer(self._sum, self._sum) / n) / (n - 1)
+
+
+def rolling_moments(returns, window, step=1, min_periods=None):
+    """Yield ``(date, mean, cov)`` for a rolling window every ``step`` rows.
+
+    Daily (not annualized) moments on complete rows; the window advances
+    incrementally through ``RollingCovariance``.
+    """
+    returns = pd.DataFrame(returns).dropna()
+    x = returns.to_numpy(dtype="float64")
+    min_periods = window if min_periods is None else min_periods
+    roller = RollingCovariance(window)
+    for i, row in enumerate(x):
+        roller.push(row)
+        if len(roller) >= min_periods and (i - min_periods + 1) % step == 0:
+            yield returns.index[i], roller.mean, roller.cov
@@ -0,0 +1,101 @@
+# Ultra Portfolio AI - Walk-Forward Backtest
+
+"""Out-of-sample Markowitz allocation, re-optimized at every rebalance date.
+
+At each rebalance close the mean and covariance are estimated only from the
+returns up to that close, over a rolling or expanding window. Weights are
+solved from them and held, drifting, until the next rebalance. The segments
+are chained into a single out-of-sample equity curve, with the turnover and
+transaction cost of every trade.
+
+The window statistics come from ``stats.RollingCovariance``, which moves one
+day forward in O(N^2), so nothing is rebuilt from scratch at each date. Each
+solve is ``optimizer.optimal_weights`` warm-started from the previous
+weights. A 15-year monthly walk-forward on 100 assets takes well under a
+second.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from portfolio_core.backtest import rebalance_mask
+from portfolio_core.optimizer import optimal_weights
+from portfolio_core.stats import TRADING_DAYS, RollingCovariance
+
+
+@dataclass
+class WalkForwardResult:
+    values: pd.Series       # out-of-sample portfolio value from the first rebalance on
+    weights: pd.DataFrame   # weights chosen at each rebalance close
+    turnover: pd.Series     # traded fraction of the portfolio at each rebalance after the first
+    costs: float
+
+    @property
+    def rebalance_dates(self):
+        return self.weights.index
+
+
+def walk_forward(prices, window=TRADING_DAYS, freq="monthly", objective="max_sharpe", expanding=False,
+                 risk_free_rate=0.03, long_only=True, cost=0.0, initial=10000.0, min_periods=None):
+    """Walk-forward backtest of a re-optimized Markowitz portfolio.
+
+    prices:      dates x assets DataFrame; gaps are forward-filled and leading
+                 rows without a price for every asset are dropped.
+    window:      estimation window in daily returns (ignored when ``expanding``).
+    freq:        rebalance calendar as in ``backtest.rebalance_mask``.
+    objective:   one of ``optimizer.OBJECTIVES``.
+    min_periods: returns needed before the first rebalance (default ``window``).
+    """
+    if freq not in ("daily", "monthly", "quarterly", "annual"):
+        raise ValueError(f"Unsupported walk-forward frequency: {freq!r}")
+    prices = pd.DataFrame(prices).ffill().dropna()
+    p = prices.to_numpy(dtype="float64")
+    x = p[1:] / p[:-1] - 1.0        # x[t - 1] is the return into close t
+    min_periods = max(window if min_periods is None else min_periods, 2)
+
+    points = np.flatnonzero(rebalance_mask(prices.index, freq))
+    points = points[points >= min_periods]
+    if len(points) == 0:
+        raise ValueError("Not enough history for the first estimation window")
+
+    roller = RollingCovariance(len(x) + 1 if expanding else window)
+    first = points[0]
+    values = np.empty(len(p) - first)
+    weights = np.empty((len(points), p.shape[1]))
+    turnover = np.empty(len(points) - 1)
+    costs = 0.0
+    pushed = 0
+    units = None
+    w = None
+    for k, t in enumerate(points):
+        roller.extend(x[pushed:t])
+        pushed = t
+        if units is None:
+            value = initial
+        else:
+            prev = points[k - 1]
+            values[prev - first:t - first + 1] = p[prev:t + 1] @ units
+            value = values[t - first]
+        w_new = optimal_weights(roller.mean * TRADING_DAYS, roller.cov * TRADING_DAYS, objective,
+                                risk_free_rate, long_only, previous=w)
+        if units is not None:
+            drifted = units * p[t] / value
+            turnover[k - 1] = np.abs(w_new - drifted).sum()
+            paid = value * cost * turnover[k - 1]
+            value -= paid
+            costs += paid
+        w = w_new
+        weights[k] = w
+        units = value * w / p[t]
+        values[t - first] = value
+    values[points[-1] - first:] = p[points[-1]:] @ units
+
+    index = prices.index
+    return WalkForwardResult(
+        values=pd.Series(values, index=index[first:], name="Walk-Forward"),
+        weights=pd.DataFrame(weights, index=index[points], columns=prices.columns),
+        turnover=pd.Series(turnover, index=index[points[1:]], name="Turnover"),
+        costs=float(costs),
+    )
@@ -1,14 +1,27 @@
 # Ultra Portfolio AI App - Optimized with Lazy Tabs and Efficient Memory
 
+import hashlib
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import plotly.express as px
-import plotly.graph_objects as go
-from openai import OpenAI
+from portfolio_core import instrument, prewarm
+from portfolio_core.alignment import align
+from portfolio_core.assistant import portfolio_summary
+from portfolio_core.backtest import backtest
+from portfolio_core.charts import cached_line_figure, heatmap_figure
+from portfolio_core.correlation import clustered, correlation_matrix, top_pairs
+from portfolio_core.loader import load_prices
+from portfolio_core.result_cache import memoize, price_ttl
+from portfolio_core.risk_metrics import drawdowns, risk_table, rolling_volatility, simple_returns
+from portfolio_core.stats import TRADING_DAYS, stats_for
+
+MAX_HEATMAP = 300   # di atas ini heatmap diganti daftar pasangan teratas
 
 st.set_page_config(page_title="💹 Ultra Portfolio AI", layout="wide")
+run = instrument.start_run("ultra_portfolio", enabled=st.query_params.get("debug") == "1" or None)
+prewarm.start_background()
 st.title("💼 Ultra Portfolio AI Assistant")
 
 st.markdown("🔍 **Selamat datang!** Aplikasi ini membantu Anda mensimulasikan, memahami, dan mengoptimalkan strategi investasi secara otomatis menggunakan AI.")
@@ -18,17 +31,31 @@ with st.sidebar:
     st.header("🤖 AI Chat Assistant")
     openai_api_key = st.text_input("🔐 OpenAI API Key", type="password")
     chat_input = st.text_area("Tanya tentang investasi kamu...")
-    if st.button("💬 Tanya AI") and openai_api_key and chat_input:
-        client = OpenAI(api_key=openai_api_key)
-        with st.spinner("🧠 Meminta jawaban dari AI..."):
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": chat_input}]
-            )
-        ai_msg = response.choices[0].message.content
-        st.success(ai_msg)
+    ditanya = st.button("💬 Tanya AI") and openai_api_key and chat_input
+    if ditanya:
+        from portfolio_core.assistant import Assistant
+
+        # Satu klien per sesi; dibuat ulang hanya jika API key berganti.
+        key_id = hashlib.sha256(openai_api_key.encode()).hexdigest()
+        if st.session_state.get("assistant_key") != key_id:
+            st.session_state["assistant"] = Assistant(openai_api_key)
+            st.session_state["assistant_key"] = key_id
+        assistant = st.session_state["assistant"]
+        try:
+            ai_msg = st.write_stream(assistant.ask(chat_input, st.session_state.get("portfolio_summary", "")))
+        except Exception as e:
+            st.error(f"Gagal menghubungi AI: {e}")
+            ai_msg = ""
+        if assistant.last_from_cache:
+            st.caption("⚡ Jawaban diambil dari cache")
         if any(x in ai_msg.lower() for x in ["risiko tinggi", "waspada", "volatil"]):
             st.warning("⚠️ AI memberikan peringatan risiko. Evaluasi keputusan Anda secara hati-hati.")
+    riwayat = st.session_state["assistant"].history if "assistant" in st.session_state else []
+    riwayat = riwayat[:-1] if ditanya and ai_msg else riwayat
+    if riwayat:
+        with st.expander("🕘 Riwayat percakapan"):
+            for pertanyaan, jawaban in riwayat:
+                st.markdown(f"**Anda:** {pertanyaan}\n\n**AI:** {jawaban}")
 
     st.markdown("---")
     st.markdown("👤 **Dibuat oleh:** [MS Hadianto](https://www.linkedin.com/in/ms-hadianto)", unsafe_allow_html=True)
@@ -43,9 +70,9 @@ if main_tab == "📊 Simulasi & Risiko":
     start = st.date_input("Mulai", pd.to_datetime("2014-01-01"))
     end = st.date_input("Sampai", pd.to_datetime("2024-01-01"))
 
-    @st.cache_data
+    @instrument.cached("get_data", cache=memoize(ttl=lambda tickers, start, end: price_ttl(tickers, end)))
     def get_data(tickers, start, end):
-        return yf.download(tickers, start=start, end=end)["Close"]
+        return load_prices(tickers, start, end)
 
     try:
         data = get_data(tickers, start, end)
@@ -54,11 +81,13 @@ if main_tab == "📊 Simulasi & Risiko":
         data = pd.DataFrame()
 
     if not data.empty:
-        cleaned_data = data.dropna()
+        # Saat salah satu bursa libur, harga terakhir dibawa maju agar hari bursa lain tidak hilang.
+        cleaned_data = align(data, "ffill").prices.dropna()
         if not cleaned_data.empty:
-            fig = px.line(cleaned_data, title="📈 Harga Saham Historis")
-            fig.update_layout(legend_title="Saham", xaxis_title="Tanggal", yaxis_title="Harga")
-            st.plotly_chart(fig, use_container_width=True)
+            with instrument.span("grafik_harga", "render"):
+                fig = cached_line_figure(cleaned_data, title="📈 Harga Saham Historis", legend_title="Saham",
+                                         xaxis_title="Tanggal", yaxis_title="Harga")
+                st.plotly_chart(fig, use_container_width=True)
 
         st.subheader("📊 Heatmap Risiko")
         st.markdown("""
@@ -66,28 +95,60 @@ if main_tab == "📊 Simulasi & Risiko":
         Korelasi tinggi (warna kuning) berarti pergerakan harga sangat mirip — tidak ideal untuk diversifikasi.
         Korelasi rendah (warna ungu/gelap) lebih baik untuk mengurangi risiko portofolio.</small>
         """, unsafe_allow_html=True)
-        returns = data.pct_change(fill_method=None).dropna()
-        corr = returns.corr()
-        fig = go.Figure(data=go.Heatmap(z=corr.values, x=corr.columns, y=corr.columns, colorscale="Viridis"))
-        st.plotly_chart(fig)
+        with instrument.span("korelasi"):
+            corr = correlation_matrix(stats_for(data).returns)
+        # Ringkasan ringkas (bukan data mentah) untuk konteks AI chat di sidebar.
+        st.session_state["portfolio_summary"] = portfolio_summary(data)
+        if len(corr) > 2 and st.checkbox("🧬 Kelompokkan saham berdasarkan klaster korelasi", value=len(corr) > 10):
+            with instrument.span("klaster_korelasi"):
+                corr = clustered(corr)
+        if len(corr) <= MAX_HEATMAP:
+            with instrument.span("heatmap_korelasi", "render"):
+                st.plotly_chart(heatmap_figure(corr))
+        else:
+            st.caption(f"Terlalu banyak saham untuk heatmap (maks. {MAX_HEATMAP}); ditampilkan pasangan paling berkorelasi.")
+            st.dataframe(top_pairs(corr, k=50).style.format({"Korelasi": "{:.2f}"}), use_container_width=True)
 
         st.subheader("⏳ Perbandingan Horizon Investasi")
         horizons = [1, 3, 5, 10]
         initial = 10000
-        annual_return = returns.mean() * 252
-        comparison = {"Horizon (Tahun)": [], "Estimasi Akhir (USD)": [], "CAGR (%)": []}
-
-        for h in horizons:
-            r = annual_return.mean()
-            end_value = initial * ((1 + r) ** h)
-            cagr = ((end_value / initial) ** (1/h)) - 1
-            comparison["Horizon (Tahun)"].append(h)
-            comparison["Estimasi Akhir (USD)"].append(round(end_value, 2))
-            comparison["CAGR (%)"].append(round(cagr * 100, 2))
-
-        df_horizon = pd.DataFrame(comparison)
-        st.dataframe(df_horizon, use_container_width=True)
-        st.caption("Simulasi pertumbuhan dana jika diinvestasikan dalam saham yang dipilih selama periode tertentu.")
+        col_method, col_paths = st.columns(2)
+        with col_method:
+            sim_method = st.selectbox("Metode simulasi:", ["Normal Multivariat (Cholesky)", "Block Bootstrap Historis"])
+        with col_paths:
+            n_paths = st.select_slider("Jumlah skenario:", options=[1_000, 5_000, 10_000, 25_000], value=5_000)
+
+        # Every input is an argument, so the result cache keys on all of them.
+        @instrument.cached("simulate_horizons", stage="compute", cache=memoize)
+        def simulate_horizons(data, weights, horizons, method, n_paths, initial, seed):
+            from portfolio_core.simulation import simulate_portfolio
+
+            stats = stats_for(data)
+            result = simulate_portfolio(
+                weights, [h * TRADING_DAYS for h in horizons], n_paths=n_paths, method=method,
+                mean=stats.daily_mean.values, cov=stats.cov("sample", annualize=False).values,
+                returns=stats.returns, initial=initial, seed=seed,
+            )
+            return result.summary()
+
+        try:
+            with st.spinner("🎲 Menjalankan simulasi Monte Carlo..."):
+                df_horizon = simulate_horizons(
+                    data, np.full(data.shape[1], 1 / data.shape[1]), horizons,
+                    "gaussian" if sim_method.startswith("Normal") else "bootstrap", n_paths, initial, 42,
+                )
+        except (np.linalg.LinAlgError, ValueError):
+            df_horizon = None
+        if df_horizon is not None:
+            st.dataframe(df_horizon.style.format({
+                "Horizon (Tahun)": "{:.0f}", "Nilai P5": "${:,.0f}", "Nilai P50": "${:,.0f}", "Nilai P95": "${:,.0f}",
+                "CAGR Median (%)": "{:.2f}", "VaR 95%": "{:.1%}", "CVaR 95%": "{:.1%}",
+                "Max Drawdown Median": "{:.1%}", "Max Drawdown P95": "{:.1%}",
+            }), use_container_width=True)
+        else:
+            st.error("Gagal menjalankan simulasi Monte Carlo. Periksa ticker duplikat atau perpanjang periode data.")
+        st.caption("Simulasi Monte Carlo portofolio bobot sama (beli dan tahan) senilai USD 10.000. "
+                   "P5–P95 adalah rentang nilai akhir; VaR/CVaR 95% adalah potensi kerugian pada horizon tersebut.")
 
         st.subheader("🔁 Simulasi Rebalancing Tahunan")
         st.caption("📘 Strategi: 60% Saham, 40% Instrumen Lain. Rebalance setiap akhir tahun.")
@@ -122,22 +183,60 @@ Instrumen {pendapatan_tetap_jenis} menargetkan return tahunan sekitar {bond_retu
         df_rebal = pd.DataFrame({"Equity": equity})
         df_rebal["Instrument"] = 10000 * ((1 + bond_return) ** ((df_rebal.index - df_rebal.index[0]).days / 365))
 
-        port_values = []
         weight_eq = 0.6
         weight_bd = 0.4
-        units_eq = 6000 / df_rebal.iloc[0]["Equity"]
-        units_bd = 4000 / df_rebal.iloc[0]["Instrument"]
-
-        for i, row in df_rebal.iterrows():
-            total = units_eq * row["Equity"] + units_bd * row["Instrument"]
-            if i.month == 12 and i.day == 31:
-                units_eq = (total * weight_eq) / row["Equity"]
-                units_bd = (total * weight_bd) / row["Instrument"]
-            port_values.append(total)
-
-        df_rebal["Total Value"] = port_values
-        fig_rebal = px.line(df_rebal, y="Total Value", title="📈 Pertumbuhan Portofolio dengan Rebalancing")
-        fig_rebal.update_layout(xaxis_title="Tanggal", yaxis_title="Total Value", template="plotly_white")
-        st.plotly_chart(fig_rebal, use_container_width=True)
+        # Rebalance on the last trading day of each year, even when Dec 31 is a holiday.
+        with instrument.span("backtest_rebalancing"):
+            rebal = backtest(df_rebal[["Equity", "Instrument"]], [weight_eq, weight_bd], freq="annual", initial=10000)
+        df_rebal["Total Value"] = rebal.values
+        with instrument.span("grafik_rebalancing", "render"):
+            fig_rebal = px.line(df_rebal, y="Total Value", title="📈 Pertumbuhan Portofolio dengan Rebalancing")
+            fig_rebal.update_layout(xaxis_title="Tanggal", yaxis_title="Total Value", template="plotly_white")
+            st.plotly_chart(fig_rebal, use_container_width=True)
+
+        st.markdown("### 📉 Risiko Portofolio Rebalancing")
+        seri = pd.DataFrame({"Portofolio 60/40": df_rebal["Total Value"], tickers[0]: df_rebal["Equity"]})
+        with instrument.span("metrik_risiko"):
+            df_risiko = risk_table(seri)
+            underwater = -drawdowns(seri).drawdown
+            vol_rolling = rolling_volatility(simple_returns(seri), window=63)
+        hari = ["Durasi Drawdown Maks (hari)", "Observasi"]
+        st.dataframe(df_risiko.style.format({c: "{:.0f}" if c in hari else "{:.2%}" for c in df_risiko.columns},
+                                            na_rep="-"), use_container_width=True)
+        col_dd, col_vol = st.columns(2)
+        with instrument.span("grafik_risiko", "render"):
+            with col_dd:
+                st.caption("Drawdown dari puncak sebelumnya")
+                st.area_chart(underwater)
+            with col_vol:
+                st.caption("Volatilitas tahunan rolling 3 bulan (63 hari bursa)")
+                st.line_chart(vol_rolling)
+
+        with st.expander("🧪 Analisis Skenario (banyak kombinasi sekaligus)"):
+            st.caption("Uji semua kombinasi porsi saham, frekuensi rebalancing, dan instrumen sekaligus di beberapa core CPU.")
+            frekuensi_label = {"Bulanan": "monthly", "Kuartalan": "quarterly", "Tahunan": "annual",
+                               "Ambang Drift (5%)": "threshold", "Tanpa Rebalancing": "none"}
+            porsi_saham = st.multiselect("Porsi saham (%)", [20, 40, 50, 60, 80], default=[40, 60, 80])
+            frekuensi = st.multiselect("Frekuensi rebalancing", list(frekuensi_label), default=["Tahunan", "Bulanan"])
+            instrumen = st.multiselect("Instrumen", list(instrumen_return), default=list(instrumen_return)[:3])
+            if st.button("▶️ Jalankan Skenario") and porsi_saham and frekuensi and instrumen:
+                from portfolio_core.scenarios import param_grid, rebalance_scenario, run_scenarios
+
+                grid = param_grid(weights=[(p / 100, 1 - p / 100) for p in porsi_saham],
+                                  freq=[frekuensi_label[f] for f in frekuensi],
+                                  bond_return=[instrumen_return[i] for i in instrumen])
+                with st.spinner(f"⚙️ Menjalankan {len(grid)} skenario..."):
+                    hasil = run_scenarios(rebalance_scenario, grid,
+                                          {"prices": equity.to_numpy()[:, None], "dates": equity.index.to_numpy()})
+                nama_instrumen = {v: k for k, v in instrumen_return.items()}
+                hasil["bond_return"] = hasil["bond_return"].map(nama_instrumen)
+                hasil = hasil.rename(columns={"weights": "Bobot (Saham, Instrumen)", "freq": "Frekuensi",
+                                              "bond_return": "Instrumen"})
+                st.dataframe(hasil.sort_values("CAGR", ascending=False).style.format({
+                    "Nilai Akhir": "${:,.0f}", "CAGR": "{:.2%}", "Volatilitas": "{:.2%}",
+                    "Max Drawdown": "{:.2%}", "Biaya": "${:,.2f}",
+                }), use_container_width=True)
     else:
         st.warning("Data harga saham tidak tersedia. Periksa simbol dan koneksi.")
+
+instrument.debug_panel(run)